@@ -76,8 +76,7 @@ export DATABASE_URL="postgresql://${ACTIVE_POSTGRES_USER}:${ACTIVE_POSTGRES_PASS
 echo "Running database migrations with ${ACTIVE_POSTGRES_HOST} PostgreSQL..."
 python -c "
 import os
-from sqlalchemy import create_engine
-from src.models_db import Base
+from src.database import upgrade_database
 
 # Get the active database URL
 db_url = os.environ.get('DATABASE_URL')
@@ -92,14 +91,14 @@ try:
 except Exception as e:
     print('Connecting to database (could not parse URL)')
 
-# Create engine with the active database
-engine = create_engine(db_url)
-
-print('Creating database tables if they do not exist...')
-Base.metadata.create_all(bind=engine)
+print('Applying schema migrations...')
+upgrade_database(db_url)
 print('Database setup completed!')
 "
 
+# The schema is current; the API does not need to migrate again
+export DB_AUTO_MIGRATE=false
+
 # Wait for Ollama to be ready with increased timeout
 echo "Checking if Ollama service is available..."
 OLLAMA_RETRIES=30
@@ -5,20 +5,39 @@ API Endpoint Definitions
 ========================
 
 /v2/review, /v2/review/feedback - synchronous
-/v2/jobs - async queue
+/v2/stats/feedback - feedback counts per category, language and model
+/v2/review/stream - synchronous, streamed as Server-Sent Events
+/v2/jobs - async queue (long-poll with ?wait=, WebSocket at /v2/jobs/{jobId}/ws)
+/v2/reviews/batch - async queue, many files as one job
 """
 
 import json
 import logging
 import os
+from collections.abc import AsyncIterator
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from .database import get_db_session
-from .llm_engines.ollama_engine import OllamaEngine
-from .schemas import ReviewFeedbackRequest, ReviewRequest, ReviewResponse
-from .services import cancel_job, generate_and_save_review, get_job_status, queue_review_job, save_feedback
+from .llm_engines.backend_pool import NoBackendAvailableError
+from .llm_engines.ollama_engine import get_async_ollama_engine
+from .schemas import BatchReviewRequest, ReviewFeedbackRequest, ReviewRequest, ReviewResponse
+from .services import (
+    JOB_MAX_WAIT,
+    agenerate_and_save_review,
+    astream_review_events,
+    cancel_job,
+    get_feedback_stats,
+    get_job_status,
+    overload_details,
+    queue_batch_review_job,
+    queue_review_job,
+    save_feedback,
+    wait_for_job_status,
+    watch_job_status,
+)
 
 router = APIRouter(prefix="/v2", tags=["reviews"])
 logger = logging.getLogger(__name__)
@@ -27,29 +46,69 @@ logger = logging.getLogger(__name__)
 DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
 
 
+def _overloaded(error: NoBackendAvailableError) -> HTTPException:
+    """
+    429 / 503 with Retry-After for a request shed because the LLM backends are
+    saturated or unavailable.
+    """
+    details = overload_details(error)
+    return HTTPException(
+        status_code=details["status"], detail=details["detail"], headers={"Retry-After": str(details["retryAfter"])}
+    )
+
+
 @router.post("/review", response_model=ReviewResponse)
-def review_code(review_req: ReviewRequest, db_session: Session = Depends(get_db_session)) -> ReviewResponse:
+async def review_code(review_req: ReviewRequest) -> ReviewResponse:
     """
     Synchronous code review returning multiple categories.
+
+    The handler awaits the model on the event loop, so in-flight reviews do not
+    occupy threadpool threads. When every backend is at its concurrency limit
+    the request is rejected with 429 (503 if no backend is usable).
     """
     try:
-        llm_engine = OllamaEngine()
-        review_obj = generate_and_save_review(
-            session=db_session,
-            llm_engine=llm_engine,
-            language_str=review_req.language,
-            sourcecode_str=review_req.sourceCode,
-            diff_str=review_req.diff,
-            filename_str=review_req.fileName,
-            options_dict=review_req.options,
-        )
+        review_obj = await agenerate_and_save_review(get_async_ollama_engine(), review_req)
         return ReviewResponse(reviewId=review_obj["reviewId"], reviews=review_obj["reviews"])
 
+    except NoBackendAvailableError as e:
+        raise _overloaded(e) from e
+
     except Exception:
         logger.exception("Error occurred while performing code review.")
         raise HTTPException(status_code=500, detail="Failed to perform code review.")
 
 
+async def _format_sse(events: AsyncIterator[tuple[str, dict]]) -> AsyncIterator[str]:
+    """
+    Serializes (event, data) pairs as Server-Sent Events.
+    """
+    async for event, data in events:
+        yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/review/stream")
+async def review_code_stream(review_req: ReviewRequest) -> StreamingResponse:
+    """
+    Synchronous code review streamed as Server-Sent Events.
+
+    Sends `token` events while the model generates, then a single `result`
+    event with the same payload as POST /v2/review (or an `error` event).
+    Requests arriving while the backends are saturated get 429 / 503 before
+    the stream starts.
+    """
+    engine = get_async_ollama_engine()
+    try:
+        engine.check_capacity()
+    except NoBackendAvailableError as e:
+        raise _overloaded(e) from e
+
+    return StreamingResponse(
+        _format_sse(astream_review_events(engine, review_req)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/review/feedback")
 def review_feedback(review_req: ReviewFeedbackRequest, db_session: Session = Depends(get_db_session)) -> dict:
     """
@@ -68,32 +127,80 @@ def review_feedback(review_req: ReviewFeedbackRequest, db_session: Session = Dep
         raise HTTPException(status_code=500, detail="Failed to save feedback.")
 
 
+@router.get("/stats/feedback")
+def feedback_stats(
+    category: str | None = None,
+    language: str | None = None,
+    model: str | None = None,
+    groupBy: str = Query("category,language,model", description="Comma-separated: category, language, model"),
+    db_session: Session = Depends(get_db_session),
+) -> dict:
+    """
+    Good/Bad feedback counts per category, language and model, read from
+    counters maintained as feedback arrives (no scan of the feedback table).
+    """
+    try:
+        group_by = [key.strip() for key in groupBy.split(",") if key.strip()]
+        return get_feedback_stats(db_session, category=category, language=language, model=model, group_by=group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
 # === Asynchronous queue endpoints ===
 
 
+def _client_identity(request: Request, header_value: str | None, options: dict | None) -> str | None:
+    client_id = header_value or (options or {}).get("clientId")
+    if not client_id and request.client:
+        client_id = request.client.host
+    return client_id
+
+
 @router.post("/jobs")
-def create_review_job(review_req: ReviewRequest, db_session: Session = Depends(get_db_session)) -> dict:
+def create_review_job(
+    review_req: ReviewRequest,
+    request: Request,
+    x_review_priority: str | None = Header(None),
+    x_client_id: str | None = Header(None),
+    db_session: Session = Depends(get_db_session),
+) -> dict:
     """
     Creates a new code review job, processed asynchronously.
+
+    The priority class ("interactive", "normal", "batch") comes from the
+    X-Review-Priority header or options.priority; the client identity used for
+    fair-share scheduling from X-Client-Id, options.clientId or the client address.
+
+    Submitting a review identical to a pending job returns that job's jobId
+    (with "deduplicated": true) instead of queuing it again.
     """
     try:
-        job_id = queue_review_job(db_session, review_req)
-        return {
-            "jobId": job_id,
-            "status": "queued",
-            "message": f"Job accepted. Check status via GET /v2/jobs/{job_id}",
-        }
-    except Exception:
+        client_id = _client_identity(request, x_client_id, review_req.options)
+        job = queue_review_job(db_session, review_req, priority=x_review_priority, client_id=client_id)
+    except Exception as e:
         logger.exception("Error while creating job.")
-        raise HTTPException(status_code=500, detail="Failed to create job.")
+        raise HTTPException(status_code=500, detail="Failed to create job.") from e
+
+    if job["deduplicated"]:
+        message = f"Identical review already pending. Check status via GET /v2/jobs/{job['jobId']}"
+    else:
+        message = f"Job accepted. Check status via GET /v2/jobs/{job['jobId']}"
+    return {**job, "message": message}
 
 
 @router.get("/jobs/{jobId}")
-def get_review_job(jobId: str, db_session: Session = Depends(get_db_session)) -> dict:
+async def get_review_job(
+    jobId: str,
+    wait: float = Query(0, ge=0, description="Seconds to wait for a state change (long-poll)"),
+) -> dict:
     """
     Retrieves job status and results if completed.
+
+    With `?wait=N` the request is held until the job changes state (or N
+    seconds passed) instead of answering right away; a finished job is
+    returned immediately. Waits longer than JOB_MAX_WAIT are shortened to it.
     """
-    job_info: dict = get_job_status(db_session, jobId)
+    job_info: dict = await wait_for_job_status(jobId, min(wait, JOB_MAX_WAIT))
     if not job_info:
         raise HTTPException(status_code=404, detail="Job not found.")
 
@@ -104,6 +211,24 @@ def get_review_job(jobId: str, db_session: Session = Depends(get_db_session)) ->
     return job_info
 
 
+@router.websocket("/jobs/{jobId}/ws")
+async def watch_review_job(websocket: WebSocket, jobId: str) -> None:
+    """
+    Pushes the job's status (same payload as GET /v2/jobs/{jobId}) on connect and
+    after every state change, then closes once the job is finished. Closes with
+    code 4404 if the job does not exist.
+    """
+    await websocket.accept()
+    found = False
+    try:
+        async for job_info in watch_job_status(jobId):
+            found = True
+            await websocket.send_json(job_info)
+    except WebSocketDisconnect:
+        return
+    await websocket.close(code=1000 if found else 4404)
+
+
 @router.put("/jobs/{jobId}")
 def update_review_job(jobId: str, update_data: dict, db_session: Session = Depends(get_db_session)) -> dict:
     """
@@ -116,3 +241,44 @@ def update_review_job(jobId: str, update_data: dict, db_session: Session = Depen
         return canceled_job
 
     raise HTTPException(status_code=400, detail="Unsupported update request.")
+
+
+# === Batch endpoints ===
+
+
+@router.post("/reviews/batch")
+def create_batch_review(
+    batch_req: BatchReviewRequest,
+    request: Request,
+    x_review_priority: str | None = Header(None),
+    x_client_id: str | None = Header(None),
+    db_session: Session = Depends(get_db_session),
+) -> dict:
+    """
+    Queues one review per file under a single batch job.
+
+    Poll GET /v2/reviews/batch/{jobId} (or GET /v2/jobs/{jobId}) for the aggregated
+    status and the results of every file; PUT /v2/jobs/{jobId} cancels the whole batch.
+    """
+    try:
+        client_id = _client_identity(request, x_client_id, batch_req.options)
+        batch = queue_batch_review_job(db_session, batch_req, priority=x_review_priority, client_id=client_id)
+        return {
+            **batch,
+            "status": "queued",
+            "message": f"Batch accepted. Check status via GET /v2/reviews/batch/{batch['jobId']}",
+        }
+    except Exception as e:
+        logger.exception("Error while creating batch job.")
+        raise HTTPException(status_code=500, detail="Failed to create batch job.") from e
+
+
+@router.get("/reviews/batch/{jobId}")
+def get_batch_review(jobId: str, db_session: Session = Depends(get_db_session)) -> dict:
+    """
+    Retrieves the aggregated status of a batch and the results of its files.
+    """
+    job_info: dict = get_job_status(db_session, jobId)
+    if not job_info or "jobs" not in job_info:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    return job_info
@@ -0,0 +1,212 @@
+"""
+chunking.py
+Token Budgeting and Source Chunking
+===================================
+
+Keeps prompts inside the model's context window.
+
+- estimate_tokens: cheap, tokenizer-free estimate of the tokens in a text
+- split_source: splits oversized sources into chunks on function / class
+  boundaries (found from the indentation structure, so it works for any
+  language), falling back to plain line splits for huge definitions
+- merge_chunk_categories: reduce step, merging each category of the chunk
+  reviews into a single message
+
+Configuration (environment):
+- REVIEW_CONTEXT_TOKENS: context window assumed when the engine does not report one
+- REVIEW_OUTPUT_TOKENS: tokens reserved for the model's answer (incl. reasoning)
+- REVIEW_CHUNK_CONCURRENCY: chunks of one file reviewed in parallel
+"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+REVIEW_CONTEXT_TOKENS = int(os.getenv("REVIEW_CONTEXT_TOKENS", "8192"))
+REVIEW_OUTPUT_TOKENS = int(os.getenv("REVIEW_OUTPUT_TOKENS", "2048"))
+REVIEW_CHUNK_CONCURRENCY = int(os.getenv("REVIEW_CHUNK_CONCURRENCY", "4"))
+
+# Identifiers / numbers, runs of punctuation and whitespace-separated symbols roughly
+# match how BPE tokenizers cut source code
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Long identifiers and numbers are split into several tokens
+_CHARS_PER_WORD_TOKEN = 6
+
+# Lines that continue the previous statement rather than starting a new one
+_CONTINUATION_PATTERN = re.compile(r"^(?:[})\]]|(?:else|elif|except|finally|catch)\b)")
+# Lines that belong to the definition below them (decorators, annotations, comments)
+_LEADING_PREFIXES = ("@", "#", "//", "/*", "*", "--")
+# Oversized units longer than a header plus one line are split into their members
+_MIN_MEMBER_SPLIT_LINES = 3
+
+
+def estimate_tokens(text: str | None) -> int:
+    """
+    Estimates the number of tokens in a text without a tokenizer.
+
+    Tends to overestimate slightly, which keeps prompts on the safe side of the
+    context window.
+    """
+    if not text:
+        return 0
+    count = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        length = match.end() - match.start()
+        count += 1 + (length - 1) // _CHARS_PER_WORD_TOKEN
+    return count
+
+
+@dataclass
+class SourceChunk:
+    index: int
+    start_line: int  # 1-based, inclusive
+    end_line: int
+    text: str
+
+    @property
+    def label(self) -> str:
+        return f"lines {self.start_line}-{self.end_line}"
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def _split_units(lines: list[str], start: int, end: int) -> list[tuple[int, int]]:
+    """
+    Splits lines[start:end] into (start, end) ranges of statements at the range's
+    outermost indentation level: top-level functions and classes, or the members
+    of a class when called on a class body. Decorators and comments directly
+    above a definition stay with it.
+    """
+    indents = [
+        _indent(lines[idx])
+        for idx in range(start, end)
+        if lines[idx].strip() and not _CONTINUATION_PATTERN.match(lines[idx].lstrip())
+    ]
+    if not indents:
+        return [(start, end)]
+    level = min(indents)
+
+    starts = [start]
+    for idx in range(start + 1, end):
+        line = lines[idx]
+        stripped = line.lstrip()
+        if not stripped or _indent(line) != level or _CONTINUATION_PATTERN.match(stripped):
+            continue
+        if stripped.startswith(_LEADING_PREFIXES):
+            continue
+        unit_start = idx
+        while unit_start - 1 > starts[-1] and lines[unit_start - 1].lstrip().startswith(_LEADING_PREFIXES):
+            unit_start -= 1
+        if unit_start > starts[-1]:
+            starts.append(unit_start)
+    return list(zip(starts, [*starts[1:], end], strict=True))
+
+
+def _split_lines(lines: list[str], start: int, end: int, max_tokens: int) -> list[tuple[int, int, int]]:
+    """Last resort for a single oversized statement: packs plain lines."""
+    pieces = []
+    piece_start, piece_tokens = start, 0
+    for idx in range(start, end):
+        line_tokens = estimate_tokens(lines[idx])
+        if piece_tokens and piece_tokens + line_tokens > max_tokens:
+            pieces.append((piece_start, idx, piece_tokens))
+            piece_start, piece_tokens = idx, 0
+        piece_tokens += line_tokens
+    pieces.append((piece_start, end, piece_tokens))
+    return pieces
+
+
+def _split_pieces(lines: list[str], start: int, end: int, max_tokens: int) -> list[tuple[int, int, int]]:
+    """
+    Returns (start, end, tokens) pieces no larger than max_tokens (except single
+    lines that are larger on their own), recursing into oversized units.
+    """
+    pieces = []
+    for unit_start, unit_end in _split_units(lines, start, end):
+        tokens = estimate_tokens("".join(lines[unit_start:unit_end]))
+        if tokens <= max_tokens:
+            pieces.append((unit_start, unit_end, tokens))
+        elif unit_end - unit_start >= _MIN_MEMBER_SPLIT_LINES:
+            # e.g. a large class: split its body into members, keeping the header with the first one
+            body = _split_pieces(lines, unit_start + 1, unit_end, max_tokens)
+            if len(body) > 1:
+                _, first_end, first_tokens = body[0]
+                body[0] = (unit_start, first_end, first_tokens + estimate_tokens(lines[unit_start]))
+                pieces.extend(body)
+            else:
+                pieces.extend(_split_lines(lines, unit_start, unit_end, max_tokens))
+        else:
+            pieces.extend(_split_lines(lines, unit_start, unit_end, max_tokens))
+    return pieces
+
+
+def split_source(source_code: str, max_tokens: int) -> list[SourceChunk]:
+    """
+    Splits source code into chunks of at most ~max_tokens estimated tokens.
+
+    Consecutive top-level units (functions, classes, ...) are packed into a
+    chunk while they fit. A unit larger than the budget is split into its
+    members (e.g. the methods of a class), and only as a last resort on line
+    boundaries.
+
+    Returns:
+        list[SourceChunk]: Chunks in source order (a single chunk if everything fits)
+    """
+    lines = source_code.splitlines(keepends=True)
+    max_tokens = max(1, max_tokens)
+
+    pieces = _split_pieces(lines, 0, len(lines), max_tokens) if lines else []
+
+    chunks: list[SourceChunk] = []
+    chunk_start, chunk_end, chunk_tokens = None, 0, 0
+    for start, end, tokens in pieces:
+        if chunk_start is not None and chunk_tokens + tokens > max_tokens:
+            chunks.append(_make_chunk(len(chunks), lines, chunk_start, chunk_end))
+            chunk_start, chunk_tokens = None, 0
+        if chunk_start is None:
+            chunk_start = start
+        chunk_end = end
+        chunk_tokens += tokens
+    if chunk_start is not None:
+        chunks.append(_make_chunk(len(chunks), lines, chunk_start, chunk_end))
+
+    logger.debug("Split %s lines into %s chunk(s) of <= %s tokens", len(lines), len(chunks), max_tokens)
+    return chunks
+
+
+def _make_chunk(index: int, lines: list[str], start: int, end: int) -> SourceChunk:
+    return SourceChunk(index=index, start_line=start + 1, end_line=end, text="".join(lines[start:end]))
+
+
+def merge_chunk_categories(chunk_results: list[tuple[SourceChunk, list[dict]]]) -> list[dict]:
+    """
+    Reduce step: merges the categories of all chunk reviews so every category
+    appears once, its messages prefixed with the line range they refer to.
+
+    Categories keep the order in which they first appear (chunk order);
+    "General Feedback" always comes first. Identical messages are kept once.
+
+    Returns:
+        list[dict]: [{category, message}, ...]
+    """
+    merged: dict[str, list[str]] = {}
+    for chunk, categories in chunk_results:
+        for item in categories:
+            messages = merged.setdefault(item["category"], [])
+            message = item["message"].strip()
+            if len(chunk_results) > 1:
+                message = f"({chunk.label}) {message}"
+            if message not in messages:
+                messages.append(message)
+
+    result = []
+    if "General Feedback" in merged:
+        result.append({"category": "General Feedback", "message": "\n".join(merged.pop("General Feedback"))})
+    for category, messages in merged.items():
+        result.append({"category": category, "message": "\n".join(messages)})
+    return result
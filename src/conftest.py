@@ -0,0 +1,198 @@
+"""
+Shared test doubles for unit tests that run without Postgres or Ollama.
+"""
+
+import json
+from http import HTTPStatus
+
+import requests
+from sqlalchemy.dialects import postgresql
+
+
+def compiled_params(statement) -> dict:
+    """Bound parameters of a SQLAlchemy statement as Postgres would receive them."""
+    return statement.compile(dialect=postgresql.dialect()).params
+
+
+class FakeResult:
+    """Result of FakeSession.execute() over a list of rows (tuples or objects)."""
+
+    def __init__(self, rows=(), columns=()):
+        self.rows = list(rows)
+        self.columns = list(columns)
+        self.rowcount = len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def keys(self):
+        return self.columns
+
+    def all(self):
+        return list(self.rows)
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def scalars(self):
+        return FakeResult(row[0] if isinstance(row, tuple) else row for row in self.rows)
+
+    def scalar(self):
+        return self.scalars().first()
+
+    def scalar_one(self):
+        (value,) = self.scalars().rows
+        return value
+
+    def scalar_one_or_none(self):
+        return self.scalar()
+
+    def mappings(self):
+        return FakeResult(dict(zip(self.columns, row, strict=True)) for row in self.rows)
+
+
+class FakeQuery:
+    """Stands in for session.query(...) chains; filters are ignored."""
+
+    def __init__(self, session):
+        self.session = session
+
+    def options(self, *_args):
+        return self
+
+    def filter(self, *_args):
+        return self
+
+    def order_by(self, *_args):
+        return self
+
+    def with_for_update(self, **_kwargs):
+        return self
+
+    def first(self):
+        self.session.queries += 1
+        return self.session.rows[0] if self.session.rows else None
+
+    def all(self):
+        self.session.queries += 1
+        return list(self.session.rows)
+
+
+class FakeSession:
+    """
+    Records what the code under test does with its database session.
+
+    session.query(...) answers with `rows`; execute() answers with the rows
+    returned by `results(statement, params)` (no rows by default).
+    """
+
+    def __init__(self, rows=(), results=None, objects=None):
+        self.rows = list(rows)
+        self.results = results
+        self.objects = dict(objects or {})
+        self.statements = []
+        self.params = []
+        self.added = []
+        self.queries = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        return False
+
+    def query(self, *_args):
+        return FakeQuery(self)
+
+    def execute(self, statement, params=None, **_kwargs):
+        self.statements.append(statement)
+        self.params.append(params)
+        result = self.results(statement, params) if self.results else ()
+        return result if isinstance(result, FakeResult) else FakeResult(result)
+
+    def get(self, _model, key):
+        return self.objects.get(str(key))
+
+    def add(self, instance):
+        self.added.append(instance)
+
+    def flush(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+class FakeResponse:
+    """requests.Response of FakeOllamaSession; streaming responses yield `lines`."""
+
+    def __init__(self, payload=None, status_code=HTTPStatus.OK, lines=()):
+        self.payload = payload or {}
+        self.status_code = status_code
+        self.lines = list(lines)
+        self.text = json.dumps(self.payload)
+        self.raw = None
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= HTTPStatus.BAD_REQUEST:
+            raise requests.HTTPError(response=self)
+
+    def json(self):
+        return self.payload
+
+    def iter_lines(self):
+        yield from self.lines
+
+    def close(self):
+        self.closed = True
+
+
+class FakeOllamaSession:
+    """
+    Stands in for the engine's requests.Session.
+
+    Answers the health checks from `servers` ({url: (models, loaded models)};
+    missing URLs are down) and streams `reply` for /api/generate, recording the
+    request payloads in `generated`.
+    """
+
+    def __init__(self, servers, reply=("ok",)):
+        self.servers = servers
+        self.reply = list(reply)
+        self.generated = []
+
+    def mount(self, *_args):
+        pass
+
+    def close(self):
+        pass
+
+    def get(self, url, **_kwargs):
+        for host, (models, loaded) in self.servers.items():
+            if url == host:
+                return FakeResponse()
+            if url == f"{host}/api/tags":
+                return FakeResponse({"models": [{"name": name} for name in models]})
+            if url == f"{host}/api/ps":
+                return FakeResponse({"models": [{"name": name} for name in loaded]})
+        raise requests.ConnectionError(url)
+
+    def post(self, url, json=None, **_kwargs):
+        if url.removesuffix("/api/generate") not in self.servers:
+            raise requests.ConnectionError(url)
+        self.generated.append(json)
+        lines = [_json_line({"response": text, "done": False}) for text in self.reply]
+        return FakeResponse(lines=[*lines, _json_line({"response": "", "done": True})])
+
+
+def _json_line(data: dict) -> bytes:
+    return json.dumps(data).encode()
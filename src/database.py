@@ -7,9 +7,12 @@ Database Connection and Session Management
 import logging
 import os
 from collections.abc import Iterator
+from pathlib import Path
 
+from alembic import command
+from alembic.config import Config
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, inspect, select
 from sqlalchemy.orm import Session, sessionmaker
 
 # Load variables from .env
@@ -25,6 +28,15 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 
 DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
 
+# Apply pending schema migrations when the API starts
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() == "true"
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+# Revision matching the tables Base.metadata.create_all() used to create before migrations existed
+_BASELINE_REVISION = "0001"
+# Advisory lock key serializing migrations of replicas starting at the same time
+_MIGRATION_LOCK_ID = 7_240_118_302
+
 DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
 # echo=DEBUG_MODE logs all SQL if True
@@ -42,3 +54,38 @@ def get_db_session() -> Iterator[Session]:
         raise
     finally:
         session.close()
+
+
+def upgrade_database(url: str | None = None, revision: str = "head") -> None:
+    """
+    Migrates the database schema to the given Alembic revision.
+
+    Databases created with Base.metadata.create_all() (before migrations existed)
+    have the tables but no alembic_version; they are stamped at the baseline
+    revision first, and the later migrations fill in whatever they lack.
+
+    Args:
+        url: Database URL (defaults to DATABASE_URL)
+        revision: Target revision
+    """
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+
+    migration_engine = create_engine(url, future=True) if url else engine
+    with migration_engine.connect() as connection:
+        connection.execute(select(func.pg_advisory_lock(_MIGRATION_LOCK_ID)))
+        connection.commit()
+        try:
+            config.attributes["connection"] = connection
+            tables = set(inspect(connection).get_table_names())
+            # Alembic manages its own transactions on the connection
+            connection.commit()
+            if "alembic_version" not in tables and "review_jobs" in tables:
+                logger.info("Existing schema without migration history; stamping revision %s", _BASELINE_REVISION)
+                command.stamp(config, _BASELINE_REVISION)
+            command.upgrade(config, revision)
+        finally:
+            connection.execute(select(func.pg_advisory_unlock(_MIGRATION_LOCK_ID)))
+            connection.commit()
+    if migration_engine is not engine:
+        migration_engine.dispose()
@@ -0,0 +1,178 @@
+"""
+diff_utils.py
+Unified Diff Helpers
+====================
+
+Parses unified diffs and renders only the changed regions for the
+diff-focused prompt mode.
+
+- Every hunk is trimmed to a configurable number of context lines around its
+  changes (widely separated changes in one hunk are split into regions)
+- Each rendered line is annotated with its line number in the original file
+  and in the changed file, so review messages can still reference lines
+
+Context is limited to what the diff itself carries; generate diffs with
+`git diff -U<n>` when more surrounding code is wanted.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(.*)$")
+
+
+@dataclass
+class DiffLine:
+    tag: str  # " " context, "-" removed, "+" added
+    text: str
+    old_lineno: int | None
+    new_lineno: int | None
+
+
+@dataclass
+class Hunk:
+    file_name: str | None
+    old_start: int
+    new_start: int
+    section: str = ""
+    lines: list[DiffLine] = field(default_factory=list)
+
+
+def parse_unified_diff(diff: str | None) -> list[Hunk]:
+    """
+    Parses a unified diff (single or multiple files).
+
+    Each hunk spans exactly the line counts of its "@@" header, so added or
+    removed lines that look like file headers ("+++ x", "--- y") stay part of it.
+    Lines outside hunks (file headers, "diff --git", index lines) are skipped;
+    "\\ No newline at end of file" markers are ignored.
+
+    Returns:
+        list[Hunk]: Hunks in diff order (empty if the text is not a unified diff)
+    """
+    hunks: list[Hunk] = []
+    if not diff:
+        return hunks
+
+    file_name = None
+    current = None
+    old_lineno = new_lineno = 0
+    # Lines of the current hunk still to come, from its "@@ -a,b +c,d @@" header
+    old_left = new_left = 0
+    for line in diff.splitlines():
+        if current is not None and line.startswith("\\"):
+            continue
+
+        if current is None or (old_left <= 0 and new_left <= 0):
+            # Between hunks: only here can "+++ " / "--- " be file headers; inside a
+            # hunk they are added / removed lines that start with "++" / "--"
+            current = None
+            if line.startswith("+++ "):
+                file_name = line[4:].split("\t")[0].strip().removeprefix("b/")
+                continue
+            header = _HUNK_HEADER.match(line)
+            if header:
+                old_lineno, old_left = int(header.group(1)), int(header.group(2) or 1)
+                new_lineno, new_left = int(header.group(3)), int(header.group(4) or 1)
+                current = Hunk(file_name, old_lineno, new_lineno, header.group(5).strip())
+                hunks.append(current)
+            continue
+
+        tag, text = (line[0], line[1:]) if line else (" ", "")
+        if tag == " ":
+            current.lines.append(DiffLine(tag, text, old_lineno, new_lineno))
+            old_lineno += 1
+            new_lineno += 1
+            old_left -= 1
+            new_left -= 1
+        elif tag == "-":
+            current.lines.append(DiffLine(tag, text, old_lineno, None))
+            old_lineno += 1
+            old_left -= 1
+        elif tag == "+":
+            current.lines.append(DiffLine(tag, text, None, new_lineno))
+            new_lineno += 1
+            new_left -= 1
+        else:
+            # The hunk is shorter than its header claims (a truncated diff)
+            current = None
+
+    return [hunk for hunk in hunks if any(line.tag != " " for line in hunk.lines)]
+
+
+def _changed_regions(hunk: Hunk, context_lines: int) -> list[list[DiffLine]]:
+    """
+    Splits a hunk into regions of changed lines plus at most `context_lines`
+    context lines on each side.
+    """
+    lines = hunk.lines
+    keep = [False] * len(lines)
+    for idx, line in enumerate(lines):
+        if line.tag != " ":
+            for near in range(max(0, idx - context_lines), min(len(lines), idx + context_lines + 1)):
+                keep[near] = True
+
+    regions: list[list[DiffLine]] = []
+    current: list[DiffLine] = []
+    for line, kept in zip(lines, keep, strict=True):
+        if kept:
+            current.append(line)
+        elif current:
+            regions.append(current)
+            current = []
+    if current:
+        regions.append(current)
+    return regions
+
+
+def _format_lineno(lineno: int | None, width: int) -> str:
+    return str(lineno).rjust(width) if lineno is not None else " " * width
+
+
+def format_changed_regions(diff: str | None, context_lines: int = 3) -> str | None:
+    """
+    Renders the changed regions of a unified diff with line number annotations.
+
+    Each line reads "<old> <new> <tag> <code>", e.g.:
+
+        12 12   def load(path):
+        13    -     data = open(path).read()
+           13 +     with open(path) as f:
+
+    Returns:
+        str | None: Annotated regions, or None if the diff has no parseable hunks
+    """
+    hunks = parse_unified_diff(diff)
+    if not hunks:
+        return None
+
+    context_lines = max(0, context_lines)
+    width = max(
+        len(str(number))
+        for hunk in hunks
+        for line in hunk.lines
+        for number in (line.old_lineno, line.new_lineno)
+        if number is not None
+    )
+
+    blocks = []
+    current_file = None
+    for hunk in hunks:
+        if hunk.file_name != current_file and hunk.file_name:
+            blocks.append(f"--- {hunk.file_name}")
+            current_file = hunk.file_name
+        for region in _changed_regions(hunk, context_lines):
+            first = region[0]
+            start = first.old_lineno if first.old_lineno is not None else first.new_lineno
+            title = f"@@ line {start}" + (f" ({hunk.section})" if hunk.section else "") + " @@"
+            body = "\n".join(
+                f"{_format_lineno(line.old_lineno, width)} {_format_lineno(line.new_lineno, width)} "
+                f"{line.tag} {line.text}"
+                for line in region
+            )
+            blocks.append(f"{title}\n{body}")
+
+    return "\n".join(blocks)
@@ -5,22 +5,50 @@ Feedback Data Extractor
 This script extracts feedback data from the code review database and exports it to a CSV file.
 It joins the feedback table with related review data to provide context for each feedback entry.
 
+Rows are streamed from a server-side cursor straight into the output file, so memory use
+stays flat however many days are exported.
+
+Columnar formats (Parquet, Arrow IPC; need `pyarrow`) dictionary-encode the low-cardinality
+columns. With --incremental they export only feedback newer than the watermark of the previous
+run, into date-partitioned files under the output directory.
+
 Usage:
-  python feedback_extractor.py [--output filename.csv] [--days 30] [--format csv|json]
+  python feedback_extractor.py [--output filename.csv] [--days 30] [--format csv|json|ndjson|parquet|arrow]
+  python feedback_extractor.py --incremental --format parquet --output feedback_export/
 """
 
 import argparse
 import csv
+import itertools
 import json
 import logging
 import os
 import sys
-from datetime import datetime, timedelta
+import time
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
+if __package__:
+    from .lru_cache import LRUCache
+    from .source_blobs import decompress
+else:
+    # Run as a script: make the src package importable
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from src.lru_cache import LRUCache
+    from src.source_blobs import decompress
+
+# Only the columnar formats need pyarrow; the text formats work without it
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
 logger = logging.getLogger("feedback-extractor")
@@ -37,6 +65,22 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 
 DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
+# Rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# Rows between progress log lines
+EXPORT_PROGRESS_EVERY = int(os.getenv("EXPORT_PROGRESS_EVERY", "10000"))
+# Decompressed sources kept for reuse (feedback rows of one review share them)
+_SOURCE_CACHE_SIZE = 64
+# Incremental exports skip feedback younger than this (seconds), so rows of transactions
+# still in flight when the export runs are not passed by the watermark
+EXPORT_WATERMARK_LAG = int(os.getenv("EXPORT_WATERMARK_LAG", "60"))
+
+# Incremental export state, kept in the output directory
+WATERMARK_FILE = "_watermark.json"
+# Columns with few distinct values, dictionary-encoded in the columnar formats
+DICTIONARY_COLUMNS = ("category_name", "user_feedback", "language", "job_status")
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
 
 def parse_arguments():
     """Parse command line arguments"""
@@ -46,7 +90,23 @@ def parse_arguments():
     )
     parser.add_argument("--days", type=int, default=30, help="Number of days of data to extract (default: 30)")
     parser.add_argument(
-        "--format", type=str, choices=["csv", "json"], default="csv", help="Output format (default: csv)"
+        "--format",
+        type=str,
+        choices=["csv", "json", "ndjson", *COLUMNAR_FORMATS],
+        default="csv",
+        help="Output format (default: csv); ndjson writes one JSON object per line, parquet/arrow need pyarrow",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Export only feedback added since the previous run (parquet/arrow; --output is a directory)",
+    )
+    parser.add_argument(
+        "--watermark-lag",
+        type=int,
+        default=EXPORT_WATERMARK_LAG,
+        help=f"Incremental mode: leave feedback younger than this many seconds for the next run "
+        f"(default: {EXPORT_WATERMARK_LAG})",
     )
     parser.add_argument(
         "--include-code",
@@ -54,24 +114,48 @@ def parse_arguments():
         help="Include source code in the export (warning: may create large files)",
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=EXPORT_BATCH_SIZE,
+        help=f"Rows fetched per database round trip (default: {EXPORT_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--progress-every",
+        type=int,
+        default=EXPORT_PROGRESS_EVERY,
+        help=f"Log progress every N rows, 0 to disable (default: {EXPORT_PROGRESS_EVERY})",
+    )
 
+    args = parser.parse_args()
+    if args.incremental and args.format not in COLUMNAR_FORMATS:
+        parser.error("--incremental needs --format parquet or arrow")
+    if args.format in COLUMNAR_FORMATS and pa is None:
+        parser.error(f"--format {args.format} needs pyarrow. Please `pip install pyarrow`.")
+    return args
 
-def get_feedback_data(session, days_ago, include_code=False):
+
+def get_feedback_data(session, days_ago, include_code=False, *, batch_size=EXPORT_BATCH_SIZE, after=None, until=None):
     """
     Query the database for feedback data with related review information
 
+    Rows are read through a server-side cursor, batch_size at a time, and
+    yielded one by one; only the current batch is held in memory.
+
     Args:
         session: SQLAlchemy database session
-        days_ago: Number of days of data to extract
+        days_ago: Number of days of data to extract (ignored when `after` is given)
         include_code: Whether to include source code in the export
+        batch_size: Rows fetched per round trip
+        after: Watermark (feedback created_at, feedback_id); only later feedback is
+            returned, oldest first (newest first otherwise). Replaces the days_ago
+            window, so no feedback after the watermark is skipped however long
+            ago the previous export ran
+        until: Only feedback created up to this time
 
     Returns:
-        List of dictionaries containing feedback data
+        Iterator of dictionaries containing feedback data
     """
-    # Calculate the date threshold
-    cutoff_date = datetime.utcnow() - timedelta(days=days_ago)
-
     # Build SQL query with appropriate joins
     sql = """
     SELECT 
@@ -90,7 +174,10 @@ def get_feedback_data(session, days_ago, include_code=False):
 
     # Conditionally include source code
     if include_code:
-        sql += ", r.source_code, r.diff"
+        sql += """,
+        src.blob_hash as source_blob, src.codec as source_codec, src.data as source_data,
+        dif.blob_hash as diff_blob, dif.codec as diff_codec, dif.data as diff_data
+        """
 
     sql += """
     FROM 
@@ -101,62 +188,373 @@ def get_feedback_data(session, days_ago, include_code=False):
         review_categories rc ON r.review_id = rc.review_id AND rf.category_name = rc.category_name
     LEFT JOIN 
         review_jobs j ON r.review_id = j.review_id
-    WHERE 
+    """
+
+    if include_code:
+        sql += """
+    LEFT JOIN
+        source_blobs src ON src.blob_hash = r.source_hash
+    LEFT JOIN
+        source_blobs dif ON dif.blob_hash = r.diff_hash
+    """
+
+    if after is not None:
+        # Incremental export: bounded by the watermark only
+        sql += """
+    WHERE
+        (rf.created_at, rf.feedback_id) > (:after_created_at, :after_feedback_id)
+    """
+        params = {"after_created_at": after[0], "after_feedback_id": after[1]}
+    else:
+        sql += """
+    WHERE
         rf.created_at >= :cutoff_date
-    ORDER BY 
+    """
+        params = {"cutoff_date": datetime.utcnow() - timedelta(days=days_ago)}
+
+    if until is not None:
+        sql += """
+        AND rf.created_at <= :until
+    """
+        params["until"] = until
+
+    # Incremental exports run oldest first, so the last row is the new watermark
+    if after is not None:
+        sql += """
+    ORDER BY
+        rf.created_at ASC, rf.feedback_id ASC
+    """
+    else:
+        sql += """
+    ORDER BY
         rf.created_at DESC
     """
 
-    # Execute the query
-    result = session.execute(text(sql), {"cutoff_date": cutoff_date})
+    # Execute the query with a server-side cursor
+    result = session.execute(text(sql), params, execution_options={"yield_per": batch_size})
 
-    # Convert to list of dictionaries
-    columns = result.keys()
-    rows = []
+    columns = list(result.keys())
+    sources = LRUCache(_SOURCE_CACHE_SIZE)
     for row in result:
-        rows.append(dict(zip(columns, row, strict=False)))
-
-    logger.info(f"Retrieved {len(rows)} feedback records from the database")
-    return rows
+        record = dict(zip(columns, row, strict=False))
+        if include_code:
+            # Source code and diff are stored compressed (see source_blobs.py)
+            for field, prefix in (("source_code", "source"), ("diff", "diff")):
+                blob_hash = record.pop(f"{prefix}_blob")
+                codec, data = record.pop(f"{prefix}_codec"), record.pop(f"{prefix}_data")
+                content = sources.get(blob_hash) if blob_hash is not None else None
+                if content is None and data is not None:
+                    content = decompress(codec, data).decode("utf-8")
+                    sources.put(blob_hash, content)
+                record[field] = content
+        yield record
+
+
+def with_progress(rows, every=EXPORT_PROGRESS_EVERY):
+    """Pass rows through, logging the count and rate every `every` rows"""
+    started = time.monotonic()
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        if every and count % every == 0:
+            elapsed = time.monotonic() - started
+            logger.info("Exported %s records (%.0f records/s)", count, count / elapsed)
+        yield row
+    logger.info("Retrieved %s feedback records from the database in %.1fs", count, time.monotonic() - started)
+
+
+def _peek(data: Iterable[dict]) -> tuple[dict | None, Iterator[dict]]:
+    """Returns the first row (None if there is none) and an iterator over all rows"""
+    rows = iter(data)
+    first = next(rows, None)
+    return first, itertools.chain([first], rows)
 
 
 def export_to_csv(data, filename):
-    """Export data to CSV file"""
-    if not data:
-        logger.warning("No data to export")
-        return False
+    """
+    Export data to CSV file, one row at a time
 
-    # Get field names from the first row
-    fieldnames = data[0].keys()
+    Returns:
+        Number of records written (0 if there was no data; no file is written then)
+    """
+    first, rows = _peek(data)
+    if first is None:
+        logger.warning("No data to export")
+        return 0
 
+    count = 0
     try:
-        with open(filename, "w", newline="") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        with Path(filename).open("w", newline="") as csvfile:
+            # Field names come from the first row
+            writer = csv.DictWriter(csvfile, fieldnames=first.keys())
             writer.writeheader()
-            writer.writerows(data)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
 
-        logger.info(f"Data exported to {filename}")
-        return True
-    except Exception as e:
-        logger.error(f"Error exporting to CSV: {e}")
-        return False
+    except Exception:
+        logger.exception("Error exporting to CSV after %s records", count)
+        return 0
+    else:
+        logger.info("Data exported to %s", filename)
+        return count
 
 
 def export_to_json(data, filename):
-    """Export data to JSON file"""
-    if not data:
+    """
+    Export data to a JSON array, one element at a time (same layout as json.dump(..., indent=2))
+
+    Returns:
+        Number of records written (0 if there was no data; no file is written then)
+    """
+    first, rows = _peek(data)
+    if first is None:
         logger.warning("No data to export")
-        return False
+        return 0
 
+    count = 0
     try:
-        with open(filename, "w") as jsonfile:
-            json.dump(data, jsonfile, default=str, indent=2)
+        with Path(filename).open("w") as jsonfile:
+            jsonfile.write("[")
+            for row in rows:
+                element = json.dumps(row, default=str, indent=2).replace("\n", "\n  ")
+                jsonfile.write(("\n  " if count == 0 else ",\n  ") + element)
+                count += 1
+            jsonfile.write("\n]")
+
+    except Exception:
+        logger.exception("Error exporting to JSON after %s records", count)
+        return 0
+    else:
+        logger.info("Data exported to %s", filename)
+        return count
+
+
+def export_to_ndjson(data, filename):
+    """
+    Export data as newline-delimited JSON (one object per line)
 
-        logger.info(f"Data exported to {filename}")
-        return True
-    except Exception as e:
-        logger.error(f"Error exporting to JSON: {e}")
-        return False
+    Returns:
+        Number of records written (0 if there was no data; no file is written then)
+    """
+    first, rows = _peek(data)
+    if first is None:
+        logger.warning("No data to export")
+        return 0
+
+    count = 0
+    try:
+        with Path(filename).open("w") as jsonfile:
+            for row in rows:
+                jsonfile.write(json.dumps(row, default=str) + "\n")
+                count += 1
+
+    except Exception:
+        logger.exception("Error exporting to NDJSON after %s records", count)
+        return 0
+    else:
+        logger.info("Data exported to %s", filename)
+        return count
+
+
+def _arrow_schema(columns):
+    """Arrow schema for the exported columns (dictionary-encoded where values repeat)"""
+    timestamp = pa.timestamp("us", tz="UTC")
+    types = {
+        "feedback_id": pa.int64(),
+        "feedback_created_at": timestamp,
+        "review_created_at": timestamp,
+        "category_message": pa.large_string(),
+        "source_code": pa.large_string(),
+        "diff": pa.large_string(),
+    }
+    for column in DICTIONARY_COLUMNS:
+        types[column] = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+
+class ColumnarWriter:
+    """
+    Buffers rows into Arrow record batches and writes them to a Parquet or Arrow IPC file.
+
+    Dictionaries grow across batches (each batch's dictionary extends the previous
+    one), which the IPC file format needs and keeps Parquet dictionary pages small.
+    """
+
+    def __init__(self, filename, fmt, columns, batch_size=EXPORT_BATCH_SIZE):
+        self.schema = _arrow_schema(columns)
+        self.batch_size = batch_size
+        self.count = 0
+        self._rows = []
+        self._dictionaries = {column: {} for column in DICTIONARY_COLUMNS if column in columns}
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(filename, self.schema, compression="zstd")
+        else:
+            options = pa.ipc.IpcWriteOptions(compression="zstd", emit_dictionary_deltas=True)
+            self._writer = pa.ipc.new_file(filename, self.schema, options=options)
+
+    def write(self, row):
+        self._rows.append(row)
+        self.count += 1
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        arrays = []
+        for field in self.schema:
+            values = [row.get(field.name) for row in self._rows]
+            if field.name in self._dictionaries:
+                dictionary = self._dictionaries[field.name]
+                indices = [
+                    None if value is None else dictionary.setdefault(value, len(dictionary)) for value in values
+                ]
+                arrays.append(
+                    pa.DictionaryArray.from_arrays(
+                        pa.array(indices, type=pa.int32()), pa.array(list(dictionary), type=pa.string())
+                    )
+                )
+            else:
+                if pa.types.is_string(field.type):
+                    values = [None if value is None else str(value) for value in values]
+                arrays.append(pa.array(values, type=field.type))
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def abort(self):
+        """Closes the file without writing the buffered rows (the caller removes it)"""
+        self._rows = []
+        try:
+            self._writer.close()
+        except Exception:
+            logger.debug("Error closing aborted %r", self._writer, exc_info=True)
+
+
+def export_to_columnar(data, filename, fmt, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Export data to a Parquet or Arrow IPC file, one record batch at a time
+
+    Returns:
+        Number of records written (0 if there was no data; no file is written then)
+    """
+    first, rows = _peek(data)
+    if first is None:
+        logger.warning("No data to export")
+        return 0
+
+    writer = None
+    try:
+        writer = ColumnarWriter(filename, fmt, list(first.keys()), batch_size)
+        for row in rows:
+            writer.write(row)
+        writer.close()
+    except Exception:
+        logger.exception("Error exporting to %s after %s records", fmt, writer.count if writer else 0)
+        # Do not leave a truncated file behind
+        if writer is not None:
+            writer.abort()
+        Path(filename).unlink(missing_ok=True)
+        return 0
+    else:
+        logger.info("Data exported to %s", filename)
+        return writer.count
+
+
+def load_watermark(output_dir):
+    """
+    Watermark of the previous incremental export in output_dir
+
+    Returns:
+        (feedback created_at, feedback_id) or None before the first export
+    """
+    path = Path(output_dir) / WATERMARK_FILE
+    if not path.exists():
+        return None
+    with path.open() as f:
+        state = json.load(f)
+    return datetime.fromisoformat(state["feedback_created_at"]), state["feedback_id"]
+
+
+def save_watermark(output_dir, watermark, rows):
+    """Atomically records the watermark (written last, after every data file is in place)"""
+    created_at, feedback_id = watermark
+    path = Path(output_dir) / WATERMARK_FILE
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w") as f:
+        json.dump(
+            {
+                "feedback_created_at": created_at.isoformat(),
+                "feedback_id": feedback_id,
+                "rows": rows,
+                "exported_at": datetime.now(UTC).isoformat(),
+            },
+            f,
+            indent=2,
+        )
+    tmp_path.replace(path)
+
+
+def export_incremental(data, output_dir, fmt, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Writes rows (oldest first, see get_feedback_data(after=...)) into files partitioned
+    by feedback date: <output_dir>/date=YYYY-MM-DD/part-<first feedback_id>.<ext>
+
+    Files are written under a temporary name and renamed once the whole run succeeded;
+    then the watermark advances. A run that failed midway is simply repeated by the
+    next one, which recreates the same file names.
+
+    Returns:
+        Number of records written
+    """
+    extension = COLUMNAR_FORMATS[fmt]
+    output_dir = Path(output_dir)
+    finished = []
+    writer = partition = None
+    last = None
+    count = 0
+    try:
+        for row in data:
+            day = row["feedback_created_at"].astimezone(UTC).date()
+            if day != partition:
+                if writer is not None:
+                    writer.close()
+                partition = day
+                target = output_dir / f"date={day.isoformat()}" / f"part-{row['feedback_id']}{extension}"
+                target.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = target.with_name(target.name + ".tmp")
+                writer = ColumnarWriter(tmp_path, fmt, list(row.keys()), batch_size)
+                finished.append((tmp_path, target))
+            writer.write(row)
+            last = row
+            count += 1
+        if writer is not None:
+            writer.close()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        for tmp_path, _target in finished:
+            tmp_path.unlink(missing_ok=True)
+        raise
+
+    for tmp_path, target in finished:
+        tmp_path.replace(target)
+    if last is not None:
+        save_watermark(output_dir, (last["feedback_created_at"], last["feedback_id"]), count)
+        logger.info("Exported %s new records into %s partition file(s) under %s", count, len(finished), output_dir)
+    return count
+
+
+EXPORTERS = {
+    "csv": export_to_csv,
+    "json": export_to_json,
+    "ndjson": export_to_ndjson,
+    "parquet": lambda data, filename: export_to_columnar(data, filename, "parquet"),
+    "arrow": lambda data, filename: export_to_columnar(data, filename, "arrow"),
+}
 
 
 def main():
@@ -174,17 +572,25 @@ def main():
         sys.exit(1)
 
     try:
-        # Get feedback data
-        data = get_feedback_data(session, args.days, args.include_code)
-
-        # Export data based on format
-        if args.format == "csv":
-            success = export_to_csv(data, args.output)
-        else:  # json
-            success = export_to_json(data, args.output)
-
-        if success:
-            logger.info(f"Successfully exported {len(data)} records to {args.output}")
+        if args.incremental:
+            # The watermark replaces --days after the first run
+            after = load_watermark(args.output) or (datetime.now(UTC) - timedelta(days=args.days), 0)
+            until = datetime.now(UTC) - timedelta(seconds=args.watermark_lag)
+            data = get_feedback_data(
+                session, args.days, args.include_code, batch_size=args.batch_size, after=after, until=until
+            )
+            data = with_progress(data, args.progress_every)
+            count = export_incremental(data, args.output, args.format, args.batch_size)
+            if not count:
+                logger.info("No new feedback since the previous export")
+            return
+
+        # Stream feedback data straight into the exporter for the requested format
+        data = get_feedback_data(session, args.days, args.include_code, batch_size=args.batch_size)
+        count = EXPORTERS[args.format](with_progress(data, args.progress_every), args.output)
+
+        if count:
+            logger.info("Successfully exported %s records to %s", count, args.output)
         else:
             logger.error("Failed to export data")
             sys.exit(1)
@@ -0,0 +1,175 @@
+"""
+job_events.py
+Job Change Notifications
+========================
+
+Wakes long-polling and WebSocket clients when a job changes state, so they do
+not have to poll the database.
+
+- notify_job_changed() issues a Postgres NOTIFY inside the transaction that
+  changes the job; Postgres delivers it on commit (and drops it on rollback)
+- Every API process holds one LISTEN connection (started on first use) and
+  dispatches notifications to its in-process subscribers, so changes made by
+  workers in any process or host reach every subscriber
+- Subscriptions are asyncio-based: JobSubscription.wait() returns as soon as
+  the job changed (or on timeout)
+
+Notifications only say *which* job changed; subscribers re-read the job. After
+the LISTEN connection was lost every subscriber is woken once, since changes
+may have been missed meanwhile.
+"""
+
+import asyncio
+import contextlib
+import logging
+import select
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from sqlalchemy import func
+from sqlalchemy import select as sql_select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+JOB_EVENTS_CHANNEL = "review_job_events"
+# Seconds before a lost LISTEN connection is re-established
+_RECONNECT_DELAY = 2.0
+# Seconds between stop checks of the listener thread
+_POLL_INTERVAL = 1.0
+
+
+def notify_job_changed(session: Session, *job_ids) -> None:
+    """
+    Queues a change notification for each job (None entries are skipped).
+    Must be called before the session commits the change.
+    """
+    for job_id in dict.fromkeys(str(job_id) for job_id in job_ids if job_id):
+        session.execute(sql_select(func.pg_notify(JOB_EVENTS_CHANNEL, job_id)))
+
+
+class JobSubscription:
+    """
+    Change signal for one job, bound to the subscriber's event loop.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+
+    def wake(self) -> None:
+        self.loop.call_soon_threadsafe(self._changed.set)
+
+    async def wait(self, seconds: float) -> bool:
+        """
+        Waits until the job changed since the previous wait().
+
+        Returns:
+            bool: True if it changed, False on timeout
+        """
+        try:
+            await asyncio.wait_for(self._changed.wait(), seconds)
+        except TimeoutError:
+            return False
+        self._changed.clear()
+        return True
+
+
+class JobEventBus:
+    """
+    Fans Postgres notifications out to in-process subscribers.
+    """
+
+    def __init__(self, channel: str = JOB_EVENTS_CHANNEL):
+        self.channel = channel
+        self._subscriptions: dict[str, set[JobSubscription]] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @contextmanager
+    def subscribe(self, job_id: str) -> Iterator[JobSubscription]:
+        """
+        Subscribes the running event loop to changes of a job. Subscribe before
+        reading the job, so a change between the read and the wait is not missed.
+        """
+        self._ensure_listener()
+        subscription = JobSubscription(str(job_id))
+        with self._lock:
+            self._subscriptions.setdefault(subscription.job_id, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                subscribers = self._subscriptions.get(subscription.job_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[subscription.job_id]
+
+    def dispatch(self, job_id: str | None = None) -> None:
+        """
+        Wakes the subscribers of a job (of every job if job_id is None).
+        """
+        with self._lock:
+            if job_id is None:
+                subscribers = [sub for subs in self._subscriptions.values() for sub in subs]
+            else:
+                subscribers = list(self._subscriptions.get(job_id, ()))
+        for subscription in subscribers:
+            # RuntimeError: the subscriber's loop is closed; it will unsubscribe itself
+            with contextlib.suppress(RuntimeError):
+                subscription.wake()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=_POLL_INTERVAL * 2)
+            self._thread = None
+
+    def _ensure_listener(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._listen_loop, name="job-events", daemon=True)
+                self._thread.start()
+
+    def _listen_loop(self) -> None:
+        connected_before = False
+        while not self._stop_event.is_set():
+            try:
+                self._listen(resync=connected_before)
+            except (psycopg2.Error, OSError) as e:
+                logger.warning("Lost LISTEN connection for job events; reconnecting: %s", e)
+            connected_before = True
+            self._stop_event.wait(_RECONNECT_DELAY)
+
+    def _listen(self, resync: bool) -> None:
+        from .database import DATABASE_URL
+
+        connection = psycopg2.connect(DATABASE_URL)
+        try:
+            connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            logger.info("Listening for job events on channel %s", self.channel)
+            if resync:
+                self.dispatch()
+
+            while not self._stop_event.is_set():
+                if select.select([connection], [], [], _POLL_INTERVAL) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    self.dispatch(connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
+
+job_events = JobEventBus()
@@ -0,0 +1,213 @@
+"""
+job_executor.py
+Background Job Executor
+=======================
+
+Pool of worker threads that process /v2/jobs reviews.
+
+Jobs live in the database (see services.claim_next_job): workers claim them
+with leases, keep the leases alive with heartbeats, and jobs whose lease
+expires (crashed worker, killed pod) are claimed again by any process.
+
+Configuration (environment):
+- JOB_WORKERS: number of worker threads, i.e. reviews processed concurrently per process
+- JOB_TIMEOUT_SECONDS: wall-clock limit per job (0 disables)
+- JOB_SHUTDOWN_TIMEOUT: seconds to wait for running jobs on shutdown
+- JOB_POLL_INTERVAL: seconds idle workers wait before polling the database again
+- JOB_HEARTBEAT_INTERVAL: seconds between lease renewals of running jobs
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+from collections.abc import Callable
+
+from .llm_engines.base import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "900"))
+JOB_SHUTDOWN_TIMEOUT = float(os.getenv("JOB_SHUTDOWN_TIMEOUT", "30"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "10"))
+
+
+class JobTimeoutError(Exception):
+    """Raised inside a job when it exceeds its wall-clock limit."""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Job {job_id} exceeded its time limit")
+        self.job_id = job_id
+
+
+class JobContext:
+    """
+    Per-job state handed to the job handler.
+
+    The handler passes `token` to the LLM engine and calls check() between units
+    of work (e.g. for every streamed token), so the job stops once it is canceled
+    or its deadline has passed.
+    """
+
+    def __init__(self, job_id: str, worker_id: str, timeout: float | None = None):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + timeout if timeout else None
+        self.token = CancellationToken()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def check(self) -> None:
+        if self.expired:
+            raise JobTimeoutError(self.job_id)
+        self.token.raise_if_canceled()
+
+
+class JobExecutor:
+    """
+    Fixed-size pool of worker threads claiming jobs from a durable store.
+
+    - claim(worker_id) returns (job_id, payload) or None when nothing is runnable
+    - heartbeat(worker_id, job_ids) renews the leases of the jobs running here and
+      returns the ids it could not renew (canceled or re-leased elsewhere), which
+      are then aborted locally
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, dict, JobContext], None],
+        claim: Callable[[str], tuple[str, dict] | None],
+        heartbeat: Callable[[str, list[str]], set[str]] | None = None,
+        *,
+        workers: int = JOB_WORKERS,
+        job_timeout: float | None = JOB_TIMEOUT_SECONDS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        heartbeat_interval: float = JOB_HEARTBEAT_INTERVAL,
+    ):
+        self.handler = handler
+        self.claim = claim
+        self.heartbeat = heartbeat
+        self.workers = max(1, workers)
+        self.job_timeout = job_timeout
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        # Lease owner identity of this process
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: dict[str, JobContext] = {}
+        self._threads: list[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Condition()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self._stop_event.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"review-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._supervisor_loop, name="review-supervisor", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Started %s review worker(s) as %s", self.workers, self.worker_id)
+
+    def notify(self) -> None:
+        """
+        Wakes an idle worker after a job was stored (other processes pick it up on their next poll).
+        """
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def cancel(self, job_id: str, reason: str = "canceled") -> bool:
+        """
+        Aborts a job running in this process (closes its LLM connection).
+
+        Returns:
+            bool: True if the job was running here
+        """
+        with self._lock:
+            context = self._running.get(job_id)
+        if context is None:
+            return False
+        logger.info("Aborting job %s (%s).", job_id, reason)
+        context.token.cancel(reason)
+        return True
+
+    def shutdown(self, timeout: float | None = JOB_SHUTDOWN_TIMEOUT) -> None:
+        """
+        Stops the workers. Running jobs get up to `timeout` seconds to finish;
+        unfinished jobs are picked up again once their lease expires.
+        """
+        self._stop_event.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        with self._lock:
+            threads, self._threads = self._threads, []
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in threads:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            thread.join(remaining)
+            if thread.is_alive():
+                logger.warning("%s did not finish before shutdown timeout", thread.name)
+        logger.info("Review workers stopped")
+
+    def _worker_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                claimed = self.claim(self.worker_id)
+            except Exception:
+                logger.exception("Failed to claim a job")
+                claimed = None
+
+            if claimed is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            job_id, payload = claimed
+            logger.info("Claimed job %s for processing.", job_id)
+            context = JobContext(job_id, self.worker_id, self.job_timeout)
+            with self._lock:
+                self._running[job_id] = context
+            try:
+                self.handler(job_id, payload, context)
+            except Exception:
+                logger.exception("Unhandled error while processing job %s", job_id)
+            finally:
+                with self._lock:
+                    self._running.pop(job_id, None)
+
+    def _supervisor_loop(self) -> None:
+        """
+        Aborts jobs past their deadline and renews the leases of running jobs.
+        """
+        interval = min(self.heartbeat_interval, 1.0)
+        last_heartbeat = time.monotonic()
+        while not self._stop_event.wait(interval):
+            with self._lock:
+                running = dict(self._running)
+
+            for job_id, context in running.items():
+                if context.expired and not context.token.canceled:
+                    # Interrupts generations blocked before their first token
+                    self.cancel(job_id, reason="timed out")
+
+            if self.heartbeat is None or not running or time.monotonic() - last_heartbeat < self.heartbeat_interval:
+                continue
+            last_heartbeat = time.monotonic()
+            try:
+                lost = self.heartbeat(self.worker_id, list(running))
+            except Exception:
+                logger.exception("Failed to renew job leases")
+                continue
+            for job_id in lost:
+                self.cancel(job_id, reason="canceled or re-leased")
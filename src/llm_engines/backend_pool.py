@@ -0,0 +1,389 @@
+"""
+llm_engines.backend_pool
+========================
+Ollama Backend Pool
+===================
+
+Routes generations across several Ollama servers.
+
+- Each request goes to the healthy backend with the fewest outstanding requests
+- Model affinity: only backends that have the model are eligible, and backends
+  that currently hold it in memory (/api/ps) are preferred, so requests do not
+  force a model load on a cold box
+- Active health checks (GET / and /api/tags) mark backends down and bring them
+  back automatically; a connection error during a request marks the backend
+  down until its next successful check
+- Backpressure: each backend has an adaptive concurrency limit, an optional
+  fixed cap and a circuit breaker (see limiter.py). When every backend is at its
+  limit the request is rejected with BackendSaturatedError, or waits for a slot
+  (job workers). Limits and caps apply to every request of the process
+  (synchronous reviews, streams and jobs alike)
+
+Configuration (environment):
+- OLLAMA_HOSTS: comma-separated backend URLs (falls back to OLLAMA_HOST)
+- OLLAMA_MODEL_AFFINITY: prefer backends with the model loaded (default true)
+- OLLAMA_ADAPTIVE_LIMIT: enable the adaptive concurrency limit (default true)
+- OLLAMA_BACKEND_LIMITS: optional per-backend caps on outstanding requests,
+  e.g. "http://ollama:11434=4,http://gpu2:11434=2"
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from http import HTTPStatus
+
+import requests
+
+from .base import GenerationCanceledError
+from .limiter import AdaptiveLimiter, CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_MODEL_AFFINITY = os.getenv("OLLAMA_MODEL_AFFINITY", "true").lower() == "true"
+OLLAMA_ADAPTIVE_LIMIT = os.getenv("OLLAMA_ADAPTIVE_LIMIT", "true").lower() == "true"
+OLLAMA_BACKEND_LIMITS = os.getenv("OLLAMA_BACKEND_LIMITS", "")
+
+# Seconds between on-demand health checks while every backend is down
+_RECHECK_INTERVAL = 5.0
+# Seconds between capacity re-evaluations of a waiting request
+_WAIT_POLL_INTERVAL = 0.5
+# Retry-After suggested when no backend is healthy
+_UNAVAILABLE_RETRY_AFTER = 10.0
+
+
+class NoOllamaHostsError(ValueError):
+    """Raised when a BackendPool is created without any backend."""
+
+    def __init__(self):
+        super().__init__("At least one Ollama host is required")
+
+
+class NoBackendAvailableError(RuntimeError):
+    """Raised when no healthy backend can serve the requested model."""
+
+    message = "No healthy Ollama backend available for model {model_name}"
+
+    def __init__(self, model_name: str, retry_after: float = _UNAVAILABLE_RETRY_AFTER):
+        super().__init__(self.message.format(model_name=model_name))
+        self.model_name = model_name
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(NoBackendAvailableError):
+    """Raised when the circuit breaker of every backend serving the model is open."""
+
+    message = "Circuit open for every Ollama backend serving model {model_name}"
+
+
+class BackendSaturatedError(NoBackendAvailableError):
+    """Raised when every backend that could serve the request is at its concurrency limit."""
+
+    message = "Every Ollama backend serving model {model_name} is at its concurrency limit"
+
+
+def parse_hosts(spec: str) -> list[str]:
+    """
+    Parses "http://a:11434, http://b:11434" into a list of URLs (without trailing slash).
+    """
+    return [host.strip().rstrip("/") for host in spec.split(",") if host.strip()]
+
+
+def parse_backend_limits(spec: str) -> dict[str, int]:
+    """
+    Parses "http://a:11434=4, http://b:11434=2" into {url: limit} (URLs as parse_hosts() returns them).
+    """
+    limits = {}
+    for raw_entry in spec.split(","):
+        entry = raw_entry.strip()
+        if not entry:
+            continue
+        backend, _, limit = entry.rpartition("=")
+        try:
+            limits[backend.strip().rstrip("/")] = max(1, int(limit))
+        except ValueError:
+            logger.warning("Ignoring invalid OLLAMA_BACKEND_LIMITS entry: %s", entry)
+    return limits
+
+
+class Backend:
+    """
+    State of one Ollama server.
+    """
+
+    def __init__(self, url: str, max_outstanding: int | None = None):
+        self.url = url
+        # Fixed cap on outstanding requests (OLLAMA_BACKEND_LIMITS), on top of the adaptive limit
+        self.max_outstanding = max_outstanding
+        self.up = False
+        self.models: set[str] = set()
+        self.loaded_models: set[str] = set()
+        self.outstanding = 0
+        self.last_error: str | None = None
+        self.limiter = AdaptiveLimiter()
+        self.breaker = CircuitBreaker()
+
+    def serves(self, model_name: str) -> bool:
+        return model_name in self.models
+
+    def below_cap(self) -> bool:
+        return self.max_outstanding is None or self.outstanding < self.max_outstanding
+
+    def __repr__(self) -> str:
+        return f"Backend({self.url}, up={self.up}, outstanding={self.outstanding})"
+
+
+class BackendPool:
+    """
+    Least-outstanding-requests balancer over Ollama backends.
+    """
+
+    def __init__(
+        self,
+        hosts: list[str],
+        session: requests.Session,
+        model_affinity: bool = OLLAMA_MODEL_AFFINITY,
+        adaptive_limit: bool = OLLAMA_ADAPTIVE_LIMIT,
+        limits: dict[str, int] | None = None,
+    ):
+        if not hosts:
+            raise NoOllamaHostsError
+        limits = parse_backend_limits(OLLAMA_BACKEND_LIMITS) if limits is None else limits
+        for url in limits.keys() - set(hosts):
+            logger.warning("OLLAMA_BACKEND_LIMITS names %s, which is not one of the Ollama hosts", url)
+        self.backends = [Backend(url, limits.get(url)) for url in hosts]
+        self.session = session
+        self.model_affinity = model_affinity
+        self.adaptive_limit = adaptive_limit
+        self._lock = threading.Lock()
+        # Notified whenever a backend may have become usable (slot released, backend up)
+        self._capacity = threading.Condition(self._lock)
+        self._last_check = -math.inf
+
+    # -----------------------------------------
+    # Health checks
+    # -----------------------------------------
+    def check(self, backend: Backend) -> None:
+        """
+        Runs the active health check of one backend and updates its state.
+        """
+        was_up = backend.up
+        try:
+            response = self.session.get(backend.url, timeout=5)
+            response.raise_for_status()
+            tags = self.session.get(f"{backend.url}/api/tags", timeout=5)
+            tags.raise_for_status()
+            models = {model.get("name") for model in tags.json().get("models", [])}
+            loaded = set()
+            if self.model_affinity:
+                try:
+                    ps = self.session.get(f"{backend.url}/api/ps", timeout=5)
+                    if ps.status_code == HTTPStatus.OK:
+                        loaded = {model.get("name") for model in ps.json().get("models", [])}
+                except requests.RequestException:
+                    pass
+        except (requests.RequestException, ValueError, AttributeError) as e:
+            with self._lock:
+                backend.up = False
+                backend.last_error = str(e)
+            if was_up:
+                logger.warning("Ollama backend %s is down: %s", backend.url, e)
+            return
+
+        with self._lock:
+            backend.up = True
+            backend.models = models
+            backend.loaded_models = loaded
+            backend.last_error = None
+            self._capacity.notify_all()
+        if not was_up:
+            logger.info("Ollama backend %s is up (%s models)", backend.url, len(models))
+
+    def check_all(self) -> None:
+        self._last_check = time.monotonic()
+        for backend in self.backends:
+            self.check(backend)
+
+    def mark_down(self, backend: Backend, error: Exception) -> None:
+        """
+        Passive health signal: takes a backend out of rotation after a connection
+        failure until the next successful health check.
+        """
+        with self._lock:
+            was_up, backend.up = backend.up, False
+            backend.last_error = str(error)
+        if was_up:
+            logger.warning("Ollama backend %s marked down: %s", backend.url, error)
+
+    # -----------------------------------------
+    # Routing
+    # -----------------------------------------
+    @property
+    def available(self) -> bool:
+        return any(backend.up for backend in self.backends)
+
+    def serves(self, model_name: str) -> bool:
+        return any(backend.up and backend.serves(model_name) for backend in self.backends)
+
+    def _select(self, model_name: str, exclude: set[str], reserve: bool = True) -> Backend:
+        candidates = [backend for backend in self.backends if backend.up and backend.url not in exclude]
+        with_model = [backend for backend in candidates if backend.serves(model_name)]
+        # Backends whose model list is unknown are still tried if none reports the model
+        candidates = with_model or candidates
+        if not candidates:
+            raise NoBackendAvailableError(model_name)
+
+        now = time.monotonic()
+        closed = [backend for backend in candidates if backend.breaker.can_attempt(now)]
+        if not closed:
+            retry_after = min(backend.breaker.retry_after(now) for backend in candidates)
+            raise CircuitOpenError(model_name, retry_after=max(1.0, retry_after))
+
+        # Each backend's outstanding requests count against its own limits only
+        free = [
+            backend
+            for backend in closed
+            if backend.below_cap() and (not self.adaptive_limit or backend.limiter.has_capacity(backend.outstanding))
+        ]
+        if not free:
+            retry_after = min(backend.limiter.retry_after() for backend in closed)
+            raise BackendSaturatedError(model_name, retry_after=retry_after)
+
+        def sort_key(backend: Backend) -> tuple:
+            cold = self.model_affinity and model_name not in backend.loaded_models
+            if self.adaptive_limit:
+                # Relative load, so backends with a higher limit (faster GPUs) take more requests
+                limit = min(backend.limiter.limit, backend.max_outstanding or math.inf)
+                load = backend.outstanding / limit
+            else:
+                load = backend.outstanding
+            return (load, cold)
+
+        backend = min(free, key=sort_key)
+        if reserve:
+            backend.breaker.on_attempt(now)
+        return backend
+
+    def check_capacity(self, model_name: str) -> None:
+        """
+        Admission check: raises the error acquire() would raise right now, without
+        reserving anything. Lets handlers reject a request before committing to a
+        response (e.g. a stream).
+        """
+        with self._lock:
+            self._select(model_name, set(), reserve=False)
+
+    @contextmanager
+    def acquire(
+        self,
+        model_name: str,
+        exclude: set[str] | None = None,
+        recheck: bool = True,
+        wait: bool = False,
+        interrupt: Callable[[], None] | None = None,
+    ) -> Iterator[Backend]:
+        """
+        Picks a backend for one request and counts the request as outstanding on it.
+
+        The outcome of the request feeds the backend's circuit breaker and
+        concurrency limit: leaving the block with an exception counts as a
+        failure, except for cancellations. Report the time to first response
+        byte with record_latency().
+
+        Args:
+            model_name: Model the request needs
+            exclude: Backend URLs not to use (e.g. one that just failed)
+            recheck: Run the health checks right away when every backend is down
+                (blocking; disabled on the event loop)
+            wait: Block until a backend can take the request instead of raising
+                (not when every backend is excluded)
+            interrupt: Called while waiting; raising from it stops waiting
+
+        Raises:
+            BackendSaturatedError: If every usable backend is at its concurrency limit
+            NoBackendAvailableError: If no healthy backend can take the request
+        """
+        exclude = exclude or set()
+        while True:
+            if recheck and not self.available and time.monotonic() - self._last_check >= _RECHECK_INTERVAL:
+                # Every backend is down: re-check now rather than waiting for the next health round
+                self.check_all()
+            with self._capacity:
+                try:
+                    backend = self._select(model_name, exclude)
+                    backend.outstanding += 1
+                    break
+                except NoBackendAvailableError:
+                    if not wait or all(backend.url in exclude for backend in self.backends):
+                        raise
+                    self._capacity.wait(_WAIT_POLL_INTERVAL)
+            if interrupt is not None:
+                interrupt()
+
+        started_at = time.monotonic()
+        try:
+            yield backend
+        except (GenerationCanceledError, GeneratorExit):
+            self._release(backend, started_at, canceled=True)
+            raise
+        except Exception:
+            self._release(backend, started_at, failed=True)
+            raise
+        except BaseException:
+            # asyncio.CancelledError, KeyboardInterrupt
+            self._release(backend, started_at, canceled=True)
+            raise
+        else:
+            self._release(backend, started_at)
+
+    def record_latency(self, backend: Backend, started_at: float) -> None:
+        """
+        Feeds the time from sending a request (time.monotonic() value) until the
+        backend started answering into the backend's concurrency limit.
+        """
+        if not self.adaptive_limit:
+            return
+        with self._lock:
+            backend.limiter.on_latency(started_at, time.monotonic() - started_at, backend.outstanding)
+
+    def _release(self, backend: Backend, started_at: float, failed: bool = False, canceled: bool = False) -> None:
+        now = time.monotonic()
+        with self._capacity:
+            backend.outstanding -= 1
+            was_state = backend.breaker.state
+            if canceled:
+                backend.breaker.on_cancel()
+            elif failed:
+                backend.breaker.on_failure(now)
+                backend.limiter.on_drop(started_at)
+            else:
+                backend.breaker.on_success()
+                backend.limiter.on_complete(now - started_at)
+            state = backend.breaker.state
+            self._capacity.notify_all()
+
+        if state != was_state and state == CircuitBreaker.OPEN:
+            logger.warning(
+                "Circuit opened for Ollama backend %s after %s failures", backend.url, backend.breaker.failures
+            )
+        elif state != was_state and state == CircuitBreaker.CLOSED:
+            logger.info("Circuit closed for Ollama backend %s", backend.url)
+
+    def status(self) -> list[dict]:
+        with self._lock:
+            return [
+                {
+                    "url": backend.url,
+                    "up": backend.up,
+                    "outstanding": backend.outstanding,
+                    "limit": int(backend.limiter.limit) if self.adaptive_limit else None,
+                    "maxOutstanding": backend.max_outstanding,
+                    "circuit": backend.breaker.state,
+                    "loadedModels": sorted(backend.loaded_models),
+                    "lastError": backend.last_error,
+                }
+                for backend in self.backends
+            ]
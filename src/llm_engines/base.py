@@ -7,9 +7,71 @@ Base Class for LLM Engines
 Defines an abstract base class for LLM engines, allowing easy swapping of implementations.
 """
 
+import logging
+import threading
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Callable, Iterator
 from typing import Any
 
+logger = logging.getLogger(__name__)
+
+
+class GenerationCanceledError(Exception):
+    """Raised by engines when a generation is aborted through its CancellationToken."""
+
+    def __init__(self, reason: str | None = None):
+        super().__init__(f"Generation {reason or 'canceled'}")
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    Cancellation signal shared between the caller and an engine.
+
+    Engines register callbacks (e.g. closing the HTTP connection to the LLM
+    server) that run as soon as cancel() is called from any thread.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self.reason: str | None = None
+
+    @property
+    def canceled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "canceled") -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Cancellation callback failed")
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Registers a callback; runs it immediately if already canceled."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_canceled(self) -> None:
+        if self._event.is_set():
+            raise GenerationCanceledError(self.reason)
+
 
 class BaseLLMEngine(ABC):
     """
@@ -17,8 +79,14 @@ class BaseLLMEngine(ABC):
 
     All LLM engines should inherit this interface and implement
     'generate_review' method.
+
+    Engines should set 'model_name' so results can be cached per model.
+    'context_window' (tokens) lets oversized inputs be split to fit the model.
     """
 
+    model_name: str | None = None
+    context_window: int | None = None
+
     @abstractmethod
     def generate_review(self, prompt_str: str) -> Any:
         """
@@ -34,3 +102,80 @@ class BaseLLMEngine(ABC):
         Any
             The raw inference (usually text) from the LLM.
         """
+
+    def stream_review(self, prompt_str: str, cancel_token: CancellationToken | None = None) -> Iterator[str]:
+        """
+        Streams the inference result as it is generated.
+
+        Engines that support token streaming should override this; the default
+        yields the whole result of 'generate_review' at once.
+
+        Parameters
+        ----------
+        prompt_str : str
+            The text prompt given to the LLM.
+        cancel_token : CancellationToken, optional
+            When canceled, the engine stops generating and raises GenerationCanceledError.
+
+        Yields
+        ------
+        str
+            Fragments of the raw inference text, in order.
+        """
+        if cancel_token is not None:
+            cancel_token.raise_if_canceled()
+        output = self.generate_review(prompt_str)
+        if cancel_token is not None:
+            cancel_token.raise_if_canceled()
+        yield output
+
+
+class AsyncBaseLLMEngine(ABC):
+    """
+    Abstract base class for asyncio-native LLM engines.
+
+    Same contract as BaseLLMEngine, but the request is awaited instead of
+    occupying a thread, so one process can hold many in-flight generations.
+    Canceling the awaiting task aborts the generation.
+    """
+
+    model_name: str | None = None
+    context_window: int | None = None
+
+    @abstractmethod
+    async def generate_review(self, prompt_str: str) -> Any:
+        """
+        Accepts a text prompt for the LLM and returns the inference result.
+
+        Parameters
+        ----------
+        prompt_str : str
+            The text prompt given to the LLM.
+
+        Returns
+        -------
+        Any
+            The raw inference (usually text) from the LLM.
+        """
+
+    async def stream_review(self, prompt_str: str) -> AsyncIterator[str]:
+        """
+        Streams the inference result as it is generated.
+
+        Engines that support token streaming should override this; the default
+        yields the whole result of 'generate_review' at once.
+
+        Parameters
+        ----------
+        prompt_str : str
+            The text prompt given to the LLM.
+
+        Yields
+        ------
+        str
+            Fragments of the raw inference text, in order.
+        """
+        yield await self.generate_review(prompt_str)
+
+    async def aclose(self) -> None:  # noqa: B027 - optional hook, a no-op for engines without connections
+        """Releases connections held by the engine."""
@@ -0,0 +1,179 @@
+"""
+llm_engines.limiter
+========================
+Adaptive Concurrency Limit and Circuit Breaker
+==============================================
+
+Flow control for one LLM backend.
+
+- AdaptiveLimiter: AIMD concurrency limit. Every completed request whose time
+  to first response byte stays close to the lowest recently observed one adds
+  ~1/limit to the limit (about +1 per round of requests); a slow response, an
+  error or a timeout multiplies it by the backoff factor (at most once per round
+  trip, like TCP congestion control). Ollama only answers once a parallel slot
+  picked the request up, so queueing inside Ollama shows up as latency and the
+  limit settles at what the GPU actually serves.
+- CircuitBreaker: opens after consecutive failures, rejects requests for a
+  cool-down period, then lets a single probe request through (half-open)
+  that decides whether to close it again.
+
+Neither class is thread-safe on its own; BackendPool guards them with its lock.
+
+Configuration (environment):
+- OLLAMA_LIMIT_INITIAL / OLLAMA_LIMIT_MIN / OLLAMA_LIMIT_MAX: concurrency limit per backend
+- OLLAMA_LIMIT_LATENCY_TOLERANCE: latency above baseline x tolerance (+ slack) counts as congestion
+- OLLAMA_LIMIT_LATENCY_SLACK: absolute slack in seconds (absorbs prompt-size differences)
+- OLLAMA_LIMIT_BACKOFF: multiplicative decrease factor
+- OLLAMA_BREAKER_FAILURES: consecutive failures that open the circuit
+- OLLAMA_BREAKER_RESET: seconds the circuit stays open before a probe
+"""
+
+import logging
+import math
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_LIMIT_INITIAL = int(os.getenv("OLLAMA_LIMIT_INITIAL", "4"))
+OLLAMA_LIMIT_MIN = int(os.getenv("OLLAMA_LIMIT_MIN", "1"))
+OLLAMA_LIMIT_MAX = int(os.getenv("OLLAMA_LIMIT_MAX", "64"))
+OLLAMA_LIMIT_LATENCY_TOLERANCE = float(os.getenv("OLLAMA_LIMIT_LATENCY_TOLERANCE", "2.0"))
+OLLAMA_LIMIT_LATENCY_SLACK = float(os.getenv("OLLAMA_LIMIT_LATENCY_SLACK", "1.0"))
+OLLAMA_LIMIT_BACKOFF = float(os.getenv("OLLAMA_LIMIT_BACKOFF", "0.5"))
+OLLAMA_BREAKER_FAILURES = int(os.getenv("OLLAMA_BREAKER_FAILURES", "5"))
+OLLAMA_BREAKER_RESET = float(os.getenv("OLLAMA_BREAKER_RESET", "30"))
+
+# Latency samples after which the baseline is re-learned (lets it rise when prompts get larger)
+_BASELINE_WINDOW = 100
+# Weight of the newest sample in the average request duration
+_DURATION_SMOOTHING = 0.2
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial: int = OLLAMA_LIMIT_INITIAL,
+        min_limit: int = OLLAMA_LIMIT_MIN,
+        max_limit: int = OLLAMA_LIMIT_MAX,
+        tolerance: float = OLLAMA_LIMIT_LATENCY_TOLERANCE,
+        slack: float = OLLAMA_LIMIT_LATENCY_SLACK,
+        backoff: float = OLLAMA_LIMIT_BACKOFF,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.tolerance = tolerance
+        self.slack = slack
+        self.backoff = backoff
+        self.baseline: float | None = None
+        self.avg_duration: float | None = None
+        self._window_min = math.inf
+        self._window_count = 0
+        self._last_decrease = -math.inf
+
+    def has_capacity(self, inflight: int) -> bool:
+        return inflight < int(self.limit)
+
+    def on_latency(self, started_at: float, latency: float, inflight: int) -> None:
+        """
+        Feeds the time to first response byte of a request.
+
+        Args:
+            started_at: time.monotonic() when the request was sent
+            latency: Seconds until the backend started answering
+            inflight: Requests in flight on the backend, this one included
+        """
+        self._window_min = min(self._window_min, latency)
+        self._window_count += 1
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        if self._window_count >= _BASELINE_WINDOW:
+            self.baseline = self._window_min
+            self._window_min, self._window_count = math.inf, 0
+
+        if latency > self.baseline * self.tolerance + self.slack:
+            self._decrease(started_at)
+        elif inflight * 2 >= self.limit:
+            # Only grow while the limit is actually being used
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_drop(self, started_at: float) -> None:
+        """An error or timeout: back off."""
+        self._decrease(started_at)
+
+    def on_complete(self, duration: float) -> None:
+        if self.avg_duration is None:
+            self.avg_duration = duration
+        else:
+            self.avg_duration += _DURATION_SMOOTHING * (duration - self.avg_duration)
+
+    def retry_after(self) -> float:
+        """Rough seconds until a slot frees up."""
+        if self.avg_duration is None:
+            return 1.0
+        return max(1.0, self.avg_duration / max(1, int(self.limit)))
+
+    def _decrease(self, started_at: float) -> None:
+        # Requests sent before the last decrease were sent under the old limit; their
+        # congestion signal has already been acted on
+        if started_at < self._last_decrease:
+            return
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._last_decrease = time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures; open -> half-open
+    after `reset_timeout` seconds; half-open -> closed (or open again) by one probe.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = OLLAMA_BREAKER_FAILURES, reset_timeout: float = OLLAMA_BREAKER_RESET):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def can_attempt(self, now: float) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return now >= self.opened_at + self.reset_timeout
+        return not self._probing
+
+    def on_attempt(self, now: float) -> None:
+        if self.state == self.OPEN and now >= self.opened_at + self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            self._probing = True
+
+    def on_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def on_failure(self, now: float) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = now
+        self._probing = False
+
+    def on_cancel(self) -> None:
+        # A canceled probe proves nothing; let the next request probe instead
+        self._probing = False
+
+    def retry_after(self, now: float) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - now)
@@ -10,15 +10,27 @@ We instruct the LLM to return a JSON list of categories with fields:
 Possible categories: [General Feedback, Memory Management, Performance, Null Check, Security, Coding Standard, etc.].
 """
 
+import asyncio
+import contextlib
+import json
 import logging
 import os
+import socket
 import subprocess
-import requests
-import json
+import threading
 import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+from http import HTTPStatus
 from typing import Any
 
-from .base import BaseLLMEngine
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.chunking import REVIEW_CONTEXT_TOKENS
+
+from .backend_pool import Backend, BackendPool, NoBackendAvailableError, parse_hosts
+from .base import AsyncBaseLLMEngine, BaseLLMEngine, CancellationToken, GenerationCanceledError
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +39,19 @@ DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
 
 # Default Ollama host
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://ollama:11434")
+# Comma-separated list of Ollama servers to balance across (overrides OLLAMA_HOST)
+OLLAMA_HOSTS = os.getenv("OLLAMA_HOSTS", "")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "deepseek-r1:70b")
 
+# Max keep-alive connections kept open to Ollama by the shared engine
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "16"))
+# Seconds between background health / model-availability refreshes
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "30"))
+# Max concurrent connections of the async engine (in-flight /v2/review requests)
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "512"))
+# Context window requested from Ollama (num_ctx); 0 uses REVIEW_CONTEXT_TOKENS, the window chunking plans for
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "0"))
+
 # Automatically detect and set all available GPUs
 try:
     gpu_count = int(subprocess.getoutput("nvidia-smi -L | wc -l").strip())  # Get GPU count
@@ -47,42 +70,82 @@ class OllamaEngine(BaseLLMEngine):
     Class to perform LLM inference using Ollama with multi-GPU support.
     """
 
-    def __init__(self):
-        """Initialize the Ollama engine and check availability."""
-        self.ollama_available = self.check_ollama_available()
-        self.model_available = self.check_model_available() if self.ollama_available else False
-        
+    def __init__(self, health_interval: float = OLLAMA_HEALTH_INTERVAL):
+        """
+        Initialize the Ollama engine and check availability.
+
+        Prefer get_ollama_engine(), which returns a process-wide instance, over
+        constructing engines per request.
+        """
+        self.model_name = os.getenv("OLLAMA_MODEL", OLLAMA_MODEL)
+        hosts = parse_hosts(os.getenv("OLLAMA_HOSTS", OLLAMA_HOSTS) or os.getenv("OLLAMA_HOST", OLLAMA_HOST))
+        self.host = hosts[0]
+        self.context_window = OLLAMA_NUM_CTX or REVIEW_CONTEXT_TOKENS
+
+        # Pooled keep-alive session shared by all requests made through this engine
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(hosts), pool_maxsize=OLLAMA_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool = BackendPool(hosts, self.session)
+
+        self.ollama_available = False
+        self.model_available = False
+        self.refresh_health()
+
         if self.ollama_available:
-            logger.info(f"Connected to Ollama at {OLLAMA_HOST}")
+            logger.info("Connected to Ollama at %s", ", ".join(hosts))
             if self.model_available:
-                logger.info(f"Model {OLLAMA_MODEL} is available")
+                logger.info("Model %s is available", self.model_name)
             else:
-                logger.warning(f"Model {OLLAMA_MODEL} is not available at Ollama endpoint")
+                logger.warning("Model %s is not available at Ollama endpoint", self.model_name)
         else:
-            logger.warning(f"Ollama service not available at {OLLAMA_HOST}")
+            logger.warning("Ollama service not available at %s", ", ".join(hosts))
+
+        self._stop_event = threading.Event()
+        self._health_thread = None
+        if health_interval > 0:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, args=(health_interval,), name="ollama-health", daemon=True
+            )
+            self._health_thread.start()
+
+    def refresh_health(self) -> None:
+        """Re-run the availability checks of all backends and cache the results on the engine."""
+        was_available = (self.ollama_available, self.model_available)
+        self.pool.check_all()
+        self.ollama_available = self.pool.available
+        self.model_available = self.pool.serves(self.model_name)
+
+        if (self.ollama_available, self.model_available) != was_available:
+            logger.info(
+                "Ollama health changed: service=%s, model %s=%s",
+                self.ollama_available,
+                self.model_name,
+                self.model_available,
+            )
+
+    def _health_loop(self, interval: float) -> None:
+        while not self._stop_event.wait(interval):
+            try:
+                self.refresh_health()
+            except Exception:
+                logger.exception("Ollama health refresh failed")
+
+    def close(self) -> None:
+        """Stop the health thread and release pooled connections."""
+        self._stop_event.set()
+        self.session.close()
 
     def check_ollama_available(self) -> bool:
-        """Check if Ollama service is available."""
-        try:
-            response = requests.get(f"{OLLAMA_HOST}", timeout=5)
-            return response.status_code == 200
-        except Exception as e:
-            logger.warning(f"Error connecting to Ollama: {e}")
-            return False
-            
+        """Check if at least one Ollama backend is available."""
+        self.pool.check_all()
+        return self.pool.available
+
     def check_model_available(self) -> bool:
-        """Check if the required model is available in Ollama."""
-        try:
-            response = requests.get(f"{OLLAMA_HOST}/api/tags", timeout=5)
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                for model in models:
-                    if model.get("name") == OLLAMA_MODEL:
-                        return True
-            return False
-        except Exception as e:
-            logger.warning(f"Error checking model availability: {e}")
-            return False
+        """Check if the required model is available on at least one healthy backend."""
+        self.pool.check_all()
+        return self.pool.serves(self.model_name)
 
     def generate_review(self, prompt_str: str) -> Any:
         """
@@ -103,43 +166,338 @@ class OllamaEngine(BaseLLMEngine):
         RuntimeError
             If Ollama API call fails.
         """
+        output = "".join(self.stream_review(prompt_str))
+
+        if DEBUG_MODE:
+            logger.debug("[OllamaEngine] Raw Output Length: %s characters", len(output))
+            logger.debug("[OllamaEngine] Full Response:\n%s", output)
+
+        return output
+
+    def stream_review(self, prompt_str: str, cancel_token: CancellationToken | None = None) -> Iterator[str]:
+        """
+        Perform streaming inference using the Ollama API.
+
+        The NDJSON body of /api/generate is consumed line by line as it arrives,
+        so tokens are yielded without waiting for the full generation. The request
+        goes to the pool backend with the fewest outstanding requests; if it cannot
+        be reached, the backend is marked down and the next one is tried. While
+        every backend is at its concurrency limit the call waits for a free slot
+        (this engine serves the job workers, which should queue rather than fail).
+
+        Parameters
+        ----------
+        prompt_str : str
+            A string instructing the LLM to produce JSON with multiple categories.
+        cancel_token : CancellationToken, optional
+            Canceling it closes the connection to Ollama, which stops the generation
+            and frees the GPU slot right away.
+
+        Yields
+        ------
+        str
+            Response fragments in generation order.
+
+        Raises
+        ------
+        RuntimeError
+            If Ollama API call fails.
+        NoBackendAvailableError
+            If no healthy backend can serve the model.
+        GenerationCanceledError
+            If the token was canceled.
+        """
+        if DEBUG_MODE:
+            logger.debug("[OllamaEngine] Sending Prompt to API:\n%s", prompt_str)
+
+        model_name = self.model_name
+        failed: set[str] = set()
+        interrupt = cancel_token.raise_if_canceled if cancel_token is not None else None
         try:
-            if DEBUG_MODE:
-                logger.debug(f"[OllamaEngine] Sending Prompt to API:\n{prompt_str}")
-            
-            # Get model name from environment or use default
-            model_name = os.getenv("OLLAMA_MODEL", "deepseek-r1:70b")
-            host = os.getenv("OLLAMA_HOST", "http://ollama:11434")
-            
-            logger.info(f"Sending request to Ollama API for model {model_name}")
-            
-            # Make API request
-            response = requests.post(
-                f"{host}/api/generate",
-                json={"model": model_name, "prompt": prompt_str},
-                timeout=600  # 10 minute timeout
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Failed API call with status code {response.status_code}: {response.text}")
-                raise RuntimeError(f"Ollama API call failed with status {response.status_code}")
-            
-            # Process streaming response
-            output = ""
-            for line in response.text.strip().split('\n'):
+            while True:
+                backend = response = None
                 try:
-                    data = json.loads(line)
-                    if "response" in data:
-                        output += data["response"]
-                except json.JSONDecodeError:
-                    logger.warning(f"Could not parse JSON line: {line}")
-            
-            if DEBUG_MODE:
-                logger.debug(f"[OllamaEngine] Raw Output Length: {len(output)} characters")
-                logger.debug(f"[OllamaEngine] Full Response:\n{output}")
-
-            return output
+                    with self.pool.acquire(model_name, exclude=failed, wait=True, interrupt=interrupt) as backend:
+                        logger.info("Sending request to Ollama API at %s for model %s", backend.url, model_name)
+                        started_at = time.monotonic()
+                        response = self.session.post(
+                            f"{backend.url}/api/generate",
+                            json=_generate_payload(model_name, prompt_str, self.context_window),
+                            timeout=600,  # 10 minute timeout
+                            stream=True,
+                        )
+                        self.pool.record_latency(backend, started_at)
+                        yield from _consume_stream(response, cancel_token)
+                        return
+                except requests.ConnectionError as e:
+                    if response is not None:
+                        raise
+                    # Nothing was generated yet, so another backend can take over
+                    self.pool.mark_down(backend, e)
+                    failed.add(backend.url)
+
+        except GenerationCanceledError:
+            logger.info("Ollama generation canceled; connection closed.")
+            raise
+
+        except NoBackendAvailableError as e:
+            logger.warning("Ollama request rejected: %s", e)
+            raise
 
         except Exception as e:
             logger.exception(f"Error while running Ollama: {e}")
-            raise 
\ No newline at end of file
+            raise
+
+
+def _consume_stream(response: requests.Response, cancel_token: CancellationToken | None) -> Iterator[str]:
+    """
+    Yields the response fragments of a streaming /api/generate response and
+    closes it when done (or when the token is canceled).
+    """
+
+    def abort() -> None:
+        _abort_response(response)
+
+    if cancel_token is not None:
+        cancel_token.add_callback(abort)
+
+    try:
+        if response.status_code != HTTPStatus.OK:
+            logger.error("Failed API call with status code %s: %s", response.status_code, response.text)
+            raise RuntimeError(f"Ollama API call failed with status {response.status_code}")
+
+        try:
+            yield from _stream_lines(response.iter_lines(), cancel_token)
+        except Exception:
+            # A canceled token aborts the connection, which surfaces as a read error
+            if cancel_token is not None:
+                cancel_token.raise_if_canceled()
+            raise
+    finally:
+        if cancel_token is not None:
+            cancel_token.remove_callback(abort)
+        # Closing the connection also stops generation if the consumer went away
+        response.close()
+
+
+def _stream_lines(lines: Iterable[str | bytes], cancel_token: CancellationToken | None = None) -> Iterator[str]:
+    """
+    Yields the response fragments of streamed NDJSON lines up to the final (done) line.
+    """
+    for line in lines:
+        if cancel_token is not None:
+            cancel_token.raise_if_canceled()
+        text, done = _parse_stream_line(line)
+        if text:
+            yield text
+        if done:
+            break
+
+
+def _generate_payload(model_name: str, prompt_str: str, context_window: int) -> dict:
+    # Always request the window the prompt was budgeted for; Ollama's own default is
+    # smaller and silently truncates longer prompts
+    return {"model": model_name, "prompt": prompt_str, "stream": True, "options": {"num_ctx": context_window}}
+
+
+def _parse_stream_line(line: str | bytes) -> tuple[str, bool]:
+    """
+    Parses one NDJSON line of a streaming /api/generate response.
+
+    Returns:
+        tuple[str, bool]: (response fragment, done flag)
+    """
+    if not line:
+        return "", False
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError:
+        logger.warning("Could not parse JSON line: %s", line)
+        return "", False
+
+    if "error" in data:
+        raise RuntimeError(f"Ollama API returned an error: {data['error']}")
+    return data.get("response") or "", bool(data.get("done"))
+
+
+def _abort_response(response: requests.Response) -> None:
+    """
+    Closes a streaming response from another thread.
+
+    Shutting the socket down wakes a reader blocked in recv(); Ollama then sees the
+    client disconnect and stops generating.
+    """
+    connection = getattr(response.raw, "connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        with contextlib.suppress(OSError):
+            sock.shutdown(socket.SHUT_RDWR)
+    response.close()
+
+
+class _SharedEngines:
+    """
+    The process-wide engines. The sync engine is created under `lock`; the async
+    one is only touched by the event loop thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sync: OllamaEngine | None = None
+        self.async_: AsyncOllamaEngine | None = None
+
+
+_shared = _SharedEngines()
+
+
+def get_ollama_engine() -> OllamaEngine:
+    """
+    Returns the process-wide OllamaEngine, creating it on first use.
+
+    The shared engine keeps a pooled keep-alive HTTP session and refreshes its
+    health checks in the background, so requests do not pay for them.
+    """
+    if _shared.sync is None:
+        with _shared.lock:
+            if _shared.sync is None:
+                _shared.sync = OllamaEngine()
+    return _shared.sync
+
+
+class AsyncOllamaEngine(AsyncBaseLLMEngine):
+    """
+    asyncio counterpart of OllamaEngine built on httpx.AsyncClient.
+
+    Generations are awaited on the event loop instead of blocking a thread.
+    Backends are picked from the shared OllamaEngine's pool, whose background
+    health checks also track availability; this engine only generates.
+    """
+
+    def __init__(self):
+        self.model_name = os.getenv("OLLAMA_MODEL", OLLAMA_MODEL)
+        self.pool = get_ollama_engine().pool
+        self.host = self.pool.backends[0].url
+        self.context_window = OLLAMA_NUM_CTX or REVIEW_CONTEXT_TOKENS
+        # The client's connections belong to the loop that created it
+        self.loop = asyncio.get_running_loop()
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(600.0, connect=10.0),  # 10 minutes between chunks
+            limits=httpx.Limits(max_connections=OLLAMA_MAX_CONNECTIONS, max_keepalive_connections=OLLAMA_POOL_SIZE),
+        )
+
+    async def generate_review(self, prompt_str: str) -> Any:
+        """
+        Perform inference using the Ollama API.
+
+        Returns
+        -------
+        str
+            The raw inference result from Ollama API.
+        """
+        output = "".join([chunk async for chunk in self.stream_review(prompt_str)])
+
+        if DEBUG_MODE:
+            logger.debug("[AsyncOllamaEngine] Raw Output Length: %s characters", len(output))
+        return output
+
+    async def stream_review(self, prompt_str: str) -> AsyncIterator[str]:
+        """
+        Perform streaming inference using the Ollama API.
+
+        Canceling the consuming task (or closing the generator) closes the
+        connection, which stops the generation on the Ollama side.
+
+        Yields
+        ------
+        str
+            Response fragments in generation order.
+
+        Raises
+        ------
+        RuntimeError
+            If Ollama API call fails.
+        BackendSaturatedError
+            If every backend is at its concurrency limit (the request is shed, not queued).
+        NoBackendAvailableError
+            If no healthy backend can serve the model.
+        """
+        if DEBUG_MODE:
+            logger.debug("[AsyncOllamaEngine] Sending Prompt to API:\n%s", prompt_str)
+
+        failed: set[str] = set()
+        try:
+            while True:
+                backend = None
+                try:
+                    with self.pool.acquire(self.model_name, exclude=failed, recheck=False) as backend:
+                        async for text in self._stream_from(backend, prompt_str):
+                            yield text
+                        return
+                except httpx.ConnectError as e:
+                    # Raised before any response byte, so another backend can take over
+                    self.pool.mark_down(backend, e)
+                    failed.add(backend.url)
+
+        except asyncio.CancelledError:
+            logger.info("Ollama generation canceled; connection closed.")
+            raise
+
+        except NoBackendAvailableError as e:
+            logger.warning("Ollama request rejected: %s", e)
+            raise
+
+        except Exception:
+            logger.exception("Error while running Ollama")
+            raise
+
+    async def _stream_from(self, backend: Backend, prompt_str: str) -> AsyncIterator[str]:
+        """
+        Streams one generation from an acquired backend.
+        """
+        logger.info("Sending request to Ollama API at %s for model %s", backend.url, self.model_name)
+        started_at = time.monotonic()
+        async with self.client.stream(
+            "POST",
+            f"{backend.url}/api/generate",
+            json=_generate_payload(self.model_name, prompt_str, self.context_window),
+        ) as response:
+            self.pool.record_latency(backend, started_at)
+            if response.status_code != HTTPStatus.OK:
+                body = await response.aread()
+                logger.error("Failed API call with status code %s: %r", response.status_code, body)
+                raise RuntimeError(f"Ollama API call failed with status {response.status_code}")
+
+            async for line in response.aiter_lines():
+                text, done = _parse_stream_line(line)
+                if text:
+                    yield text
+                if done:
+                    break
+
+    def check_capacity(self) -> None:
+        """
+        Raises BackendSaturatedError / NoBackendAvailableError if a request sent
+        now would be rejected.
+        """
+        self.pool.check_capacity(self.model_name)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+def get_async_ollama_engine() -> AsyncOllamaEngine:
+    """
+    Returns the AsyncOllamaEngine of the running event loop, creating it on first use.
+
+    Must be called from a coroutine. Only the event loop thread touches it, so
+    no lock is needed.
+    """
+    if _shared.async_ is None or _shared.async_.loop is not asyncio.get_running_loop():
+        _shared.async_ = AsyncOllamaEngine()
+    return _shared.async_
+
+
+async def close_async_ollama_engine() -> None:
+    engine, _shared.async_ = _shared.async_, None
+    if engine is not None and engine.loop is asyncio.get_running_loop():
+        await engine.aclose()
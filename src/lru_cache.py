@@ -0,0 +1,68 @@
+"""
+lru_cache.py
+Thread-safe LRU Cache
+=====================
+
+Small in-process LRU map used for immutable API responses (e.g. finished
+jobs) and the memory tier of the review result cache, so repeated reads are
+answered without touching Postgres.
+
+Entries optionally expire ttl seconds after they were stored. Cached values are
+shared between callers and must be treated as read-only.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache[K, V]:
+    """
+    Bounded mapping that evicts the least recently used entry.
+
+    Args:
+        max_size: Maximum number of entries (0 disables the cache)
+        ttl: Optional lifetime of an entry in seconds, counted from when it was stored
+    """
+
+    def __init__(self, max_size: int, ttl: float | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        # Values with the wall-clock time (time.time()) they were stored at
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: K, value: V, stored_at: float | None = None) -> None:
+        """
+        Stores a value. `stored_at` (a time.time() value) backdates the entry,
+        e.g. for a value loaded from a slower tier that was created earlier.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() if stored_at is None else stored_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
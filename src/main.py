@@ -8,23 +8,28 @@ Main Entry Point
 import logging
 import sys
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 from .api import router as review_router
-from .database import engine
-from .models_db import Base
+from .database import DB_AUTO_MIGRATE, upgrade_database
+from .job_events import job_events
+from .llm_engines.ollama_engine import close_async_ollama_engine, get_async_ollama_engine, get_ollama_engine
+from .services import job_executor
 from .schemas import CliArgs
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s : %(message)s")
 
-# Create tables if they do not already exist
-Base.metadata.create_all(bind=engine)
+# Bring the schema up to date (sh/startup.sh migrates before the API starts)
+if DB_AUTO_MIGRATE:
+    upgrade_database()
 
 # Set up static files and templates directories
 static_dir = Path(__file__).parent / "static"
@@ -386,6 +391,7 @@ if not custom_docs_path.exists():
         <li><code>POSTGRES_HOST</code>: Database host</li>
         <li><code>POSTGRES_PORT</code>: Database port</li>
         <li><code>OLLAMA_HOST</code>: URL for Ollama service</li>
+        <li><code>OLLAMA_HOSTS</code>: Comma-separated Ollama URLs to load-balance across (overrides <code>OLLAMA_HOST</code>)</li>
         <li><code>OLLAMA_MODEL</code>: Model name to use for code reviews</li>
     </ul>
     
@@ -396,6 +402,20 @@ if not custom_docs_path.exists():
 </html>
         """)
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Warm up the shared Ollama engine so the first review does not pay for its health checks
+    await run_in_threadpool(get_ollama_engine)
+    get_async_ollama_engine()
+    yield
+    # Let running reviews finish before the engine's connections are closed
+    await run_in_threadpool(job_executor.shutdown)
+    await run_in_threadpool(job_events.stop)
+    get_ollama_engine().close()
+    await close_async_ollama_engine()
+
+
 # Create FastAPI app with metadata
 app = FastAPI(
     title="LLM Code Review API",
@@ -403,6 +423,7 @@ app = FastAPI(
     version="1.0",
     docs_url=None,  # Disable default docs
     redoc_url=None,  # Disable ReDoc
+    lifespan=lifespan,
 )
 
 app.include_router(review_router)
@@ -0,0 +1,52 @@
+"""
+migrations/env.py
+Alembic Environment
+===================
+
+Runs the migrations in src/migrations/versions against the review database.
+The URL is taken from (in order) `alembic -x url=...`, sqlalchemy.url in
+alembic.ini / the Config object, or src/database.py.
+"""
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from src.database import DATABASE_URL
+from src.models_db import Base
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def _database_url() -> str:
+    url = context.get_x_argument(as_dictionary=True).get("url") or config.get_main_option("sqlalchemy.url")
+    return url or DATABASE_URL
+
+
+def run_migrations_offline() -> None:
+    """Emits the migration SQL instead of running it (`alembic upgrade head --sql`)."""
+    context.configure(url=_database_url(), target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        # Connection handed over by database.upgrade_database()
+        context.configure(connection=connection, target_metadata=target_metadata, transaction_per_migration=True)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(_database_url(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, transaction_per_migration=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
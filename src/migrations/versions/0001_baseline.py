@@ -0,0 +1,86 @@
+"""Baseline schema (the tables the service shipped with)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 00:00:00
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0001"
+down_revision: str | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "models",
+        sa.Column("model_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("name", sa.String(length=150), nullable=False),
+        sa.Column("version", sa.String(length=50), nullable=True),
+        sa.Column("hosted_by", sa.String(length=100), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("model_id"),
+    )
+    op.create_table(
+        "reviews",
+        sa.Column("review_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("language", sa.String(length=50), nullable=False),
+        sa.Column("source_code", sa.Text(), nullable=False),
+        sa.Column("diff", sa.Text(), nullable=True),
+        sa.Column("file_name", sa.String(length=255), nullable=True),
+        sa.Column("options", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("model_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.ForeignKeyConstraint(["model_id"], ["models.model_id"]),
+        sa.PrimaryKeyConstraint("review_id"),
+    )
+    op.create_table(
+        "review_jobs",
+        sa.Column("job_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("queued", "in_progress", "completed", "canceled", "error", name="job_status"),
+            nullable=False,
+        ),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("completed_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("review_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.ForeignKeyConstraint(["review_id"], ["reviews.review_id"]),
+        sa.PrimaryKeyConstraint("job_id"),
+    )
+    op.create_table(
+        "review_categories",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("review_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("category_name", sa.String(length=100), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["review_id"], ["reviews.review_id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "review_feedback",
+        sa.Column("feedback_id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("review_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("category_name", sa.String(length=100), nullable=False),
+        sa.Column("user_feedback", sa.String(length=10), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["review_id"], ["reviews.review_id"]),
+        sa.PrimaryKeyConstraint("feedback_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("review_feedback")
+    op.drop_table("review_categories")
+    op.drop_table("review_jobs")
+    op.drop_table("reviews")
+    op.drop_table("models")
+    sa.Enum(name="job_status").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,77 @@
+"""Durable job queue columns and the review result cache table
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 00:00:00
+
+Databases created with Base.metadata.create_all() before migrations existed are
+stamped at 0001 by database.upgrade_database(); depending on their age they may
+already have some of these columns, so every step checks first.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0002"
+down_revision: str | None = "0001"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+_JOB_COLUMNS = [
+    sa.Column("payload", sa.JSON(), nullable=True),
+    sa.Column("lease_owner", sa.String(length=255), nullable=True),
+    sa.Column("lease_expires_at", sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column("heartbeat_at", sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+    sa.Column("priority", sa.SmallInteger(), server_default="1", nullable=False),
+    sa.Column("client_id", sa.String(length=255), nullable=True),
+    sa.Column("is_batch", sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.Column("parent_job_id", postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column("batch_index", sa.Integer(), nullable=True),
+    sa.Column("request_key", sa.String(length=64), nullable=True),
+]
+
+
+def upgrade() -> None:
+    if op.get_context().as_sql:
+        # Offline SQL generation (--sql) cannot inspect; assume a database at 0001
+        columns, foreign_keys, indexes, has_cache_table = set(), [], set(), False
+    else:
+        inspector = sa.inspect(op.get_bind())
+        columns = {column["name"] for column in inspector.get_columns("review_jobs")}
+        foreign_keys = [fk["constrained_columns"] for fk in inspector.get_foreign_keys("review_jobs")]
+        indexes = {index["name"] for index in inspector.get_indexes("review_jobs")}
+        has_cache_table = inspector.has_table("review_result_cache")
+
+    for column in _JOB_COLUMNS:
+        if column.name not in columns:
+            op.add_column("review_jobs", column)
+    if ["parent_job_id"] not in foreign_keys:
+        op.create_foreign_key(
+            "review_jobs_parent_job_id_fkey", "review_jobs", "review_jobs", ["parent_job_id"], ["job_id"]
+        )
+    if "ix_review_jobs_request_key" not in indexes:
+        op.create_index("ix_review_jobs_request_key", "review_jobs", ["request_key"])
+
+    if not has_cache_table:
+        op.create_table(
+            "review_result_cache",
+            sa.Column("cache_key", sa.String(length=64), nullable=False),
+            sa.Column("model_name", sa.String(length=150), nullable=True),
+            sa.Column("categories", sa.JSON(), nullable=False),
+            sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+            sa.Column("last_hit_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+            sa.Column("hit_count", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("cache_key"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("review_result_cache")
+    op.drop_index("ix_review_jobs_request_key", table_name="review_jobs")
+    op.drop_constraint("review_jobs_parent_job_id_fkey", "review_jobs", type_="foreignkey")
+    for column in reversed(_JOB_COLUMNS):
+        op.drop_column("review_jobs", column.name)
@@ -0,0 +1,46 @@
+"""Indexes for the foreign keys and filters the API queries by
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 00:00:00
+
+- review_categories.review_id / review_feedback.review_id: loading a review's
+  categories and feedback, and the cascading deletes from reviews
+- review_feedback.created_at: feedback export and statistics by time range
+- review_jobs.review_id: job lookup by review
+- review_jobs.status: queue claims and status listings
+- review_jobs.parent_job_id: batch status aggregation
+
+Built with CREATE INDEX CONCURRENTLY so existing deployments keep serving writes
+while the indexes are built.
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+revision: str = "0003"
+down_revision: str | None = "0002"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+_INDEXES = [
+    ("ix_review_categories_review_id", "review_categories", "review_id"),
+    ("ix_review_feedback_review_id", "review_feedback", "review_id"),
+    ("ix_review_feedback_created_at", "review_feedback", "created_at"),
+    ("ix_review_jobs_review_id", "review_jobs", "review_id"),
+    ("ix_review_jobs_status", "review_jobs", "status"),
+    ("ix_review_jobs_parent_job_id", "review_jobs", "parent_job_id"),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, column in _INDEXES:
+            op.create_index(name, table, [column], if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _column in _INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
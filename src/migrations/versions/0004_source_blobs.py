@@ -0,0 +1,186 @@
+"""Content-addressed, compressed storage for review source code and diffs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 00:00:00
+
+Moves reviews.source_code / reviews.diff into the source_blobs table (one row
+per distinct content, compressed) and replaces them with source_hash /
+diff_hash. Existing rows are converted in batches. With --sql (no live
+connection to compress with) the conversion is emitted as plain SQL that stores
+the blobs uncompressed (codec "none"); they are read the same way.
+
+The hashing and compression helpers are a frozen copy of src/source_blobs.py as
+of this revision (zlib only, whatever SOURCE_BLOB_COMPRESSION says), so the
+migration does not change when the application code does.
+
+Dropping the columns does not shrink the reviews table on disk; run
+VACUUM FULL reviews (or pg_repack) afterwards to reclaim the space.
+"""
+
+import hashlib
+import logging
+import zlib
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import insert
+
+revision: str = "0004"
+down_revision: str | None = "0003"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+logger = logging.getLogger(__name__)
+
+_BATCH_SIZE = 500
+_ZLIB_LEVEL = 6
+_MIN_COMPRESS_SIZE = 256
+
+source_blobs = sa.table(
+    "source_blobs",
+    sa.column("blob_hash", sa.String),
+    sa.column("codec", sa.String),
+    sa.column("size", sa.Integer),
+    sa.column("data", sa.LargeBinary),
+)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def compress(raw: bytes) -> tuple[str, bytes]:
+    if len(raw) < _MIN_COMPRESS_SIZE:
+        return "none", raw
+    data = zlib.compress(raw, _ZLIB_LEVEL)
+    if len(data) >= len(raw):
+        return "none", raw
+    return "zlib", data
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "none":
+        return bytes(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown source blob codec {codec!r}")
+
+
+def _convert_reviews(bind) -> None:
+    last_id = None
+    converted = 0
+    while True:
+        query = sa.text(
+            "SELECT review_id, source_code, diff FROM reviews"
+            " WHERE source_hash IS NULL AND (:last_id IS NULL OR review_id > :last_id)"
+            " ORDER BY review_id LIMIT :limit"
+        )
+        rows = bind.execute(query, {"last_id": last_id, "limit": _BATCH_SIZE}).all()
+        if not rows:
+            break
+
+        blobs, updates = {}, []
+        for review_id, source_code, diff in rows:
+            hashes = []
+            for content in (source_code, diff):
+                if content is None:
+                    hashes.append(None)
+                    continue
+                blob_hash = content_hash(content)
+                if blob_hash not in blobs:
+                    raw = content.encode("utf-8")
+                    codec, data = compress(raw)
+                    blobs[blob_hash] = {"blob_hash": blob_hash, "codec": codec, "size": len(raw), "data": data}
+                hashes.append(blob_hash)
+            updates.append({"review_id": review_id, "source_hash": hashes[0], "diff_hash": hashes[1]})
+
+        bind.execute(insert(source_blobs).values(list(blobs.values())).on_conflict_do_nothing())
+        bind.execute(
+            sa.text(
+                "UPDATE reviews SET source_hash = :source_hash, diff_hash = :diff_hash WHERE review_id = :review_id"
+            ),
+            updates,
+        )
+        converted += len(rows)
+        last_id = rows[-1][0]
+    if converted:
+        logger.info("Moved the source code of %s reviews into source_blobs", converted)
+
+
+def _convert_reviews_sql() -> None:
+    op.execute(
+        """
+        INSERT INTO source_blobs (blob_hash, codec, size, data)
+        SELECT DISTINCT encode(sha256(content), 'hex'), 'none', octet_length(content), content
+        FROM (
+            SELECT convert_to(source_code, 'UTF8') AS content FROM reviews WHERE source_code IS NOT NULL
+            UNION ALL
+            SELECT convert_to(diff, 'UTF8') FROM reviews WHERE diff IS NOT NULL
+        ) contents
+        ON CONFLICT DO NOTHING
+        """
+    )
+    op.execute(
+        """
+        UPDATE reviews SET
+            source_hash = encode(sha256(convert_to(source_code, 'UTF8')), 'hex'),
+            diff_hash = CASE WHEN diff IS NOT NULL THEN encode(sha256(convert_to(diff, 'UTF8')), 'hex') END
+        """
+    )
+
+
+def upgrade() -> None:
+    op.create_table(
+        "source_blobs",
+        sa.Column("blob_hash", sa.String(length=64), nullable=False),
+        sa.Column("codec", sa.String(length=10), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("blob_hash"),
+    )
+    op.add_column("reviews", sa.Column("source_hash", sa.String(length=64), nullable=True))
+    op.add_column("reviews", sa.Column("diff_hash", sa.String(length=64), nullable=True))
+
+    if op.get_context().as_sql:
+        _convert_reviews_sql()
+    else:
+        _convert_reviews(op.get_bind())
+
+    op.alter_column("reviews", "source_hash", nullable=False)
+    op.create_foreign_key("reviews_source_hash_fkey", "reviews", "source_blobs", ["source_hash"], ["blob_hash"])
+    op.create_foreign_key("reviews_diff_hash_fkey", "reviews", "source_blobs", ["diff_hash"], ["blob_hash"])
+    op.drop_column("reviews", "source_code")
+    op.drop_column("reviews", "diff")
+
+
+def downgrade() -> None:
+    op.add_column("reviews", sa.Column("source_code", sa.Text(), nullable=True))
+    op.add_column("reviews", sa.Column("diff", sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    hashes = bind.execute(sa.text("SELECT blob_hash FROM source_blobs")).scalars().all()
+    for start in range(0, len(hashes), _BATCH_SIZE):
+        rows = bind.execute(
+            sa.text("SELECT blob_hash, codec, data FROM source_blobs WHERE blob_hash = ANY(:hashes)"),
+            {"hashes": hashes[start : start + _BATCH_SIZE]},
+        )
+        contents = [
+            {"blob_hash": blob_hash, "content": decompress(codec, data).decode("utf-8")}
+            for blob_hash, codec, data in rows
+        ]
+        bind.execute(sa.text("UPDATE reviews SET source_code = :content WHERE source_hash = :blob_hash"), contents)
+        bind.execute(sa.text("UPDATE reviews SET diff = :content WHERE diff_hash = :blob_hash"), contents)
+
+    op.alter_column("reviews", "source_code", nullable=False)
+    op.drop_constraint("reviews_diff_hash_fkey", "reviews", type_="foreignkey")
+    op.drop_constraint("reviews_source_hash_fkey", "reviews", type_="foreignkey")
+    op.drop_column("reviews", "diff_hash")
+    op.drop_column("reviews", "source_hash")
+    op.drop_table("source_blobs")
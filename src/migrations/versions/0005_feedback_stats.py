@@ -0,0 +1,55 @@
+"""Feedback counters per category, language and model
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 00:00:00
+
+Adds reviews.model_name and the feedback_stats table, backfilled from the
+existing feedback (whose reviews have no recorded model, so model_name "").
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0005"
+down_revision: str | None = "0004"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("reviews", sa.Column("model_name", sa.String(length=150), nullable=True))
+    op.create_table(
+        "feedback_stats",
+        sa.Column("category_name", sa.String(length=100), nullable=False),
+        sa.Column("language", sa.String(length=50), nullable=False),
+        sa.Column("model_name", sa.String(length=150), nullable=False),
+        sa.Column("good_count", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("bad_count", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("total_count", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("category_name", "language", "model_name"),
+    )
+    # Feedback values are normalized as in services._count_feedback (str.strip().lower())
+    op.execute(
+        """
+        INSERT INTO feedback_stats (category_name, language, model_name, good_count, bad_count, total_count)
+        SELECT rf.category_name, r.language, COALESCE(r.model_name, ''),
+               COUNT(*) FILTER (WHERE rf.verdict = 'good'),
+               COUNT(*) FILTER (WHERE rf.verdict = 'bad'),
+               COUNT(*)
+        FROM (
+            SELECT review_id, category_name, lower(trim(E' \\t\\n\\r\\f\\v' FROM user_feedback)) AS verdict
+            FROM review_feedback
+        ) rf
+        JOIN reviews r ON r.review_id = rf.review_id
+        GROUP BY rf.category_name, r.language, COALESCE(r.model_name, '')
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("feedback_stats")
+    op.drop_column("reviews", "model_name")
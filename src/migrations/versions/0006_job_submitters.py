@@ -0,0 +1,28 @@
+"""Submitter count of deduplicated review jobs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00
+
+Adds review_jobs.submitters: how many submissions share a pending job since
+identical reviews are deduplicated. A cancel only cancels the job once every
+submitter has canceled it.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0006"
+down_revision: str | None = "0005"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("review_jobs", sa.Column("submitters", sa.Integer(), server_default="1", nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column("review_jobs", "submitters")
@@ -9,14 +9,30 @@ Defines tables for:
 - ReviewCategories
 - ReviewFeedback
 - Models
+- ReviewResultCache
+- SourceBlobs
+- FeedbackStats
 """
 
 import uuid
 
-from sqlalchemy import JSON, TIMESTAMP, BigInteger, Column, Enum, ForeignKey, String, Text
+from sqlalchemy import (
+    JSON,
+    TIMESTAMP,
+    BigInteger,
+    Boolean,
+    Column,
+    Enum,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    SmallInteger,
+    String,
+    Text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import declarative_base, relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import false, func
 
 Base = declarative_base()
 
@@ -30,6 +46,15 @@ class ReviewJobs(Base):
     - created_at: auto
     - completed_at: set on finish
     - review_id: references the Reviews table
+    - payload: the ReviewRequest to process (durable queue)
+    - lease_owner / lease_expires_at / heartbeat_at: worker lease, renewed while processing
+    - attempts: how many times the job was claimed
+    - priority: scheduling class (0 interactive, 1 normal, 2 batch)
+    - client_id: submitting client identity, used for fair-share scheduling
+    - is_batch: parent job of a batch (no payload, status aggregated from its children)
+    - parent_job_id / batch_index: position of a file job inside its batch
+    - request_key: review cache key of the payload, used to deduplicate identical pending jobs
+    - submitters: submissions sharing this job (deduplicated ones included); canceled once all of them cancel
     """
 
     __tablename__ = "review_jobs"
@@ -39,12 +64,27 @@ class ReviewJobs(Base):
         Enum("queued", "in_progress", "completed", "canceled", "error", name="job_status"),
         nullable=False,
         default="queued",
+        index=True,
     )
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
     completed_at = Column(TIMESTAMP(timezone=True), nullable=True)
-    review_id = Column(UUID(as_uuid=True), ForeignKey("reviews.review_id"), nullable=True)
+    review_id = Column(UUID(as_uuid=True), ForeignKey("reviews.review_id"), nullable=True, index=True)
+    payload = Column(JSON, nullable=True)
+    lease_owner = Column(String(255), nullable=True)
+    lease_expires_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    heartbeat_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    priority = Column(SmallInteger, nullable=False, default=1, server_default="1")
+    client_id = Column(String(255), nullable=True)
+    is_batch = Column(Boolean, nullable=False, default=False, server_default=false())
+    parent_job_id = Column(UUID(as_uuid=True), ForeignKey("review_jobs.job_id"), nullable=True, index=True)
+    batch_index = Column(Integer, nullable=True)
+    request_key = Column(String(64), nullable=True, index=True)
+    submitters = Column(Integer, nullable=False, default=1, server_default="1")
 
     review = relationship("Reviews", back_populates="job")
+    parent = relationship("ReviewJobs", back_populates="children", remote_side=[job_id])
+    children = relationship("ReviewJobs", back_populates="parent", order_by=batch_index)
 
 
 class Reviews(Base):
@@ -53,24 +93,26 @@ class Reviews(Base):
     -------------
     - review_id: Unique ID
     - language
-    - source_code
-    - diff
+    - source_hash: the reviewed source code (SourceBlobs)
+    - diff_hash: the diff, if any (SourceBlobs)
     - file_name
     - options
     - created_at
     - model_id (optional)
+    - model_name: LLM that produced the review
     """
 
     __tablename__ = "reviews"
 
     review_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, nullable=False)
     language = Column(String(50), nullable=False)
-    source_code = Column(Text, nullable=False)
-    diff = Column(Text, nullable=True)
+    source_hash = Column(String(64), ForeignKey("source_blobs.blob_hash"), nullable=False)
+    diff_hash = Column(String(64), ForeignKey("source_blobs.blob_hash"), nullable=True)
     file_name = Column(String(255), nullable=True)
     options = Column(JSON, nullable=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
     model_id = Column(UUID(as_uuid=True), ForeignKey("models.model_id"), nullable=True)
+    model_name = Column(String(150), nullable=True)
 
     job = relationship("ReviewJobs", back_populates="review", uselist=False)
 
@@ -92,7 +134,7 @@ class ReviewCategories(Base):
     __tablename__ = "review_categories"
 
     id = Column(BigInteger, primary_key=True, autoincrement=True)
-    review_id = Column(UUID(as_uuid=True), ForeignKey("reviews.review_id"), nullable=False)
+    review_id = Column(UUID(as_uuid=True), ForeignKey("reviews.review_id"), nullable=False, index=True)
     category_name = Column(String(100), nullable=False)
     message = Column(Text, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
@@ -114,10 +156,10 @@ class ReviewFeedback(Base):
     __tablename__ = "review_feedback"
 
     feedback_id = Column(BigInteger, primary_key=True, autoincrement=True)
-    review_id = Column(UUID(as_uuid=True), ForeignKey("reviews.review_id"), nullable=False)
+    review_id = Column(UUID(as_uuid=True), ForeignKey("reviews.review_id"), nullable=False, index=True)
     category_name = Column(String(100), nullable=False)
     user_feedback = Column(String(10), nullable=False)
-    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False, index=True)
 
     review = relationship("Reviews", back_populates="feedbacks")
 
@@ -137,3 +179,71 @@ class Models(Base):
     hosted_by = Column(String(100), nullable=True)
     description = Column(Text, nullable=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+
+class ReviewResultCache(Base):
+    """
+    ReviewResultCache Table
+    -----------------------
+    Persistent tier of the review result cache.
+    - cache_key: sha256 of language, source, diff, prompt settings and model
+    - model_name
+    - categories: parsed LLM output ([{category, message}, ...])
+    - created_at: used for TTL eviction
+    - last_hit_at: used for size eviction (least recently hit goes first)
+    - hit_count
+    """
+
+    __tablename__ = "review_result_cache"
+
+    cache_key = Column(String(64), primary_key=True, nullable=False)
+    model_name = Column(String(150), nullable=True)
+    categories = Column(JSON, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    last_hit_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    hit_count = Column(Integer, nullable=False, default=0)
+
+
+class SourceBlobs(Base):
+    """
+    SourceBlobs Table
+    -----------------
+    Content-addressed storage for source code and diffs (see source_blobs.py).
+    - blob_hash: sha256 of the uncompressed content
+    - codec: zstd, zlib or none
+    - size: uncompressed size in bytes
+    - data: compressed content
+    - created_at
+    """
+
+    __tablename__ = "source_blobs"
+
+    blob_hash = Column(String(64), primary_key=True, nullable=False)
+    codec = Column(String(10), nullable=False)
+    size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+
+class FeedbackStats(Base):
+    """
+    FeedbackStats Table
+    -------------------
+    Feedback counters per category, language and model, maintained by
+    save_feedback() in the transaction that stores the feedback.
+    - category_name
+    - language
+    - model_name: "" when the review's model is unknown
+    - good_count / bad_count / total_count (total includes other values)
+    - updated_at
+    """
+
+    __tablename__ = "feedback_stats"
+
+    category_name = Column(String(100), primary_key=True, nullable=False)
+    language = Column(String(50), primary_key=True, nullable=False)
+    model_name = Column(String(150), primary_key=True, nullable=False)
+    good_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+    bad_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+    total_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,252 @@
+"""
+prompt_template.py
+Prompt Template
+===============
+
+Precompiled review prompt built from config.json.
+
+Everything in the prompt that only depends on config.json (category list,
+instructions with {categories} filled in, formatting rules, output language)
+is rendered once into a static prefix and suffix; per request only the
+language and code are interpolated.
+
+config.json is watched by mtime: get_prompt_template() stats the file at most
+every CONFIG_CHECK_INTERVAL seconds and rebuilds the template when it changed,
+so categories or preferred_language can be edited without a restart. An
+invalid file is logged and the previous template stays in use.
+
+Requests may narrow the review to a subset of the categories, listed directly
+or by a named profile from config.json (category_profiles). The suffix of each
+subset is compiled on first use and kept in a small LRU cache.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+from .lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = Path(__file__).parent / "config.json"
+# Seconds between config.json modification checks (0 checks on every request)
+CONFIG_CHECK_INTERVAL = float(os.getenv("CONFIG_CHECK_INTERVAL", "2"))
+
+# Always part of a category subset: the instructions require a summary entry
+GENERAL_CATEGORY = "General Feedback"
+# Compiled suffixes of category subsets kept per template
+_SUBSET_CACHE_SIZE = 64
+
+
+class UnknownCategoryProfileError(ValueError):
+    """Raised when a request names a category profile that config.json does not define."""
+
+    def __init__(self, profile: str, available: Iterable[str]):
+        super().__init__(
+            f"Unknown category profile {profile!r} (available: {', '.join(available) or 'none configured'})"
+        )
+        self.profile = profile
+
+
+class UnknownCategoriesError(ValueError):
+    """Raised when a request names review categories that config.json does not define."""
+
+    def __init__(self, names: list[str]):
+        super().__init__(f"Unknown review categories: {', '.join(names)}")
+        self.names = names
+
+
+class PromptTemplate:
+    """
+    Review prompt compiled from a config.json dict.
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.categories: list[str] = list(config.get("categories", []))
+        self.prompt_mode: str = config.get("prompt_mode", "full")
+        self.diff_context_lines = config.get("diff_context_lines", 3)
+
+        self.category_profiles: dict[str, list[str]] = {
+            name: self.select_categories(categories)
+            for name, categories in config.get("category_profiles", {}).items()
+        }
+
+        # Format guidelines
+        format_guidelines = config.get("format_guidelines", {})
+        formatting_instructions = []
+        if format_guidelines.get("use_markdown", False):
+            formatting_instructions.append("- Use markdown for inline code (`code`) and code blocks.")
+        if format_guidelines.get("include_line_numbers", False):
+            formatting_instructions.append("- Reference specific line numbers where applicable.")
+        self._formatting_str = "\n".join(formatting_instructions)
+        self._max_length = format_guidelines.get("max_response_length", 1000)
+
+        preferred_language = config.get("preferred_language", "English")
+        self._language_str = (
+            f"\n\nPlease respond in {preferred_language}." if preferred_language.lower() != "english" else ""
+        )
+
+        self.prefix = f"### Code Review Request ({config.get('review_depth', 'Deep')} Analysis)\n#### Language: "
+        self.suffix = self._compile_suffix(self.categories)
+        self._subset_suffixes: LRUCache[tuple[str, ...], str] = LRUCache(_SUBSET_CACHE_SIZE)
+
+        # Identifies the prompt-shaping settings in review cache keys
+        settings = {
+            "instructions": config.get("instructions", ""),
+            "categories": self.categories,
+            "review_depth": config.get("review_depth", "Deep"),
+            "format_guidelines": format_guidelines,
+            "preferred_language": preferred_language,
+        }
+        self.fingerprint = hashlib.sha256(
+            json.dumps(settings, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+    def _compile_suffix(self, categories: list[str]) -> str:
+        categories_str = ", ".join(categories)
+        instructions = self.config.get("instructions", "").replace("{categories}", categories_str)
+        return (
+            f"### Categories of Interest:\n{categories_str}\n\n"
+            f"### Review Guidelines:\n"
+            f"{instructions}\n\n"
+            f"{self._formatting_str}\n"
+            f"- Ensure response length does not exceed {self._max_length} characters.\n"
+            f"- Return only valid JSON as output."
+            f"{self._language_str}"
+        )
+
+    def select_categories(
+        self, categories: Iterable[str] | str | None = None, profile: str | None = None
+    ) -> list[str]:
+        """
+        Resolves a category subset (names matched case-insensitively) and/or a
+        named profile into configured category names, in config.json order.
+        "General Feedback" is always included when it is configured.
+
+        Args:
+            categories: Category names (a list or a comma-separated string)
+            profile: Name of a profile in category_profiles
+
+        Returns:
+            list[str]: The selected categories (all of them if neither is given)
+
+        Raises:
+            UnknownCategoryProfileError: If the profile is not configured
+            UnknownCategoriesError: If a category is not configured
+        """
+        if isinstance(categories, str):
+            categories = categories.split(",")
+        if categories is None and profile is None:
+            return list(self.categories)
+
+        known = {name.casefold(): name for name in self.categories}
+        selected = {GENERAL_CATEGORY} if GENERAL_CATEGORY in self.categories else set()
+        if profile is not None:
+            if profile not in self.category_profiles:
+                raise UnknownCategoryProfileError(profile, self.category_profiles)
+            selected.update(self.category_profiles[profile])
+
+        unknown = []
+        for raw_name in categories or []:
+            name = str(raw_name).strip()
+            if not name:
+                continue
+            if name.casefold() in known:
+                selected.add(known[name.casefold()])
+            else:
+                unknown.append(name)
+        if unknown:
+            raise UnknownCategoriesError(unknown)
+        return [name for name in self.categories if name in selected]
+
+    def render(self, language: str, code_section: str, categories: list[str] | None = None) -> str:
+        """
+        Interpolates the request-specific part into the precompiled prompt.
+
+        Args:
+            language: Programming language of the code
+            code_section: Rendered code block(s), ending with a blank line
+            categories: Optional subset from select_categories() to review for
+
+        Returns:
+            str: The full prompt
+        """
+        suffix = self.suffix
+        if categories is not None and categories != self.categories:
+            key = tuple(categories)
+            suffix = self._subset_suffixes.get(key)
+            if suffix is None:
+                suffix = self._compile_suffix(categories)
+                self._subset_suffixes.put(key, suffix)
+        return f"{self.prefix}{language}\n\n{code_section}{suffix}"
+
+
+class ConfigWatcher:
+    """
+    Holds the PromptTemplate for a config file and rebuilds it when the file's
+    modification time (or size) changes.
+    """
+
+    def __init__(self, path: str | Path = CONFIG_FILE, check_interval: float = CONFIG_CHECK_INTERVAL):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature: tuple[int, int] | None = None
+        self._next_check = 0.0
+        self._template: PromptTemplate | None = None
+        self._reload(force=True)
+
+    def get(self) -> PromptTemplate:
+        """
+        Returns the current template, reloading config.json first if it changed.
+        """
+        now = time.monotonic()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    self._next_check = now + self.check_interval
+                    self._reload()
+        return self._template
+
+    def _reload(self, force: bool = False) -> None:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            if force:
+                raise
+            logger.exception("Cannot stat %s; keeping the current prompt template", self.path)
+            return
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature and not force:
+            return
+
+        try:
+            with self.path.open(encoding="utf-8") as f:
+                config = json.load(f)
+            template = PromptTemplate(config)
+        except (OSError, ValueError, AttributeError, TypeError):
+            if force:
+                raise
+            logger.exception("Invalid %s; keeping the current prompt template", self.path)
+            # Do not retry the same broken file on every check
+            self._signature = signature
+            return
+
+        if self._template is not None:
+            logger.info("%s changed; prompt template rebuilt.", self.path.name)
+        self._template = template
+        self._signature = signature
+
+
+prompt_config = ConfigWatcher()
+
+
+def get_prompt_template() -> PromptTemplate:
+    return prompt_config.get()
@@ -0,0 +1,202 @@
+"""
+review_cache.py
+Review Result Cache
+===================
+
+Content-addressed cache in front of the LLM call.
+
+The key is a sha256 over everything that influences the model output:
+language, source code, diff, the effective prompt settings and the model name.
+Identical submissions (e.g. CI re-running on every push) are answered from the
+cache without touching the GPU.
+
+Two tiers:
+- In-process LRU (fast, per worker process)
+- Postgres table `review_result_cache` (shared, with TTL and size eviction)
+
+Cache failures are logged and treated as misses; they never fail a review.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from .lru_cache import LRUCache
+from .models_db import ReviewResultCache
+
+logger = logging.getLogger(__name__)
+
+REVIEW_CACHE_ENABLED = os.getenv("REVIEW_CACHE_ENABLED", "true").lower() == "true"
+REVIEW_CACHE_MEMORY_SIZE = int(os.getenv("REVIEW_CACHE_MEMORY_SIZE", "256"))
+REVIEW_CACHE_TTL_SECONDS = int(os.getenv("REVIEW_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+REVIEW_CACHE_MAX_ROWS = int(os.getenv("REVIEW_CACHE_MAX_ROWS", "100000"))
+# Run DB eviction once every N writes instead of on every write
+REVIEW_CACHE_EVICT_EVERY = int(os.getenv("REVIEW_CACHE_EVICT_EVERY", "100"))
+
+
+def make_cache_key(
+    language: str,
+    source_code: str,
+    diff: str | None,
+    prompt_settings: dict,
+    model_name: str | None,
+) -> str:
+    """
+    Builds the content-addressed cache key for a review.
+
+    Args:
+        language: Programming language of the code
+        source_code: Source code to review
+        diff: Optional diff information
+        prompt_settings: Effective prompt settings (config.json values, prompt mode, ...)
+        model_name: Name of the model producing the review
+
+    Returns:
+        str: Hex sha256 digest
+    """
+    payload = json.dumps(
+        {
+            "language": language,
+            "sourceCode": source_code,
+            "diff": diff or "",
+            "prompt": prompt_settings,
+            "model": model_name or "",
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReviewCache:
+    """
+    Two-tier (memory LRU + Postgres) cache of parsed review categories.
+    """
+
+    def __init__(self, memory_size: int, ttl_seconds: int, max_rows: int, enabled: bool = True):
+        self.memory_size = memory_size
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self.enabled = enabled
+        self._memory: LRUCache[str, list[dict]] = LRUCache(memory_size, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    # -----------------------------------------
+    # Public API
+    # -----------------------------------------
+    def get(self, key: str) -> list[dict] | None:
+        """
+        Looks up cached categories for a key (memory first, then Postgres).
+
+        Returns:
+            list[dict] | None: Cached [{category, message}, ...] or None on miss
+        """
+        if not self.enabled:
+            return None
+
+        categories = self._memory.get(key)
+        if categories is not None:
+            logger.info("Review cache hit (memory) for key %s", key[:12])
+            return categories
+
+        from .database import SessionLocal
+
+        try:
+            with SessionLocal() as session:
+                row = session.execute(
+                    select(ReviewResultCache.categories, ReviewResultCache.created_at).where(
+                        ReviewResultCache.cache_key == key
+                    )
+                ).first()
+                if row is None:
+                    return None
+
+                cutoff = datetime.now(UTC) - timedelta(seconds=self.ttl_seconds)
+                if row.created_at < cutoff:
+                    return None
+
+                session.execute(
+                    update(ReviewResultCache)
+                    .where(ReviewResultCache.cache_key == key)
+                    .values(last_hit_at=datetime.now(UTC), hit_count=ReviewResultCache.hit_count + 1)
+                )
+                session.commit()
+        except SQLAlchemyError as e:
+            logger.warning("Review cache lookup failed, treating as miss: %s", e)
+            return None
+
+        self._memory.put(key, row.categories, stored_at=row.created_at.timestamp())
+        logger.info("Review cache hit (database) for key %s", key[:12])
+        return row.categories
+
+    def put(self, key: str, categories: list[dict], model_name: str | None = None) -> None:
+        """
+        Stores parsed categories under a key in both tiers.
+        """
+        if not self.enabled or not categories:
+            return
+
+        self._memory.put(key, categories)
+
+        from .database import SessionLocal
+
+        try:
+            with SessionLocal() as session:
+                now = datetime.now(UTC)
+                stmt = insert(ReviewResultCache).values(
+                    cache_key=key,
+                    model_name=model_name,
+                    categories=categories,
+                    created_at=now,
+                    last_hit_at=now,
+                    hit_count=0,
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[ReviewResultCache.cache_key],
+                    set_={"categories": stmt.excluded.categories, "created_at": now, "last_hit_at": now},
+                )
+                session.execute(stmt)
+
+                with self._lock:
+                    self._writes += 1
+                    run_eviction = self._writes % REVIEW_CACHE_EVICT_EVERY == 0
+                if run_eviction:
+                    self._evict(session)
+
+                session.commit()
+        except SQLAlchemyError as e:
+            logger.warning("Review cache write failed: %s", e)
+
+    def _evict(self, session) -> None:
+        """
+        Removes expired rows, then trims the table to max_rows (least recently hit first).
+        """
+        cutoff = datetime.now(UTC) - timedelta(seconds=self.ttl_seconds)
+        expired = session.execute(delete(ReviewResultCache).where(ReviewResultCache.created_at < cutoff))
+
+        overflow = (
+            select(ReviewResultCache.cache_key).order_by(ReviewResultCache.last_hit_at.desc()).offset(self.max_rows)
+        )
+        trimmed = session.execute(delete(ReviewResultCache).where(ReviewResultCache.cache_key.in_(overflow)))
+        logger.info(
+            "Review cache eviction removed %s expired and %s overflow rows", expired.rowcount, trimmed.rowcount
+        )
+
+    def clear_memory(self) -> None:
+        self._memory.clear()
+
+
+review_cache = ReviewCache(
+    memory_size=REVIEW_CACHE_MEMORY_SIZE,
+    ttl_seconds=REVIEW_CACHE_TTL_SECONDS,
+    max_rows=REVIEW_CACHE_MAX_ROWS,
+    enabled=REVIEW_CACHE_ENABLED,
+)
@@ -0,0 +1,111 @@
+"""
+scheduler.py
+Job Scheduling Policy
+=====================
+
+Decides which runnable job a worker claims next.
+
+- Priority classes: interactive < normal < batch (lower runs first). A class is
+  only served when no job of a more urgent class is waiting, so batch backfills
+  soak up idle capacity without delaying IDE users.
+- Weighted fair queuing across client identities within a class: each client's
+  n-th waiting job gets the virtual start time (running + n) / weight, and the
+  smallest virtual time wins. One client bulk-submitting 500 files therefore
+  cannot starve a client that submits a single file.
+
+Configuration (environment):
+- JOB_DEFAULT_PRIORITY: class used when a request does not specify one
+- JOB_CLIENT_WEIGHTS: optional weights, e.g. "ci=0.5,vscode=2" (default 1)
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLASSES = {"interactive": 0, "normal": 1, "batch": 2}
+
+JOB_DEFAULT_PRIORITY = os.getenv("JOB_DEFAULT_PRIORITY", "normal")
+JOB_CLIENT_WEIGHTS = os.getenv("JOB_CLIENT_WEIGHTS", "")
+# Waiting jobs per (class, client) considered for each claim
+JOB_SCHEDULER_WINDOW = int(os.getenv("JOB_SCHEDULER_WINDOW", "4"))
+
+DEFAULT_CLIENT = "anonymous"
+
+
+@dataclass
+class Candidate:
+    job_id: str
+    priority: int
+    client_id: str
+    created_at: datetime
+    client_rank: int  # 1 = the client's oldest waiting job in this class
+
+
+def resolve_priority(value: str | int | None) -> int:
+    """
+    Maps a priority class name (or number) to its numeric value.
+    Unknown values fall back to JOB_DEFAULT_PRIORITY.
+    """
+    if isinstance(value, int) and value in PRIORITY_CLASSES.values():
+        return value
+    if isinstance(value, str) and value.strip().lower() in PRIORITY_CLASSES:
+        return PRIORITY_CLASSES[value.strip().lower()]
+    if value is not None:
+        logger.warning("Unknown job priority %r; using %s", value, JOB_DEFAULT_PRIORITY)
+    return PRIORITY_CLASSES.get(JOB_DEFAULT_PRIORITY, PRIORITY_CLASSES["normal"])
+
+
+def priority_name(value: int | None) -> str:
+    for name, number in PRIORITY_CLASSES.items():
+        if number == value:
+            return name
+    return JOB_DEFAULT_PRIORITY
+
+
+def parse_client_weights(spec: str) -> dict[str, float]:
+    """
+    Parses "client=weight,client=weight" into a dict.
+    """
+    weights = {}
+    for raw_entry in spec.split(","):
+        entry = raw_entry.strip()
+        if not entry:
+            continue
+        client, _, weight = entry.rpartition("=")
+        try:
+            weights[client.strip()] = max(float(weight), 0.001)
+        except ValueError:
+            logger.warning("Ignoring invalid JOB_CLIENT_WEIGHTS entry: %s", entry)
+    return weights
+
+
+CLIENT_WEIGHTS = parse_client_weights(JOB_CLIENT_WEIGHTS)
+
+
+def order_candidates(
+    candidates: list[Candidate],
+    running_per_client: dict[str, int],
+    weights: dict[str, float] | None = None,
+) -> list[Candidate]:
+    """
+    Orders runnable jobs by (priority class, weighted virtual time, age).
+
+    Args:
+        candidates: Runnable jobs (the first few waiting jobs of every client and class)
+        running_per_client: Jobs currently in progress per client
+        weights: Client weights (default 1)
+
+    Returns:
+        list[Candidate]: Candidates in the order they should be claimed
+    """
+    weights = CLIENT_WEIGHTS if weights is None else weights
+
+    def sort_key(candidate: Candidate) -> tuple:
+        weight = weights.get(candidate.client_id, 1.0)
+        virtual_time = (running_per_client.get(candidate.client_id, 0) + candidate.client_rank) / weight
+        return (candidate.priority, virtual_time, candidate.created_at)
+
+    return sorted(candidates, key=sort_key)
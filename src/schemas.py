@@ -6,7 +6,16 @@ Pydantic Schema Definitions
 
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+from .prompt_template import get_prompt_template
+
+
+class CategoryOptionTypeError(ValueError):
+    """Raised when the categories / categoryProfile options have the wrong type."""
+
+    def __init__(self):
+        super().__init__("categories must be a list or comma-separated string, categoryProfile a string")
 
 
 class ReviewRequest(BaseModel):
@@ -20,6 +29,26 @@ class ReviewRequest(BaseModel):
     diff: str | None = Field(None, description="Diff information")
     options: dict[str, Any] | None = Field(None, description="Additional review options")
 
+    @field_validator("options")
+    @classmethod
+    def check_categories(cls, options: dict[str, Any] | None) -> dict[str, Any] | None:
+        """Rejects unknown review categories / category profiles up front (422)."""
+        if options and (options.get("categories") is not None or options.get("categoryProfile") is not None):
+            categories, profile = options.get("categories"), options.get("categoryProfile")
+            if not isinstance(categories, str | list | None) or not isinstance(profile, str | None):
+                raise CategoryOptionTypeError
+            get_prompt_template().select_categories(categories, profile)
+        return options
+
+
+class BatchReviewRequest(BaseModel):
+    """
+    Input schema for the batch review API (one job per file).
+    """
+
+    reviews: list[ReviewRequest] = Field(..., min_length=1, description="Files to review")
+    options: dict[str, Any] | None = Field(None, description="Options applied to the whole batch (e.g. priority)")
+
 
 class ReviewResponseCategory(BaseModel):
     """
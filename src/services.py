@@ -6,381 +6,1368 @@ Business Logic Layer
 Handles:
 - Synchronous code review generation
 - Asynchronous job queue
+- Review result caching (see review_cache.py)
 - Feedback saving (with foreign key checks)
 """
 
+import asyncio
 import json
 import logging
+import math
 import os
+import re
 import threading
+import uuid
+from collections.abc import AsyncIterator, Callable, Iterable
 from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
-from queue import Queue
-
-from sqlalchemy.orm import Session
-
-from .llm_engines.base import BaseLLMEngine
-from .models_db import ReviewCategories, ReviewFeedback, ReviewJobs, Reviews
-from .schemas import ReviewRequest
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import BigInteger, String, and_, column, func, insert, or_, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from .chunking import (
+    REVIEW_CHUNK_CONCURRENCY,
+    REVIEW_CONTEXT_TOKENS,
+    REVIEW_OUTPUT_TOKENS,
+    SourceChunk,
+    estimate_tokens,
+    merge_chunk_categories,
+    split_source,
+)
+from .diff_utils import format_changed_regions
+from .job_events import job_events, notify_job_changed
+from .job_executor import JobContext, JobExecutor, JobTimeoutError
+from .llm_engines.backend_pool import BackendSaturatedError, NoBackendAvailableError
+from .llm_engines.base import AsyncBaseLLMEngine, BaseLLMEngine, CancellationToken, GenerationCanceledError
+from .lru_cache import LRUCache
+from .models_db import FeedbackStats, ReviewCategories, ReviewFeedback, ReviewJobs, Reviews
+from .prompt_template import get_prompt_template
+from .review_cache import make_cache_key, review_cache
+from .scheduler import (
+    DEFAULT_CLIENT,
+    JOB_SCHEDULER_WINDOW,
+    Candidate,
+    order_candidates,
+    priority_name,
+    resolve_priority,
+)
+from .schemas import BatchReviewRequest, ReviewRequest
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .source_blobs import load_blobs, store_blobs
+from .stream_parser import CategoryStreamParser
 
 logger = logging.getLogger(__name__)
 
-# For async jobs
-job_queue = Queue()
+# Categories parsed so far for jobs being processed in this process (jobId -> list)
+_partial_results: dict[str, list[dict]] = {}
+_partial_results_lock = threading.Lock()
+
+# In-flight coalescing of identical reviews. Followers of a canceled or timed-out
+# job run the review themselves.
+review_flights = SingleFlight(retry_on=(GenerationCanceledError, JobTimeoutError))
+async_review_flights = AsyncSingleFlight()
 
 DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
-# Load config.json once at module level
-CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.json")
+# Durable job queue: lease length (renewed by heartbeats) and max claims per job
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Long-poll cap for GET /v2/jobs/{jobId}?wait=, and the re-read interval of job watchers
+JOB_MAX_WAIT = float(os.getenv("JOB_MAX_WAIT", "60"))
+JOB_WATCH_RESYNC = float(os.getenv("JOB_WATCH_RESYNC", "30"))
+
+TERMINAL_JOB_STATUSES = ("completed", "error", "canceled")
+
+# Finished jobs and stored reviews never change: their responses are cached per process
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+job_response_cache: LRUCache[str, dict] = LRUCache(RESPONSE_CACHE_SIZE)
+review_response_cache: LRUCache[str, dict] = LRUCache(RESPONSE_CACHE_SIZE)
+
+PROMPT_MODES = ("full", "diff")
+
+# SQLSTATE of a foreign key violation
+_FOREIGN_KEY_VIOLATION = "23503"
+# GET /v2/stats/feedback grouping keys
+FEEDBACK_STATS_GROUPS = {
+    "category": FeedbackStats.category_name,
+    "language": FeedbackStats.language,
+    "model": FeedbackStats.model_name,
+}
+
+
+def _prompt_mode(options: dict | None = None) -> tuple[str, int]:
+    """
+    Returns the effective (prompt mode, diff context lines) for a request.
+
+    "full" embeds the whole source code and diff; "diff" sends only the changed
+    hunks of the diff. Request options (promptMode, diffContextLines) override
+    config.json (prompt_mode, diff_context_lines).
+    """
+    options = options or {}
+    template = get_prompt_template()
+    mode = str(options.get("promptMode") or template.prompt_mode).lower()
+    if mode not in PROMPT_MODES:
+        logger.warning("Unknown prompt mode %r; using full", mode)
+        mode = "full"
+    try:
+        context_lines = int(options.get("diffContextLines", template.diff_context_lines))
+    except (TypeError, ValueError):
+        context_lines = 3
+    return mode, max(0, context_lines)
 
-with open(CONFIG_FILE, encoding="utf-8") as f:
-    CONFIG = json.load(f)
 
+def _selected_categories(options: dict | None = None) -> list[str] | None:
+    """
+    Returns the category subset requested via options (categories and/or
+    categoryProfile), or None to review every configured category.
 
-def _format_prompt(language: str, source_code: str, diff: str | None) -> str:
+    Raises:
+        ValueError: If the profile or a category is not configured
+    """
+    options = options or {}
+    categories, profile = options.get("categories"), options.get("categoryProfile")
+    if categories is None and profile is None:
+        return None
+    return get_prompt_template().select_categories(categories, profile)
+
+
+def _format_prompt(
+    language: str,
+    source_code: str,
+    diff: str | None,
+    options: dict | None = None,
+    section: str | None = None,
+) -> str:
     """
     Provide a prompt that instructs the LLM to return JSON with multiple categories.
-    Uses a JSON config file to define categories and instructions dynamically.
-    """
-
-    # Extract values from config
-    categories_str = ", ".join(CONFIG.get("categories", []))
-    instructions = CONFIG.get("instructions", "").replace("{categories}", categories_str)
-
-    # Format guidelines
-    format_guidelines = CONFIG.get("format_guidelines", {})
-    use_markdown = format_guidelines.get("use_markdown", False)
-    include_line_numbers = format_guidelines.get("include_line_numbers", False)
-    max_length = format_guidelines.get("max_response_length", 1000)
-
-    # Additional formatting notes
-    formatting_instructions = []
-    if use_markdown:
-        formatting_instructions.append("- Use markdown for inline code (`code`) and code blocks.")
-    if include_line_numbers:
-        formatting_instructions.append("- Reference specific line numbers where applicable.")
-
-    formatting_str = "\n".join(formatting_instructions) if formatting_instructions else ""
-
-    # Get preferred output language
-    preferred_language = CONFIG.get("preferred_language", "English")
-
-    base_prompt = (
-        f"### Code Review Request ({CONFIG.get('review_depth', 'Deep')} Analysis)\n"
-        f"#### Language: {language}\n\n"
-        f"```{language}\n{source_code}\n```\n\n"
-        f"#### Diff:\n{diff or 'No diff provided.'}\n\n"
-        f"### Categories of Interest:\n{categories_str}\n\n"
-        f"### Review Guidelines:\n"
-        f"{instructions}\n\n"
-        f"{formatting_str}\n"
-        f"- Ensure response length does not exceed {max_length} characters.\n"
-        f"- Return only valid JSON as output."
-    )
+    Categories and instructions come from the precompiled config.json template
+    (see prompt_template.py); only the code part is rendered per request.
+
+    In "diff" prompt mode only the changed hunks (plus context lines) are sent,
+    annotated with their original line numbers. Requests without a parseable
+    unified diff fall back to the full source code.
+
+    `section` marks the source as one part of a larger file (chunked reviews).
+    Only the categories selected by the request options are listed.
+    """
+
+    mode, context_lines = _prompt_mode(options)
+    changed_regions = format_changed_regions(diff, context_lines) if mode == "diff" else None
+    if mode == "diff" and changed_regions is None:
+        logger.info("No parseable unified diff; falling back to the full source code prompt.")
+
+    if changed_regions is not None:
+        code_section = (
+            "#### Changed Regions:\n"
+            "Only the changed lines of the file are shown. Each line is prefixed with its line number "
+            "in the original file, its line number in the changed file and +/- for added/removed lines. "
+            "Review the changes; unchanged lines are context only.\n\n"
+            f"```diff\n{changed_regions}\n```\n\n"
+        )
+    else:
+        code_section = f"```{language}\n{source_code}\n```\n\n#### Diff:\n{diff or 'No diff provided.'}\n\n"
+
+    if section:
+        code_section = (
+            f"#### Section: {section}\n"
+            "This is one part of a larger file. Review only this part; code it refers to may be defined elsewhere.\n\n"
+            f"{code_section}"
+        )
+
+    return get_prompt_template().render(language, code_section, _selected_categories(options))
 
-    if preferred_language.lower() != "english":
-        base_prompt += f"\n\nPlease respond in {preferred_language}."
 
-    return base_prompt
+def _group_categories(items: list[dict]) -> list[dict]:
+    """
+    Groups repeated categories: "General Feedback" messages are combined into a
+    single entry placed first, other categories keep their order.
+    """
+    grouped = {}
+    for item in items:
+        grouped.setdefault(item["category"], []).append(item["message"])
+
+    result = []
+    if "General Feedback" in grouped:
+        combined_message = "\n".join(grouped.pop("General Feedback"))
+        result.append({"category": "General Feedback", "message": combined_message})
+
+    result.extend({"category": cat, "message": msg} for cat, messages in grouped.items() for msg in messages)
+
+    return result
 
 
-def _parse_llm_output(raw_output: str) -> list[dict]:
+def _parse_llm_output(raw_output: str, parser: CategoryStreamParser | None = None) -> tuple[list[dict], bool]:
     """
     Parses the LLM output into multiple categories, ensuring proper JSON structure.
     Handles edge cases in LLM responses and removes <think>...</think> tags.
     Groups repeated categories into a single entry.
+
+    Args:
+        raw_output: Full raw LLM output
+        parser: Optional parser that was already fed the output while streaming
+            (restricted to the requested categories, if any)
+
+    Returns:
+        tuple: ([{category, message}, ...], parsed); parsed is False when no
+            category object was found and the result is the raw-text fallback
+            (such results must not be cached)
     """
-    import re
+    if parser is None:
+        parser = CategoryStreamParser()
+        parser.feed(raw_output)
+    items = parser.close()
 
-    # === 1. Remove <think>...</think> tags ===
-    raw_output = re.sub(r"<think>.*?</think>", "", raw_output, flags=re.DOTALL)
+    if items:
+        result = _group_categories(items)
+        logger.debug("Parsed LLM Output: %s", json.dumps(result, indent=2, ensure_ascii=False))
+        return result, True
 
-    # === 2. Clean up ===
-    cleaned_output = raw_output.strip()
+    if parser.dropped:
+        # Only categories that were not requested came back; their text is not a review of the requested ones
+        logger.warning("LLM output contained only categories that were not requested (%s dropped).", parser.dropped)
+        return [], False
 
-    # === 3. Extract JSON array ===
-    json_match = re.search(r"\[\s*\{.*\}\s*\]", cleaned_output, re.DOTALL)
-    if json_match:
-        cleaned_output = json_match.group(0)
+    visible_output = re.sub(r"<think>.*?</think>", "", raw_output, flags=re.DOTALL).strip()
+    logger.warning("No category objects found in LLM output. Raw output: %s...", visible_output[:100])
 
-    try:
-        data = json.loads(cleaned_output)
-        if not isinstance(data, list):
-            data = [data]
-
-        # Group messages by category
-        grouped = {}
-        for item in data:
-            if not isinstance(item, dict):
-                continue
-            category = item.get("category")
-            message = item.get("message")
+    fallback = [{"category": "General Feedback", "message": visible_output}]
+    logger.debug("Using ultimate fallback response")
+    return fallback, False
 
-            if not category or not message:
-                continue
 
-            if category not in grouped:
-                grouped[category] = []
+def _prompt_settings(options: dict | None = None) -> dict:
+    """
+    Returns the config.json values and request options that shape the prompt (part of the cache key).
+    """
+    mode, context_lines = _prompt_mode(options)
+    settings = {
+        "template": get_prompt_template().fingerprint,
+        "prompt_mode": mode,
+        "diff_context_lines": context_lines if mode == "diff" else None,
+    }
+    categories = _selected_categories(options)
+    if categories is not None:
+        settings["categories"] = categories
+    return settings
+
+
+def _review_cache_key(llm_engine: BaseLLMEngine | AsyncBaseLLMEngine, review_req: ReviewRequest) -> str:
+    # The context budget decides whether (and how) oversized sources are chunked
+    prompt_settings = {**_prompt_settings(review_req.options), "context_tokens": _context_budget(llm_engine)}
+    return make_cache_key(
+        review_req.language, review_req.sourceCode, review_req.diff, prompt_settings, llm_engine.model_name
+    )
+
+
+def _context_budget(llm_engine: BaseLLMEngine | AsyncBaseLLMEngine) -> int:
+    """
+    Tokens available for the prompt: the engine's context window minus the
+    share reserved for the model's answer.
+    """
+    return max(1, (llm_engine.context_window or REVIEW_CONTEXT_TOKENS) - REVIEW_OUTPUT_TOKENS)
+
+
+def _plan_chunks(
+    llm_engine: BaseLLMEngine | AsyncBaseLLMEngine,
+    language_str: str,
+    sourcecode_str: str,
+    prompt_str: str,
+    options: dict | None = None,
+) -> list[SourceChunk] | None:
+    """
+    Splits the source when its prompt exceeds the context budget.
+
+    Returns:
+        list[SourceChunk] | None: Chunks to review separately, or None if the prompt fits
+    """
+    budget = _context_budget(llm_engine)
+    prompt_tokens = estimate_tokens(prompt_str)
+    if prompt_tokens <= budget:
+        return None
+
+    # Budget left for code once the instructions of a chunk prompt are accounted for
+    chunk_options = {**(options or {}), "promptMode": "full"}
+    overhead = estimate_tokens(_format_prompt(language_str, "", None, chunk_options, section="lines 1-1 of 1"))
+    chunks = split_source(sourcecode_str, budget - overhead)
+    if len(chunks) <= 1:
+        return None
+
+    logger.info(
+        "Prompt of ~%s tokens exceeds the context budget of %s; reviewing the source in %s chunks.",
+        prompt_tokens,
+        budget,
+        len(chunks),
+    )
+    return chunks
+
+
+def _chunk_prompt(language_str: str, chunk: SourceChunk, chunks: list[SourceChunk], options: dict | None) -> str:
+    return _format_prompt(
+        language_str,
+        chunk.text,
+        None,
+        {**(options or {}), "promptMode": "full"},
+        section=f"{chunk.label} of {chunks[-1].end_line} (part {chunk.index + 1} of {len(chunks)})",
+    )
 
-            grouped[category].append(message)
 
-        # Build final structured list
-        result = []
-        if "General Feedback" in grouped:
-            combined_message = "\n".join(grouped.pop("General Feedback"))
-            result.append({"category": "General Feedback", "message": combined_message})
+@dataclass
+class ReviewHooks:
+    """
+    Progress callbacks and cancellation of a synchronous review.
+
+    on_category is invoked with each category object as soon as it is complete
+    in the LLM stream (partial results); interrupt_check runs for every streamed
+    chunk and aborts the generation by raising (e.g. job timeouts); cancel_token
+    aborts the in-flight LLM request when canceled.
+    """
+
+    on_category: Callable[[dict], None] | None = None
+    interrupt_check: Callable[[], None] | None = None
+    cancel_token: CancellationToken | None = None
+
+
+def _stream_categories(
+    llm_engine: BaseLLMEngine,
+    prompt_str: str,
+    hooks: ReviewHooks,
+    categories: list[str] | None = None,
+    cancel_token: CancellationToken | None = None,
+) -> tuple[list[dict], bool]:
+    """
+    Streams one generation through the category parser, reporting progress to hooks.
+    cancel_token defaults to the hooks' token.
+    """
+    parser = CategoryStreamParser(categories)
+    chunks = []
+    for chunk in llm_engine.stream_review(prompt_str, cancel_token=cancel_token or hooks.cancel_token):
+        if hooks.interrupt_check is not None:
+            hooks.interrupt_check()
+        chunks.append(chunk)
+        for item in parser.feed(chunk):
+            if hooks.on_category is not None:
+                hooks.on_category(item)
+    return _parse_llm_output("".join(chunks), parser)
+
+
+def _map_reduce_review(
+    llm_engine: BaseLLMEngine,
+    language_str: str,
+    chunks: list[SourceChunk],
+    options: dict | None,
+    hooks: ReviewHooks,
+) -> tuple[list[dict], bool]:
+    """
+    Reviews the chunks of an oversized source concurrently (map), then merges
+    each category into a single message (reduce).
+
+    The first failing chunk aborts the remaining generations.
+
+    Returns:
+        tuple: (merged categories, whether every chunk's output parsed)
+    """
+    chunk_token = CancellationToken()
+    cancel_token = hooks.cancel_token
 
-        for cat, messages in grouped.items():
-            for msg in messages:
-                result.append({"category": cat, "message": msg})
+    def propagate_cancel() -> None:
+        chunk_token.cancel(cancel_token.reason)
 
-        logger.debug(f"Parsed LLM Output: {json.dumps(result, indent=2, ensure_ascii=False)}")
-        return result
+    if cancel_token is not None:
+        cancel_token.add_callback(propagate_cancel)
+        if cancel_token.canceled:
+            chunk_token.cancel(cancel_token.reason)
 
-    except json.JSONDecodeError as e:
-        logger.warning(f"Failed to parse LLM JSON. Error: {e}. Raw output: {raw_output[:100]}...")
+    failures: list[BaseException] = []
 
-        # Fallback extraction
+    def review_chunk(chunk: SourceChunk) -> tuple[list[dict], bool]:
+        prompt_str = _chunk_prompt(language_str, chunk, chunks, options)
         try:
-            potential_json = re.findall(r"(\[.*?\]|\{.*?\})", raw_output, re.DOTALL)
-            for json_candidate in potential_json:
-                try:
-                    parsed = json.loads(json_candidate)
-                    if isinstance(parsed, list) and len(parsed) > 0:
-                        return _parse_llm_output(json_candidate)
-                    if isinstance(parsed, dict) and "category" in parsed and "message" in parsed:
-                        return [parsed]
-                except:
-                    continue
-        except:
-            pass
-
-        fallback = [{"category": "General Feedback", "message": raw_output}]
-        logger.debug("Using ultimate fallback response")
-        return fallback
+            return _stream_categories(llm_engine, prompt_str, hooks, _selected_categories(options), chunk_token)
+        except BaseException as e:
+            # Abort the other chunks now, not once their results are awaited in order
+            failures.append(e)
+            chunk_token.cancel("chunk review failed")
+            raise
 
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(REVIEW_CHUNK_CONCURRENCY, len(chunks)))) as executor:
+            futures = [executor.submit(review_chunk, chunk) for chunk in chunks]
+            try:
+                results = [future.result() for future in futures]
+            except BaseException:
+                chunk_token.cancel("chunk review failed")
+                if failures:
+                    # Chunks aborted by the first failure only report the cancellation
+                    raise failures[0] from None
+                raise
+    finally:
+        if cancel_token is not None:
+            cancel_token.remove_callback(propagate_cancel)
+
+    merged = merge_chunk_categories(
+        [(chunk, cat_data) for chunk, (cat_data, _parsed) in zip(chunks, results, strict=True)]
+    )
+    return merged, all(parsed for _cat_data, parsed in results)
 
-def format_review_response(review: Reviews) -> dict:
+
+def _review_categories(
+    llm_engine: BaseLLMEngine,
+    review_req: ReviewRequest,
+    hooks: ReviewHooks | None = None,
+) -> list[dict]:
     """
-    Formats a review into the desired JSON response structure.
+    Returns parsed review categories, answering from the result cache when possible.
+    On a cache hit the LLM is not called at all; a call identical to one already
+    in flight waits for that generation instead of starting its own.
 
     Args:
-        review: The Reviews object from the database
+        llm_engine: LLM engine instance
+        review_req: The review to generate (language, source, diff and options)
+        hooks: Optional progress callbacks and cancellation (see ReviewHooks)
 
     Returns:
-        dict: Formatted response with reviewId and reviews array
+        list[dict]: [{category, message}, ...]
+    """
+    hooks = hooks or ReviewHooks()
+    language_str, sourcecode_str, options = review_req.language, review_req.sourceCode, review_req.options
+    cache_key = _review_cache_key(llm_engine, review_req)
+
+    cached = review_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    def generate(emit: Callable[[dict], None]) -> list[dict]:
+        # Categories go to every caller sharing the generation (see review_flights.do below)
+        flight_hooks = ReviewHooks(emit, hooks.interrupt_check, hooks.cancel_token)
+        prompt_str = _format_prompt(language_str, sourcecode_str, review_req.diff, options)
+        chunks = _plan_chunks(llm_engine, language_str, sourcecode_str, prompt_str, options)
+        if chunks:
+            cat_data, parsed = _map_reduce_review(llm_engine, language_str, chunks, options, flight_hooks)
+        else:
+            if DEBUG_MODE:
+                logger.debug("Review Prompt:\n%s", prompt_str)
+            cat_data, parsed = _stream_categories(llm_engine, prompt_str, flight_hooks, _selected_categories(options))
+
+        # A raw-text fallback is one bad generation; the next identical request should retry
+        if parsed:
+            review_cache.put(cache_key, cat_data, model_name=llm_engine.model_name)
+        return cat_data
+
+    # Identical reviews running concurrently in this process share one generation; callers
+    # joining it receive the categories parsed so far, then the rest as they complete
+    cat_data, _shared = review_flights.do(
+        cache_key, generate, interrupt_check=hooks.interrupt_check, listener=hooks.on_category
+    )
+    return cat_data
+
+
+def _save_review(
+    session: Session,
+    *,
+    review_req: ReviewRequest,
+    cat_data: list[dict],
+    model_name: str | None = None,
+) -> uuid.UUID:
+    """
+    Inserts a Reviews row (INSERT ... RETURNING) and all its ReviewCategories
+    (one multi-row INSERT) in the session's transaction, without committing.
+    Source code and diff go to the content-addressed blob store.
+
+    Returns:
+        UUID: review_id of the new review
+    """
+    source_hash, diff_hash = store_blobs(session, review_req.sourceCode, review_req.diff)
+    review_id = session.execute(
+        insert(Reviews)
+        .values(
+            language=review_req.language,
+            source_hash=source_hash,
+            diff_hash=diff_hash,
+            file_name=review_req.fileName,
+            options=review_req.options,
+            model_name=model_name,
+        )
+        .returning(Reviews.review_id)
+    ).scalar_one()
+
+    if cat_data:
+        session.execute(
+            insert(ReviewCategories).values(
+                [
+                    {"review_id": review_id, "category_name": item["category"], "message": item["message"]}
+                    for item in cat_data
+                ]
+            )
+        )
+
+    return review_id
+
+
+def _job_payload(session: Session, review_req: ReviewRequest) -> dict:
+    """
+    The payload stored with a job: the request with source code and diff
+    replaced by blob references, so the queue holds no copy of them.
+    """
+    payload = review_req.dict()
+    payload["sourceBlob"], payload["diffBlob"] = store_blobs(session, payload.pop("sourceCode"), payload.pop("diff"))
+    return payload
+
+
+def _job_payloads(session: Session, review_reqs: list[ReviewRequest]) -> list[dict]:
+    """
+    _job_payload() for many requests, with one blob lookup and insert for all of them.
+    """
+    payloads = [review_req.dict() for review_req in review_reqs]
+    contents = []
+    for payload in payloads:
+        contents += [payload.pop("sourceCode"), payload.pop("diff")]
+    hashes = store_blobs(session, *contents)
+    for index, payload in enumerate(payloads):
+        payload["sourceBlob"], payload["diffBlob"] = hashes[2 * index], hashes[2 * index + 1]
+    return payloads
+
+
+def _load_job_request(session: Session, payload: dict) -> ReviewRequest:
+    """
+    Rebuilds the ReviewRequest of a job payload, reading its blobs.
+    Payloads queued before blob storage carry the text inline.
     """
-    # Extract categories and format them
-    categories = []
-    for category in review.categories:
-        categories.append({"category": category.category_name, "message": category.message})
+    if "sourceBlob" not in payload:
+        return ReviewRequest(**payload)
+    payload = dict(payload)
+    source_hash, diff_hash = payload.pop("sourceBlob"), payload.pop("diffBlob")
+    contents = load_blobs(session, [source_hash, diff_hash])
+    return ReviewRequest(**payload, sourceCode=contents[source_hash], diff=contents.get(diff_hash))
 
-    # Ensure General Feedback always comes first
-    general_first = []
-    other_categories = []
 
-    for cat in categories:
-        if cat["category"] == "General Feedback":
-            general_first.append(cat)
+def _general_feedback_first(items: Iterable[dict]) -> list[dict]:
+    """
+    Orders review categories with "General Feedback" first, in a single pass.
+    """
+    ordered = []
+    general_count = 0
+    for item in items:
+        if item["category"] == "General Feedback":
+            ordered.insert(general_count, item)
+            general_count += 1
         else:
-            other_categories.append(cat)
+            ordered.append(item)
+    return ordered
 
-    # Construct the final response
-    response = {"reviewId": str(review.review_id), "reviews": general_first + other_categories}
 
-    return response
+def _review_response(review_id, cat_data: list[dict]) -> dict:
+    """
+    Response for a review just written by _save_review (no need to read it back).
+    """
+    return {
+        "reviewId": str(review_id),
+        "reviews": _general_feedback_first(
+            {"category": item["category"], "message": item["message"]} for item in cat_data
+        ),
+    }
+
+
+def format_review_response(review: Reviews) -> dict:
+    """
+    Formats a review into the desired JSON response structure.
+
+    Args:
+        review: The Reviews object from the database
+
+    Returns:
+        dict: Formatted response with reviewId and reviews array
+    """
+    reviews = _general_feedback_first(
+        {"category": category.category_name, "message": category.message} for category in review.categories
+    )
+    return {"reviewId": str(review.review_id), "reviews": reviews}
 
 
 # -----------------------------------------
 # Asynchronous job worker logic
 # -----------------------------------------
-def queue_review_job(session: Session, review_req: ReviewRequest) -> str:
-    new_job = ReviewJobs()
+def queue_review_job(
+    session: Session,
+    review_req: ReviewRequest,
+    priority: str | None = None,
+    client_id: str | None = None,
+) -> dict:
+    """
+    Stores a review job for the workers.
+
+    If an identical review (same review cache key) is already queued or in
+    progress, no new job is created: the existing job is returned and, if the
+    new request is more urgent, promoted to its priority class. The job counts
+    its submitters, so one of them canceling does not cancel it for the others.
+
+    Args:
+        session: Database session
+        review_req: Review request data
+        priority: Priority class ("interactive", "normal", "batch"); falls back to
+            review_req.options["priority"], then JOB_DEFAULT_PRIORITY
+        client_id: Client identity for fair-share scheduling; falls back to
+            review_req.options["clientId"]
+
+    Returns:
+        dict: {"jobId": ..., "status": ..., "deduplicated": bool}
+    """
+    from .llm_engines.ollama_engine import get_ollama_engine
+
+    options = review_req.options or {}
+    priority_value = resolve_priority(priority or options.get("priority"))
+    request_key = _review_cache_key(get_ollama_engine(), review_req)
+
+    # Serializes concurrent submissions of the same review across processes
+    session.execute(select(func.pg_advisory_xact_lock(func.hashtextextended(request_key, 0))))
+    existing = (
+        session.query(ReviewJobs)
+        .filter(ReviewJobs.request_key == request_key, ReviewJobs.status.in_(["queued", "in_progress"]))
+        .order_by(ReviewJobs.created_at)
+        .with_for_update()
+        .first()
+    )
+    if existing is not None:
+        if existing.status == "queued" and priority_value < existing.priority:
+            existing.priority = priority_value
+        existing.submitters += 1
+        session.commit()
+        logger.info("Identical review already pending as job %s; not queuing a duplicate.", existing.job_id)
+        return {"jobId": str(existing.job_id), "status": existing.status, "deduplicated": True}
+
+    new_job = ReviewJobs(
+        payload=_job_payload(session, review_req),
+        priority=priority_value,
+        client_id=client_id or options.get("clientId") or DEFAULT_CLIENT,
+        request_key=request_key,
+    )
     session.add(new_job)
     session.commit()
 
-    job_queue.put((str(new_job.job_id), review_req.dict()))
-    return str(new_job.job_id)
+    job_executor.notify()
+    return {"jobId": str(new_job.job_id), "status": new_job.status, "deduplicated": False}
+
+
+def queue_batch_review_job(
+    session: Session,
+    batch_req: BatchReviewRequest,
+    priority: str | None = None,
+    client_id: str | None = None,
+) -> dict:
+    """
+    Stores a batch of review jobs: one parent job plus one child job per file.
+
+    The parent carries no payload (workers never claim it); its status is
+    aggregated from the children. All rows are written in a single commit, the
+    children with one multi-row INSERT.
+
+    Args:
+        session: Database session
+        batch_req: Batch review request data
+        priority: Priority class for every file; falls back to batch_req.options["priority"]
+        client_id: Client identity for fair-share scheduling; falls back to batch_req.options["clientId"]
+
+    Returns:
+        dict: {"jobId": parent job ID, "jobIds": child job IDs in request order}
+    """
+    options = batch_req.options or {}
+    priority_value = resolve_priority(priority or options.get("priority"))
+    client = client_id or options.get("clientId") or DEFAULT_CLIENT
+
+    parent_id = session.execute(
+        insert(ReviewJobs)
+        .values(is_batch=True, priority=priority_value, client_id=client)
+        .returning(ReviewJobs.job_id)
+    ).scalar_one()
+    payloads = _job_payloads(session, batch_req.reviews)
+    children = session.execute(
+        insert(ReviewJobs)
+        .values(
+            [
+                {
+                    "payload": payload,
+                    "priority": priority_value,
+                    "client_id": client,
+                    "parent_job_id": parent_id,
+                    "batch_index": index,
+                }
+                for index, payload in enumerate(payloads)
+            ]
+        )
+        .returning(ReviewJobs.batch_index, ReviewJobs.job_id)
+    ).all()
+    session.commit()
+
+    job_executor.notify()
+    return {"jobId": str(parent_id), "jobIds": [str(job_id) for _, job_id in sorted(children)]}
+
+
+def _aggregate_batch_status(counts: dict[str, int]) -> str:
+    """
+    Derives a batch status from its children's status counts. A batch with a
+    failed file ends as error even if other files completed (counts tell how many).
+    """
+    if counts.get("queued") or counts.get("in_progress"):
+        finished = sum(counts.values()) - counts.get("queued", 0)
+        return "in_progress" if finished else "queued"
+    if counts.get("error"):
+        return "error"
+    if counts.get("completed"):
+        return "completed"
+    return "canceled"
+
+
+def _update_batch_status(session: Session, parent_job_id) -> None:
+    """
+    Recomputes a batch parent's status from its children and commits it.
+    Called after a child's own status change was committed, so the last child
+    to finish always sees every sibling in a terminal state.
+    """
+    counts = dict(
+        session.execute(
+            select(ReviewJobs.status, func.count())
+            .where(ReviewJobs.parent_job_id == parent_job_id)
+            .group_by(ReviewJobs.status)
+        ).all()
+    )
+    status = _aggregate_batch_status(counts)
+    values = {"status": status}
+    if status in ("completed", "error", "canceled"):
+        values["completed_at"] = datetime.utcnow()
+    session.execute(
+        update(ReviewJobs)
+        .where(ReviewJobs.job_id == parent_job_id, ReviewJobs.status.notin_(["completed", "error", "canceled"]))
+        .values(**values)
+    )
+    # The batch's counts changed even if its aggregate status did not
+    notify_job_changed(session, parent_job_id)
+    session.commit()
+
+
+def _runnable_jobs_filter():
+    # Queued jobs, plus in_progress jobs whose worker stopped renewing the lease
+    return and_(
+        ReviewJobs.payload.isnot(None),
+        or_(
+            ReviewJobs.status == "queued",
+            and_(ReviewJobs.status == "in_progress", ReviewJobs.lease_expires_at < func.now()),
+        ),
+    )
+
 
+def claim_next_job(worker_id: str) -> tuple[str, dict] | None:
+    """
+    Claims the next runnable job for a worker.
 
-def process_jobs_in_background() -> None:
-    while True:
-        job_id, review_req_dict = job_queue.get()
-        logger.info(f"Dequeued job {job_id} for processing.")
-        _process_single_job(job_id, review_req_dict)
+    Candidates (the first few waiting jobs of every client in every priority
+    class) are ordered by the scheduler (priority class, then weighted fair
+    share across clients), then locked with SELECT ... FOR UPDATE SKIP LOCKED
+    so concurrent workers (threads, processes or hosts) never claim the same row.
 
+    Jobs that were already claimed JOB_MAX_ATTEMPTS times are marked as error instead.
 
-def _process_single_job(job_id: str, review_req_dict: dict) -> None:
+    Returns:
+        tuple | None: (job_id, payload) or None if nothing is runnable
+    """
     from .database import SessionLocal
 
     with SessionLocal() as session:
-        job = session.query(ReviewJobs).filter(ReviewJobs.job_id == job_id).first()
-        if not job or job.status not in ("queued", "in_progress"):
-            logger.info(f"Job {job_id} not found or no longer valid.")
-            return
+        ranked = (
+            select(
+                ReviewJobs.job_id,
+                ReviewJobs.priority,
+                ReviewJobs.client_id,
+                ReviewJobs.created_at,
+                func.row_number()
+                .over(partition_by=(ReviewJobs.priority, ReviewJobs.client_id), order_by=ReviewJobs.created_at)
+                .label("client_rank"),
+            )
+            .where(_runnable_jobs_filter())
+            .subquery()
+        )
+        rows = session.execute(select(ranked).where(ranked.c.client_rank <= JOB_SCHEDULER_WINDOW)).all()
+        if not rows:
+            return None
+
+        running_per_client = {
+            client_id or DEFAULT_CLIENT: count
+            for client_id, count in session.execute(
+                select(ReviewJobs.client_id, func.count())
+                .where(ReviewJobs.status == "in_progress", ReviewJobs.lease_expires_at >= func.now())
+                .group_by(ReviewJobs.client_id)
+            ).all()
+        }
+        candidates = [
+            Candidate(str(row.job_id), row.priority, row.client_id or DEFAULT_CLIENT, row.created_at, row.client_rank)
+            for row in rows
+        ]
+
+        for candidate in order_candidates(candidates, running_per_client):
+            job = (
+                session.query(ReviewJobs)
+                .filter(ReviewJobs.job_id == candidate.job_id, _runnable_jobs_filter())
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if job is None:
+                # Claimed by another worker in the meantime
+                continue
+
+            if job.status == "in_progress":
+                logger.warning("Lease of job %s held by %s expired; reclaiming.", job.job_id, job.lease_owner)
+
+            if job.attempts >= JOB_MAX_ATTEMPTS:
+                logger.error("Job %s failed after %s attempts.", job.job_id, job.attempts)
+                job.status = "error"
+                job.completed_at = datetime.utcnow()
+                job.lease_expires_at = None
+                notify_job_changed(session, job.job_id)
+                session.commit()
+                if job.parent_job_id:
+                    _update_batch_status(session, job.parent_job_id)
+                continue
+
+            job.status = "in_progress"
+            job.lease_owner = worker_id
+            job.lease_expires_at = func.now() + timedelta(seconds=JOB_LEASE_SECONDS)
+            job.heartbeat_at = func.now()
+            job.attempts += 1
+            notify_job_changed(session, job.job_id, job.parent_job_id)
+            session.commit()
+            logger.info(
+                "Scheduled job %s (priority=%s, client=%s)",
+                job.job_id,
+                priority_name(job.priority),
+                candidate.client_id,
+            )
+            return str(job.job_id), job.payload
+
+        return None
+
+
+def renew_job_leases(worker_id: str, job_ids: list[str]) -> set[str]:
+    """
+    Heartbeat: extends the leases of the jobs this worker is processing.
+
+    Returns:
+        set[str]: Job IDs that are no longer ours to run (canceled, failed or re-leased)
+    """
+    from .database import SessionLocal
 
-        job.status = "in_progress"
+    with SessionLocal() as session:
+        renewed = session.execute(
+            update(ReviewJobs)
+            .where(
+                ReviewJobs.job_id.in_(job_ids),
+                ReviewJobs.lease_owner == worker_id,
+                ReviewJobs.status == "in_progress",
+            )
+            .values(heartbeat_at=func.now(), lease_expires_at=func.now() + timedelta(seconds=JOB_LEASE_SECONDS))
+            .returning(ReviewJobs.job_id)
+        ).scalars()
+        renewed_ids = {str(job_id) for job_id in renewed}
         session.commit()
 
+    return set(job_ids) - renewed_ids
+
+
+def _finish_owned_job(session: Session, job_id: str, worker_id: str, **values) -> tuple | None:
+    """
+    Sets the final state (and completed_at) of a job this worker still owns, in one
+    UPDATE ... RETURNING (no separate locking read). Does not commit.
+
+    Returns:
+        tuple | None: (parent_job_id,) or None if the job was canceled or re-leased meanwhile
+    """
+    return session.execute(
+        update(ReviewJobs)
+        .where(
+            ReviewJobs.job_id == job_id,
+            ReviewJobs.status == "in_progress",
+            ReviewJobs.lease_owner == worker_id,
+        )
+        .values(lease_expires_at=None, completed_at=datetime.utcnow(), **values)
+        .returning(ReviewJobs.parent_job_id)
+    ).first()
+
+
+def _process_single_job(job_id: str, review_req_dict: dict, context: JobContext) -> None:
+    """
+    Runs a claimed job. The claim already marked it in_progress; the review, its
+    categories and the job's completion are written in a single transaction
+    (the source blobs already exist, so five statements). Ownership is checked
+    by the completing UPDATE itself: if the job was canceled or re-leased
+    meanwhile, nothing is written.
+    """
+    from .database import SessionLocal
+
+    with SessionLocal() as session:
         try:
-            review_req = ReviewRequest(**review_req_dict)
-            from .llm_engines.ollama_engine import OllamaEngine
+            review_req = _load_job_request(session, review_req_dict)
+            # Return the connection to the pool while generating
+            session.rollback()
+            from .llm_engines.ollama_engine import get_ollama_engine
 
-            engine = OllamaEngine()
+            engine = get_ollama_engine()
 
-            prompt_str = _format_prompt(review_req.language, review_req.sourceCode, review_req.diff)
-            raw_output = engine.generate_review(prompt_str)
-            cat_data = _parse_llm_output(raw_output)
+            def publish_partial(item: dict) -> None:
+                with _partial_results_lock:
+                    _partial_results.setdefault(job_id, []).append(item)
 
-            new_review = Reviews(
-                language=review_req.language,
-                source_code=review_req.sourceCode,
-                diff=review_req.diff,
-                file_name=review_req.fileName,
-                options=review_req.options,
+            cat_data = _review_categories(
+                engine,
+                review_req,
+                ReviewHooks(on_category=publish_partial, interrupt_check=context.check, cancel_token=context.token),
             )
-            session.add(new_review)
-            session.flush()  # get review_id
-
-            for cat_item in cat_data:
-                rc = ReviewCategories(
-                    review_id=new_review.review_id, category_name=cat_item["category"], message=cat_item["message"]
-                )
-                session.add(rc)
-            session.commit()
 
-            job.review_id = new_review.review_id
-            job.status = "completed"
-            job.completed_at = datetime.utcnow()
+            review_id = _save_review(session, review_req=review_req, cat_data=cat_data, model_name=engine.model_name)
+            finished = _finish_owned_job(
+                session,
+                job_id,
+                context.worker_id,
+                review_id=review_id,
+                status="completed",
+            )
+            if finished is None:
+                logger.info("Job %s is no longer owned by this worker; discarding result.", job_id)
+                session.rollback()
+                return
+            notify_job_changed(session, job_id)
             session.commit()
 
-            logger.info(f"Job {job_id} completed with {len(cat_data)} categories.")
+            logger.info("Job %s completed with %s categories.", job_id, len(cat_data))
+            if finished.parent_job_id:
+                _update_batch_status(session, finished.parent_job_id)
 
         except Exception as ex:
-            logger.exception(f"Job {job_id} failed: {ex}")
-            job.status = "error"
+            if isinstance(ex, GenerationCanceledError) and context.token.reason == "timed out":
+                logger.warning("Job %s exceeded its time limit; generation aborted.", job_id)
+            elif isinstance(ex, GenerationCanceledError):
+                logger.info("Job %s was canceled; generation aborted.", job_id)
+            else:
+                logger.exception("Job %s failed", job_id)
+            session.rollback()
+            finished = _finish_owned_job(session, job_id, context.worker_id, status="error")
+            if finished is not None:
+                notify_job_changed(session, job_id)
             session.commit()
+            if finished is not None and finished.parent_job_id:
+                _update_batch_status(session, finished.parent_job_id)
+
+        finally:
+            with _partial_results_lock:
+                _partial_results.pop(job_id, None)
 
 
-# Start the background worker on import
-worker_thread = threading.Thread(target=process_jobs_in_background, daemon=True)
-worker_thread.start()
+# Start the background workers on import (stopped by the app lifespan on shutdown)
+job_executor = JobExecutor(
+    _process_single_job,
+    claim=claim_next_job,
+    heartbeat=renew_job_leases,
+)
+job_executor.start()
 
 
 def get_job_status(session: Session, job_id: str) -> dict | None:
     """
     Get the status of a job and its review results if completed.
     Uses format_review_response for consistent response formatting.
+
+    The job, its review and the review's categories are loaded in one query.
+    Responses of finished jobs are cached (they cannot change anymore), so
+    repeated reads of a finished job do not query the database.
     """
-    job = session.query(ReviewJobs).filter(ReviewJobs.job_id == job_id).first()
+    job_id = str(job_id)
+    cached = job_response_cache.get(job_id)
+    if cached is not None:
+        return cached
+
+    job = (
+        session.query(ReviewJobs)
+        .options(joinedload(ReviewJobs.review).joinedload(Reviews.categories))
+        .filter(ReviewJobs.job_id == job_id)
+        .first()
+    )
     if not job:
         return None
+    response = get_batch_status(session, job) if job.is_batch else _job_response(job)
+    if response["status"] in TERMINAL_JOB_STATUSES:
+        job_response_cache.put(job_id, response)
+    return response
+
+
+def load_job_status(job_id: str) -> dict | None:
+    """
+    get_job_status in a session of its own, for async handlers (run it via asyncio.to_thread).
+    """
+    from .database import SessionLocal
+
+    with SessionLocal() as session:
+        return get_job_status(session, job_id)
+
+
+async def wait_for_job_status(job_id: str, wait: float) -> dict | None:
+    """
+    Long-poll variant of get_job_status.
+
+    Returns right away if the job is finished; otherwise when the job changes
+    state (pushed through Postgres NOTIFY), or after `wait` seconds with the
+    status read on entry. No database query runs while waiting.
+
+    Args:
+        job_id: Job ID
+        wait: Maximum seconds to wait
+
+    Returns:
+        dict | None: Job status (see get_job_status), or None if the job does not exist
+    """
+    cached = job_response_cache.get(str(job_id))
+    if cached is not None:
+        return cached
+
+    # Subscribe before reading, so a change right after the read still wakes us
+    with job_events.subscribe(job_id) as subscription:
+        job_info = await asyncio.to_thread(load_job_status, job_id)
+        if job_info is None or job_info["status"] in TERMINAL_JOB_STATUSES or wait <= 0:
+            return job_info
+        if await subscription.wait(wait):
+            job_info = await asyncio.to_thread(load_job_status, job_id)
+        return job_info
 
+
+async def watch_job_status(job_id: str) -> AsyncIterator[dict]:
+    """
+    Yields the job's status on subscription and again after every change,
+    until the job is finished. The job is also re-read every JOB_WATCH_RESYNC
+    seconds in case a notification was lost.
+    """
+    with job_events.subscribe(job_id) as subscription:
+        last_info = None
+        while True:
+            job_info = await asyncio.to_thread(load_job_status, job_id)
+            if job_info is None:
+                return
+            if job_info != last_info:
+                yield job_info
+                last_info = job_info
+            if job_info["status"] in TERMINAL_JOB_STATUSES:
+                return
+            await subscription.wait(JOB_WATCH_RESYNC)
+
+
+def _job_response(job: ReviewJobs) -> dict:
     resp = {
         "jobId": str(job.job_id),
         "status": job.status,
         "reviewId": str(job.review_id) if job.review_id else None,  # Include reviewId
     }
 
-    if job.status == "completed" and job.review_id:
-        review = session.query(Reviews).filter(Reviews.review_id == job.review_id).first()
-        if review:
-            formatted_response = format_review_response(review)
-            resp["reviews"] = formatted_response["reviews"]
+    if job.status == "completed" and job.review:
+        formatted_response = format_review_response(job.review)
+        resp["reviews"] = formatted_response["reviews"]
+
+    elif job.status == "in_progress":
+        # Categories already parsed from the LLM stream (only known to the processing worker's process)
+        with _partial_results_lock:
+            partial = list(_partial_results.get(str(job.job_id), []))
+        if partial:
+            resp["partialReviews"] = partial
 
     return resp
 
 
+def get_batch_status(session: Session, parent: ReviewJobs) -> dict:
+    """
+    Aggregated status of a batch: overall status, per-status counts and every
+    file's status with its (partial) results, loaded in one round trip.
+    """
+    children = (
+        session.query(ReviewJobs)
+        .options(selectinload(ReviewJobs.review).selectinload(Reviews.categories))
+        .filter(ReviewJobs.parent_job_id == parent.job_id)
+        .order_by(ReviewJobs.batch_index)
+        .all()
+    )
+
+    counts: dict[str, int] = {}
+    jobs = []
+    for child in children:
+        counts[child.status] = counts.get(child.status, 0) + 1
+        entry = _job_response(child)
+        entry["fileName"] = (child.payload or {}).get("fileName")
+        jobs.append(entry)
+
+    # A canceled batch stays canceled even if some files completed before
+    status = _aggregate_batch_status(counts) if children and parent.status != "canceled" else parent.status
+    return {
+        "jobId": str(parent.job_id),
+        "status": status,
+        "total": len(children),
+        "counts": counts,
+        "jobs": jobs,
+    }
+
+
 def cancel_job(session: Session, job_id: str) -> dict | None:
-    job = session.query(ReviewJobs).filter(ReviewJobs.job_id == job_id).first()
+    """
+    Cancels a job (and the unfinished files of a batch).
+
+    A job shared by deduplicated submissions only loses one submitter; it is
+    canceled when the last one cancels. The row is locked, so a concurrent
+    submission joining the job is either counted or sees it canceled.
+    """
+    job = session.query(ReviewJobs).filter(ReviewJobs.job_id == job_id).with_for_update().first()
     if not job:
         return None
     if job.status in ["completed", "canceled", "error"]:
         return None
 
+    if job.submitters > 1:
+        job.submitters -= 1
+        session.commit()
+        logger.info("Job %s is shared; %s submitter(s) still waiting for it.", job.job_id, job.submitters)
+        return {
+            "jobId": str(job.job_id),
+            "status": job.status,
+            "message": "Cancellation recorded; the job continues for other requests waiting for the same review.",
+        }
+
     job.status = "canceled"
     job.completed_at = datetime.utcnow()
+    job.lease_expires_at = None
+
+    canceled_ids = [str(job.job_id)]
+    if job.is_batch:
+        # Canceling a batch cancels every file that has not finished yet
+        canceled_ids += [
+            str(child_id)
+            for child_id in session.execute(
+                update(ReviewJobs)
+                .where(ReviewJobs.parent_job_id == job.job_id, ReviewJobs.status.in_(["queued", "in_progress"]))
+                .values(status="canceled", completed_at=datetime.utcnow(), lease_expires_at=None)
+                .returning(ReviewJobs.job_id)
+            ).scalars()
+        ]
+    notify_job_changed(session, *canceled_ids)
     session.commit()
 
+    # Stop the generation right away if this process is running it; workers in
+    # other processes notice the status change on their next heartbeat.
+    for canceled_id in canceled_ids:
+        job_executor.cancel(canceled_id)
+
+    if job.parent_job_id:
+        _update_batch_status(session, job.parent_job_id)
+
     return {"jobId": str(job.job_id), "status": job.status, "message": "Job has been canceled."}
 
 
+def _store_review(review_req: ReviewRequest, cat_data: list[dict], model_name: str | None = None) -> dict:
+    """
+    Saves a finished review in its own short session and returns the formatted response.
+    """
+    from .database import SessionLocal
+
+    with SessionLocal() as session:
+        review_id = _save_review(session, review_req=review_req, cat_data=cat_data, model_name=model_name)
+        session.commit()
+    return _review_response(review_id, cat_data)
+
+
 # -----------------------------------------
-# Synchronous (Legacy) Code Review
+# Async (event loop) Code Review
 # -----------------------------------------
-def generate_and_save_review(
-    session: Session,
-    llm_engine: BaseLLMEngine,
+async def _astream_categories(
+    llm_engine: AsyncBaseLLMEngine,
+    prompt_str: str,
+    on_token: Callable[[str], None] | None = None,
+    on_category: Callable[[dict], None] | None = None,
+    categories: list[str] | None = None,
+) -> tuple[list[dict], bool]:
+    if DEBUG_MODE:
+        logger.debug("Review Prompt:\n%s", prompt_str)
+
+    parser = CategoryStreamParser(categories)
+    chunks = []
+    async for chunk in llm_engine.stream_review(prompt_str):
+        chunks.append(chunk)
+        if on_token is not None:
+            on_token(chunk)
+        for item in parser.feed(chunk):
+            if on_category is not None:
+                on_category(item)
+    return _parse_llm_output("".join(chunks), parser)
+
+
+async def _amap_reduce_review(
+    llm_engine: AsyncBaseLLMEngine,
     language_str: str,
-    sourcecode_str: str,
-    diff_str: str | None = None,
-    filename_str: str | None = None,
-    options_dict: dict | None = None,
-    prompt_str: str | None = None,
-) -> dict:
+    chunks: list[SourceChunk],
+    options: dict | None = None,
+    on_category: Callable[[dict], None] | None = None,
+) -> tuple[list[dict], bool]:
+    """
+    Async variant of _map_reduce_review: at most REVIEW_CHUNK_CONCURRENCY chunks
+    are generated at once. A failing chunk cancels the others.
+    """
+    semaphore = asyncio.Semaphore(max(1, REVIEW_CHUNK_CONCURRENCY))
+
+    async def review_chunk(chunk: SourceChunk) -> tuple[list[dict], bool]:
+        async with semaphore:
+            prompt_str = _chunk_prompt(language_str, chunk, chunks, options)
+            return await _astream_categories(
+                llm_engine, prompt_str, on_category=on_category, categories=_selected_categories(options)
+            )
+
+    tasks = [asyncio.ensure_future(review_chunk(chunk)) for chunk in chunks]
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    merged = merge_chunk_categories(
+        [(chunk, cat_data) for chunk, (cat_data, _parsed) in zip(chunks, results, strict=True)]
+    )
+    return merged, all(parsed for _cat_data, parsed in results)
+
+
+async def _areview_categories(
+    llm_engine: AsyncBaseLLMEngine,
+    review_req: ReviewRequest,
+    on_token: Callable[[str], None] | None = None,
+    on_category: Callable[[dict], None] | None = None,
+) -> list[dict]:
+    """
+    Async variant of _review_categories. The LLM call is awaited on the event
+    loop; only the short cache lookups run in worker threads. Concurrent
+    identical requests share one generation.
+
+    Chunked reviews (oversized sources) report categories but no tokens.
+    """
+    cache_key = _review_cache_key(llm_engine, review_req)
+    cached = await asyncio.to_thread(review_cache.get, cache_key)
+    if cached is not None:
+        return cached
+
+    async def generate(emit: Callable[[tuple[str, Any]], None]) -> list[dict]:
+        prompt_str = _format_prompt(review_req.language, review_req.sourceCode, review_req.diff, review_req.options)
+        chunks = _plan_chunks(llm_engine, review_req.language, review_req.sourceCode, prompt_str, review_req.options)
+        if chunks:
+            cat_data, parsed = await _amap_reduce_review(
+                llm_engine, review_req.language, chunks, review_req.options, lambda item: emit(("category", item))
+            )
+        else:
+            cat_data, parsed = await _astream_categories(
+                llm_engine,
+                prompt_str,
+                on_token=lambda text: emit(("token", text)),
+                on_category=lambda item: emit(("category", item)),
+                categories=_selected_categories(review_req.options),
+            )
+
+        if parsed:
+            await asyncio.to_thread(review_cache.put, cache_key, cat_data, llm_engine.model_name)
+        return cat_data
+
+    def listener(event: tuple[str, Any]) -> None:
+        kind, value = event
+        if kind == "token" and on_token is not None:
+            on_token(value)
+        elif kind == "category" and on_category is not None:
+            on_category(value)
+
+    # Identical concurrent requests attach to the in-flight generation (and replay its progress)
+    return await async_review_flights.do(cache_key, generate, listener)
+
+
+async def agenerate_and_save_review(llm_engine: AsyncBaseLLMEngine, review_req: ReviewRequest) -> dict:
     """
-    Synchronously calls the LLM to generate multiple categories and returns formatted response.
+    Generates a review on the event loop and saves it.
+
+    No thread is held while the model generates; the DB session is opened only
+    to store the finished review.
 
     Args:
-        session: Database session
-        llm_engine: LLM engine instance
-        language_str: Programming language of code to review
-        sourcecode_str: Source code to review
-        diff_str: Optional diff information
-        filename_str: Optional filename
-        options_dict: Optional additional options
-        prompt_str: Optional custom prompt (if None, one will be generated)
+        llm_engine: Async LLM engine instance
+        review_req: Review request data
 
     Returns:
         Dict: Formatted review response with reviewId and reviews
     """
-    try:
-        if prompt_str is None:
-            # In case we want to pass a custom prompt
-            prompt_str = _format_prompt(language_str, sourcecode_str, diff_str)
+    cat_data = await _areview_categories(llm_engine, review_req)
+    return await asyncio.to_thread(_store_review, review_req, cat_data, llm_engine.model_name)
 
-        if DEBUG_MODE:
-            logger.debug(f"Synchronous Review Prompt:\n{prompt_str}")
 
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(llm_engine.generate_review, prompt_str)
-            raw_output = future.result()
+def overload_details(error: NoBackendAvailableError) -> dict:
+    """
+    Describes a shed request: 429 when the backends are saturated, 503 when none
+    is healthy (or every circuit is open), with the suggested Retry-After seconds.
+    """
+    return {
+        "status": 429 if isinstance(error, BackendSaturatedError) else 503,
+        "detail": str(error),
+        "retryAfter": math.ceil(error.retry_after),
+    }
 
-        cat_data = _parse_llm_output(raw_output)
 
-        new_review = Reviews(
-            language=language_str,
-            source_code=sourcecode_str,
-            diff=diff_str,
-            file_name=filename_str,
-            options=options_dict,
-        )
-        session.add(new_review)
-        session.flush()
+async def astream_review_events(
+    llm_engine: AsyncBaseLLMEngine, review_req: ReviewRequest
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Streaming variant of agenerate_and_save_review.
 
-        for cat_item in cat_data:
-            rc = ReviewCategories(
-                review_id=new_review.review_id, category_name=cat_item["category"], message=cat_item["message"]
-            )
-            session.add(rc)
+    Yields (event, data) pairs:
+    - ("token", {"text": ...}) for every fragment generated by the LLM
+    - ("category", {"category": ..., "message": ...}) as soon as each object is complete
+    - ("result", {"reviewId": ..., "reviews": [...]}) once the review is saved
+    - ("error", {"detail": ...}) if generation or saving fails
 
-        session.commit()
-        session.refresh(new_review)
+    A cache hit yields the result immediately without any token events.
 
-        if DEBUG_MODE:
-            logger.debug(f"Synchronous review created. ID: {new_review.review_id}")
+    When the client disconnects the generator is closed, which cancels the
+    generation and closes the connection to the model.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    task = asyncio.ensure_future(
+        _areview_categories(
+            llm_engine,
+            review_req,
+            on_token=lambda text: events.put_nowait(("token", {"text": text})),
+            on_category=lambda item: events.put_nowait(("category", item)),
+        )
+    )
+    try:
+        while not task.done() or not events.empty():
+            getter = asyncio.ensure_future(events.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
 
-        # Format the review response before returning
-        return format_review_response(new_review)
+        cat_data = task.result()
+        yield "result", await asyncio.to_thread(_store_review, review_req, cat_data, llm_engine.model_name)
 
-    except Exception as e:
-        logger.exception(f"Error occurred while generating or saving the review: {e!s}")
-        session.rollback()
-        raise
+    except NoBackendAvailableError as e:
+        yield "error", overload_details(e)
+
+    except Exception:
+        logger.exception("Error occurred while streaming the review")
+        yield "error", {"detail": "Failed to perform code review."}
+
+    finally:
+        task.cancel()
 
 
 def save_feedback(session: Session, review_id_str: str, feedback_list: list[tuple[str, str]]) -> dict:
     """
-    Saves user feedback to the database after verifying the review exists.
+    Saves user feedback to the database in one multi-row INSERT, and adds it
+    to the feedback counters in the same transaction.
+
+    The review's existence is not queried first: the foreign key rejects
+    feedback for unknown reviews, which is reported as 404.
 
     Args:
         session: Database session
@@ -394,19 +1381,28 @@ def save_feedback(session: Session, review_id_str: str, feedback_list: list[tupl
         HTTPException: If review not found or other error occurs
     """
     try:
-        review = session.query(Reviews).filter(Reviews.review_id == review_id_str).first()
-        if not review:
-            raise ValueError(f"Review with ID {review_id_str} not found.")
-
-        saved_count = 0
-        for category_name, feedback_value in feedback_list:
-            fb = ReviewFeedback(review_id=review_id_str, category_name=category_name, user_feedback=feedback_value)
-            session.add(fb)
-            saved_count += 1
+        if not feedback_list:
+            _ensure_review_exists(session, review_id_str)
+            return {"reviewId": review_id_str, "status": "success", "feedbackSaved": 0}
 
-        session.commit()
+        try:
+            session.execute(
+                insert(ReviewFeedback).values(
+                    [
+                        {"review_id": review_id_str, "category_name": category_name, "user_feedback": feedback_value}
+                        for category_name, feedback_value in feedback_list
+                    ]
+                )
+            )
+            _count_feedback(session, review_id_str, feedback_list)
+            session.commit()
+        except IntegrityError as e:
+            session.rollback()
+            if getattr(e.orig, "pgcode", None) == _FOREIGN_KEY_VIOLATION:
+                raise ValueError(f"Review with ID {review_id_str} not found.") from e
+            raise
 
-        return {"reviewId": review_id_str, "status": "success", "feedbackSaved": saved_count}
+        return {"reviewId": review_id_str, "status": "success", "feedbackSaved": len(feedback_list)}
 
     except ValueError as e:
         logger.error(f"Error while saving feedback: {e}")
@@ -422,6 +1418,109 @@ def save_feedback(session: Session, review_id_str: str, feedback_list: list[tupl
         raise HTTPException(status_code=500, detail="Failed to save feedback")
 
 
+def _ensure_review_exists(session: Session, review_id_str: str) -> None:
+    if session.get(Reviews, review_id_str) is None:
+        raise ValueError(f"Review with ID {review_id_str} not found.")
+
+
+def _count_feedback(session: Session, review_id_str: str, feedback_list: list[tuple[str, str]]) -> None:
+    """
+    Adds feedback to the FeedbackStats counters of the review's language and
+    model, in one INSERT ... SELECT ... ON CONFLICT DO UPDATE (without committing).
+    """
+    counts: dict[str, list[int]] = {}
+    for category_name, feedback_value in feedback_list:
+        good_bad_total = counts.setdefault(category_name, [0, 0, 0])
+        verdict = feedback_value.strip().lower()
+        good_bad_total[0] += verdict == "good"
+        good_bad_total[1] += verdict == "bad"
+        good_bad_total[2] += 1
+
+    rows = values(
+        column("category_name", String),
+        column("good", BigInteger),
+        column("bad", BigInteger),
+        column("total", BigInteger),
+        name="counts",
+    ).data([(category_name, *good_bad_total) for category_name, good_bad_total in counts.items()])
+    # Rows are locked in category order, so concurrent feedback cannot deadlock
+    source = (
+        select(
+            rows.c.category_name,
+            Reviews.language,
+            func.coalesce(Reviews.model_name, ""),
+            rows.c.good,
+            rows.c.bad,
+            rows.c.total,
+        )
+        .select_from(rows.join(Reviews, Reviews.review_id == review_id_str))
+        .order_by(rows.c.category_name)
+    )
+    statement = pg_insert(FeedbackStats).from_select(
+        ["category_name", "language", "model_name", "good_count", "bad_count", "total_count"], source
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[FeedbackStats.category_name, FeedbackStats.language, FeedbackStats.model_name],
+            set_={
+                "good_count": FeedbackStats.good_count + statement.excluded.good_count,
+                "bad_count": FeedbackStats.bad_count + statement.excluded.bad_count,
+                "total_count": FeedbackStats.total_count + statement.excluded.total_count,
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+def get_feedback_stats(
+    session: Session,
+    category: str | None = None,
+    language: str | None = None,
+    model: str | None = None,
+    group_by: Iterable[str] = ("category", "language", "model"),
+) -> dict:
+    """
+    Feedback counts from the precomputed FeedbackStats counters (a small table:
+    one row per category, language and model), optionally filtered and rolled up.
+
+    Args:
+        session: Database session
+        category / language / model: Filters (model "" = reviews with unknown model)
+        group_by: Keys of FEEDBACK_STATS_GROUPS to group by; the others are summed over
+
+    Returns:
+        dict: {"groupBy": [...], "totals": {...}, "stats": [{<group keys>, good, bad, total, badRatio}, ...]}
+
+    Raises:
+        ValueError: If group_by contains an unknown key
+    """
+    group_by = list(dict.fromkeys(group_by))
+    unknown = [key for key in group_by if key not in FEEDBACK_STATS_GROUPS]
+    if unknown:
+        raise ValueError(f"Unknown groupBy key(s): {', '.join(unknown)} (use {', '.join(FEEDBACK_STATS_GROUPS)})")
+
+    keys = [FEEDBACK_STATS_GROUPS[key].label(key) for key in group_by]
+    query = select(
+        *keys,
+        func.sum(FeedbackStats.good_count).label("good"),
+        func.sum(FeedbackStats.bad_count).label("bad"),
+        func.sum(FeedbackStats.total_count).label("total"),
+    )
+    for key, value in (("category", category), ("language", language), ("model", model)):
+        if value is not None:
+            query = query.where(FEEDBACK_STATS_GROUPS[key] == value)
+    query = query.group_by(*keys).order_by(*keys)
+
+    def entry(good, bad, total, **group) -> dict:
+        good, bad, total = int(good or 0), int(bad or 0), int(total or 0)
+        bad_ratio = round(bad / total, 4) if total else None
+        return {**group, "good": good, "bad": bad, "total": total, "badRatio": bad_ratio}
+
+    stats = [entry(**row) for row in session.execute(query).mappings()]
+    totals = entry(*(sum(item[field] for item in stats) for field in ("good", "bad", "total")))
+    return {"groupBy": group_by, "totals": totals, "stats": stats}
+
+
 # -----------------------------------------
 # API Layer Functions (for FastAPI routes)
 # -----------------------------------------
@@ -440,23 +1539,11 @@ async def create_review(session: Session, review_req: ReviewRequest, async_mode:
         Dict: Response with either job ID (async) or complete review (sync)
     """
     if async_mode:
-        job_id = queue_review_job(session, review_req)
-        return {"jobId": job_id, "status": "queued"}
-    from .llm_engines.ollama_engine import OllamaEngine
-
-    engine = OllamaEngine()
-
-    result = generate_and_save_review(
-        session=session,
-        llm_engine=engine,
-        language_str=review_req.language,
-        sourcecode_str=review_req.sourceCode,
-        diff_str=review_req.diff,
-        filename_str=review_req.fileName,
-        options_dict=review_req.options,
-    )
+        job = queue_review_job(session, review_req)
+        return {"jobId": job["jobId"], "status": job["status"]}
+    from .llm_engines.ollama_engine import get_async_ollama_engine
 
-    return result
+    return await agenerate_and_save_review(get_async_ollama_engine(), review_req)
 
 
 async def get_review_status(session: Session, job_id: str) -> dict:
@@ -496,13 +1583,21 @@ async def get_review_by_id(session: Session, review_id: str) -> dict:
     Raises:
         HTTPException: If review not found
     """
-    review = session.query(Reviews).filter(Reviews.review_id == review_id).first()
+    cached = review_response_cache.get(str(review_id))
+    if cached is not None:
+        return cached
+
+    review = (
+        session.query(Reviews).options(selectinload(Reviews.categories)).filter(Reviews.review_id == review_id).first()
+    )
     if not review:
         from fastapi import HTTPException
 
         raise HTTPException(status_code=404, detail=f"Review with ID {review_id} not found")
 
-    return format_review_response(review)
+    response = format_review_response(review)
+    review_response_cache.put(str(review_id), response)
+    return response
 
 
 async def submit_feedback(session: Session, review_id: str, feedback_data: list[dict[str, str]]) -> dict:
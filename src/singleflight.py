@@ -0,0 +1,214 @@
+"""
+singleflight.py
+In-flight Request Coalescing
+============================
+
+Concurrent calls for the same key share a single execution: the first caller
+(the leader) runs the work, callers arriving while it is in flight (followers)
+wait for and receive the leader's result. Used to make bursts of identical
+review requests (e.g. monorepo CI fan-out) cost one LLM generation.
+
+- SingleFlight: for worker threads
+- AsyncSingleFlight: for coroutines on the event loop
+
+Followers also receive the progress events (tokens, categories) the leader
+emitted so far, then every further event as it is emitted.
+
+Only calls that overlap in time are coalesced; finished results are the
+review cache's business.
+"""
+
+import asyncio
+import logging
+import threading
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.events: list[Any] = []
+        self.listeners: list[Callable[[Any], None]] = []
+        # Held while delivering events, so every listener sees them in order
+        self.events_lock = threading.Lock()
+
+    def emit(self, event: Any) -> None:
+        with self.events_lock:
+            self.events.append(event)
+            for listener in self.listeners:
+                listener(event)
+
+    def listen(self, listener: Callable[[Any], None]) -> None:
+        with self.events_lock:
+            for event in self.events:
+                listener(event)
+            self.listeners.append(listener)
+
+    def unlisten(self, listener: Callable[[Any], None]) -> None:
+        with self.events_lock:
+            self.listeners.remove(listener)
+
+
+class SingleFlight:
+    """
+    Thread-based single-flight group.
+    """
+
+    def __init__(self, retry_on: tuple[type[BaseException], ...] = ()):
+        """
+        Args:
+            retry_on: Leader errors after which followers run the work themselves
+                instead of failing (e.g. the leader's job was canceled)
+        """
+        self.retry_on = retry_on
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[Callable[[Any], None]], T],
+        interrupt_check: Callable[[], None] | None = None,
+        poll_interval: float = 0.5,
+        listener: Callable[[Any], None] | None = None,
+    ) -> tuple[T, bool]:
+        """
+        Runs fn(emit), or waits for the in-flight call with the same key.
+
+        Args:
+            key: Coalescing key
+            fn: Work to run when this caller is the leader, receiving an
+                `emit(event)` callback for progress events
+            interrupt_check: Called periodically while following; raising from
+                it stops waiting (the leader keeps running)
+            poll_interval: Seconds between interrupt checks
+            listener: Receives every progress event of the call this caller
+                runs or joins, including those emitted before joining
+
+        Returns:
+            tuple: (result, shared) where shared is True for followers
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+
+            if listener is not None:
+                call.listen(listener)
+            if leader:
+                return self._lead(key, call, fn), False
+
+            logger.info("Joining in-flight review %s", key[:12])
+            self._follow(call, interrupt_check, poll_interval, listener)
+            if call.error is None:
+                return call.result, True
+            if not isinstance(call.error, self.retry_on):
+                raise call.error
+            logger.info("In-flight review %s was aborted; running it for this request", key[:12])
+
+    def _lead(self, key: str, call: _Call, fn: Callable[[Callable[[Any], None]], T]) -> T:
+        try:
+            call.result = fn(call.emit)
+        except BaseException as e:
+            call.error = e
+            raise
+        else:
+            return call.result
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    @staticmethod
+    def _follow(
+        call: _Call,
+        interrupt_check: Callable[[], None] | None,
+        poll_interval: float,
+        listener: Callable[[Any], None] | None,
+    ) -> None:
+        try:
+            while not call.done.wait(poll_interval):
+                if interrupt_check is not None:
+                    interrupt_check()
+        finally:
+            if listener is not None:
+                call.unlisten(listener)
+
+
+class _Flight:
+    def __init__(self):
+        self.task: asyncio.Task | None = None
+        self.events: list[Any] = []
+        self.listeners: list[Callable[[Any], None]] = []
+        self.waiters = 0
+
+    def emit(self, event: Any) -> None:
+        self.events.append(event)
+        for listener in list(self.listeners):
+            listener(event)
+
+
+class AsyncSingleFlight:
+    """
+    asyncio single-flight group with progress event replay.
+
+    The work runs in its own task, so a caller going away (e.g. a client
+    disconnecting from a stream) does not abort it for the others; the task is
+    canceled only when every caller has gone.
+    """
+
+    def __init__(self):
+        self._flights: dict[str, _Flight] = {}
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[Callable[[Any], None]], Awaitable[T]],
+        listener: Callable[[Any], None] | None = None,
+    ) -> T:
+        """
+        Runs fn(emit), or joins the in-flight call with the same key.
+
+        Args:
+            key: Coalescing key
+            fn: Coroutine function receiving an `emit(event)` callback for progress events
+            listener: Receives every progress event, including those emitted before joining
+
+        Returns:
+            The shared result
+        """
+        flight = self._flights.get(key)
+        if flight is None or flight.task.done() or flight.task.get_loop() is not asyncio.get_running_loop():
+            flight = _Flight()
+            flight.task = asyncio.ensure_future(fn(flight.emit))
+            flight.task.add_done_callback(lambda _task, key=key, flight=flight: self._forget(key, flight))
+            self._flights[key] = flight
+        else:
+            logger.info("Joining in-flight review %s", key[:12])
+
+        if listener is not None:
+            for event in flight.events:
+                listener(event)
+            flight.listeners.append(listener)
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if listener is not None:
+                flight.listeners.remove(listener)
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
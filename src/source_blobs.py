@@ -0,0 +1,156 @@
+"""
+source_blobs.py
+Content-addressed Source Storage
+================================
+
+Source code and diffs are stored once per distinct content in the source_blobs
+table, compressed, and referenced by their SHA-256 from reviews (and from queued
+job payloads). Reviewing the same file a hundred times stores it once.
+
+- store_blobs() writes the blobs that do not exist yet (compressing only those)
+  and returns their hashes; concurrent writers of the same content are fine
+  (INSERT ... ON CONFLICT DO NOTHING)
+- load_blobs() / load_blob() read and decompress them
+- Each blob records its codec, so blobs written with different settings can be
+  read side by side
+
+Configuration (environment):
+- SOURCE_BLOB_COMPRESSION: "zstd" (needs the `zstandard` package), "zlib" or
+  "none"; defaults to zstd when zstandard is installed, zlib otherwise
+- SOURCE_BLOB_LEVEL: compression level (default 3 for zstd, 6 for zlib)
+"""
+
+import hashlib
+import logging
+import os
+import zlib
+from collections.abc import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .models_db import SourceBlobs
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownCodecError(ValueError):
+    """Raised for a compression codec other than zstd, zlib or none."""
+
+    def __init__(self, codec: str, source: str = "source blob codec"):
+        super().__init__(f"Unknown {source} {codec!r} (zstd, zlib or none)")
+        self.codec = codec
+
+
+class ZstandardMissingError(RuntimeError):
+    """Raised when reading a zstd-compressed blob without the `zstandard` package."""
+
+    def __init__(self):
+        super().__init__("Source blob is zstd-compressed but `zstandard` is not installed")
+
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SOURCE_BLOB_COMPRESSION = os.getenv("SOURCE_BLOB_COMPRESSION", "zstd" if zstandard is not None else "zlib").lower()
+_DEFAULT_LEVELS = {"zstd": 3, "zlib": 6, "none": 0}
+SOURCE_BLOB_LEVEL = int(os.getenv("SOURCE_BLOB_LEVEL", str(_DEFAULT_LEVELS.get(SOURCE_BLOB_COMPRESSION, 0))))
+
+if SOURCE_BLOB_COMPRESSION not in _DEFAULT_LEVELS:
+    raise UnknownCodecError(SOURCE_BLOB_COMPRESSION, source="SOURCE_BLOB_COMPRESSION")
+if SOURCE_BLOB_COMPRESSION == "zstd" and zstandard is None:
+    logger.warning("SOURCE_BLOB_COMPRESSION=zstd but `zstandard` is not installed; using zlib.")
+    SOURCE_BLOB_COMPRESSION, SOURCE_BLOB_LEVEL = "zlib", _DEFAULT_LEVELS["zlib"]
+
+# Contents smaller than this are not worth compressing
+_MIN_COMPRESS_SIZE = 256
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 (hex) of the UTF-8 encoded content; the blob's key."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def compress(raw: bytes, codec: str = SOURCE_BLOB_COMPRESSION, level: int = SOURCE_BLOB_LEVEL) -> tuple[str, bytes]:
+    """
+    Compresses raw bytes.
+
+    Returns:
+        tuple: (codec actually used, data); small or incompressible input is stored as "none"
+    """
+    if codec == "none" or len(raw) < _MIN_COMPRESS_SIZE:
+        return "none", raw
+    data = zstandard.ZstdCompressor(level=level).compress(raw) if codec == "zstd" else zlib.compress(raw, level)
+    if len(data) >= len(raw):
+        return "none", raw
+    return codec, data
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "none":
+        return bytes(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise ZstandardMissingError
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise UnknownCodecError(codec)
+
+
+def store_blobs(session: Session, *contents: str | None) -> list[str | None]:
+    """
+    Stores each content (None entries are skipped) and returns their hashes, in
+    order. Runs in the session's transaction without committing.
+
+    Only contents that are not stored yet are compressed and inserted: one
+    SELECT for the lookup, one multi-row INSERT for the rest.
+
+    Returns:
+        list: Blob hash per content (None for None)
+    """
+    hashes = [content_hash(content) if content is not None else None for content in contents]
+    pending = {
+        blob_hash: content for blob_hash, content in zip(hashes, contents, strict=True) if blob_hash is not None
+    }
+    if not pending:
+        return hashes
+
+    existing = session.execute(select(SourceBlobs.blob_hash).where(SourceBlobs.blob_hash.in_(pending))).scalars()
+    for blob_hash in existing:
+        del pending[blob_hash]
+
+    if pending:
+        rows = []
+        for blob_hash, content in pending.items():
+            raw = content.encode("utf-8")
+            codec, data = compress(raw)
+            rows.append({"blob_hash": blob_hash, "codec": codec, "size": len(raw), "data": data})
+        session.execute(insert(SourceBlobs).values(rows).on_conflict_do_nothing(index_elements=["blob_hash"]))
+
+    return hashes
+
+
+def load_blobs(session: Session, hashes: Iterable[str | None]) -> dict[str, str]:
+    """
+    Reads and decompresses blobs in one query.
+
+    Returns:
+        dict: Content by hash (hashes that do not exist are missing)
+    """
+    wanted = {blob_hash for blob_hash in hashes if blob_hash}
+    if not wanted:
+        return {}
+    rows = session.execute(
+        select(SourceBlobs.blob_hash, SourceBlobs.codec, SourceBlobs.data).where(SourceBlobs.blob_hash.in_(wanted))
+    )
+    return {blob_hash: decompress(codec, data).decode("utf-8") for blob_hash, codec, data in rows}
+
+
+def load_blob(session: Session, blob_hash: str | None) -> str | None:
+    if blob_hash is None:
+        return None
+    return load_blobs(session, [blob_hash]).get(blob_hash)
@@ -0,0 +1,258 @@
+"""
+stream_parser.py
+Incremental LLM Output Parser
+=============================
+
+Extracts {"category": ..., "message": ...} objects from LLM output while it is
+still being generated.
+
+- Token chunks are fed in as they arrive (feed)
+- <think>...</think> blocks are skipped on the fly; if the output ends inside
+  an unclosed <think> block, the text after the tag is scanned after all
+- Each top-level JSON object is emitted as soon as its closing brace arrives
+- Optionally only the requested categories are kept (matched case-insensitively
+  and reported under their configured name); others are dropped
+
+Runs in a single linear pass over the text, so long reasoning-model outputs do
+not trigger the backtracking of the old regex-based extraction.
+"""
+
+import json
+import logging
+import re
+from collections.abc import Iterable
+
+logger = logging.getLogger(__name__)
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+# Characters that matter outside / inside a JSON object
+_OUTSIDE_SPECIAL = re.compile(r"[{<]")
+_INSIDE_SPECIAL = re.compile(r'[{}"\\]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class CategoryStreamParser:
+    """
+    Incremental extractor of review category objects.
+
+    Usage:
+        parser = CategoryStreamParser()
+        for chunk in llm_engine.stream_review(prompt):
+            for item in parser.feed(chunk):
+                ...  # {"category": ..., "message": ...}
+        parser.close()
+    """
+
+    def __init__(self, categories: Iterable[str] | None = None):
+        self.items: list[dict] = []
+        # Objects discarded because their category was not requested
+        self.dropped = 0
+        self._allowed = {name.casefold(): name for name in categories} if categories is not None else None
+
+        self._buffer = ""
+        self._pos = 0
+        self._in_think = False
+        # Text of the open <think> block already dropped from the buffer, and
+        # where the rest of it starts in the buffer (rescanned if never closed)
+        self._think_parts: list[str] = []
+        self._think_start = 0
+        self._depth = 0
+        self._in_string = False
+        self._object_start = -1
+
+    def feed(self, chunk: str) -> list[dict]:
+        """
+        Consumes a chunk of LLM output.
+
+        Returns:
+            list[dict]: Category objects completed by this chunk (possibly empty)
+        """
+        if not chunk:
+            return []
+        self._buffer += chunk
+        completed = self._scan()
+        self._compact()
+        return completed
+
+    def close(self) -> list[dict]:
+        """
+        Signals the end of the output. Returns every object extracted so far.
+
+        If the output ended inside an unterminated object (e.g. a stray "{" in
+        prose before the JSON), the text after that brace is scanned again. If
+        it ended inside a <think> block that was never closed, the text after
+        the <think> tag is scanned as regular output.
+        """
+        while self._depth or self._in_think:
+            if self._in_think:
+                logger.debug("LLM output ended inside an unclosed <think> block; rescanning after the tag")
+                pending = "".join(self._think_parts) + self._buffer[self._think_start :]
+                self._in_think = False
+                self._think_parts = []
+            else:
+                logger.debug("LLM output ended inside an unterminated JSON object; rescanning after it")
+                pending = self._buffer[self._object_start + 1 :]
+            self._buffer = pending
+            self._pos = 0
+            self._depth = 0
+            self._in_string = False
+            self._object_start = -1
+            self._scan()
+        return self.items
+
+    # -----------------------------------------
+    # Scanner
+    # -----------------------------------------
+    def _scan(self) -> list[dict]:
+        """
+        Advances over the buffer until it runs out of complete input.
+        Each state step returns False when it needs more data to continue.
+        """
+        completed: list[dict] = []
+        buf = self._buffer
+
+        while self._pos < len(buf):
+            if self._in_think:
+                advanced = self._scan_think(buf)
+            elif self._depth == 0:
+                advanced = self._scan_outside(buf)
+            elif self._in_string:
+                advanced = self._scan_string(buf)
+            else:
+                advanced = self._scan_object(buf, completed)
+            if not advanced:
+                break
+
+        return completed
+
+    def _scan_think(self, buf: str) -> bool:
+        end = buf.find(THINK_CLOSE, self._pos)
+        if end == -1:
+            # Keep a tail in case the closing tag is split across chunks
+            self._pos = max(self._pos, len(buf) - len(THINK_CLOSE) + 1)
+            return False
+        self._pos = end + len(THINK_CLOSE)
+        self._in_think = False
+        self._think_parts = []
+        return True
+
+    def _scan_outside(self, buf: str) -> bool:
+        match = _OUTSIDE_SPECIAL.search(buf, self._pos)
+        if not match:
+            self._pos = len(buf)
+            return False
+        idx = match.start()
+        if buf[idx] == "{":
+            self._object_start = idx
+            self._depth = 1
+            self._pos = idx + 1
+            return True
+        if buf.startswith(THINK_OPEN, idx):
+            self._in_think = True
+            self._pos = idx + len(THINK_OPEN)
+            self._think_start = self._pos
+            return True
+        if THINK_OPEN.startswith(buf[idx:]):
+            # Possibly a <think> tag split across chunks; wait for more data
+            self._pos = idx
+            return False
+        self._pos = idx + 1
+        return True
+
+    def _scan_string(self, buf: str) -> bool:
+        match = _STRING_SPECIAL.search(buf, self._pos)
+        if not match:
+            self._pos = len(buf)
+            return False
+        idx = match.start()
+        if buf[idx] == "\\":
+            # Skip the escaped character (may be in the next chunk)
+            if idx + 1 >= len(buf):
+                self._pos = idx
+                return False
+            self._pos = idx + 2
+            return True
+        self._in_string = False
+        self._pos = idx + 1
+        return True
+
+    def _scan_object(self, buf: str, completed: list[dict]) -> bool:
+        match = _INSIDE_SPECIAL.search(buf, self._pos)
+        if not match:
+            self._pos = len(buf)
+            return False
+        idx = match.start()
+        char = buf[idx]
+        self._pos = idx + 1
+        if char == '"':
+            self._in_string = True
+        elif char == "{":
+            self._depth += 1
+        elif char == "}":
+            self._depth -= 1
+            if self._depth == 0:
+                items = self._filter(self._decode(buf[self._object_start : idx + 1]))
+                self._object_start = -1
+                self.items.extend(items)
+                completed.extend(items)
+        return True
+
+    def _compact(self) -> None:
+        """Drops consumed text so the buffer only holds the pending object / tag."""
+        keep_from = self._object_start if self._depth else self._pos
+        if keep_from > 0:
+            if self._in_think:
+                # Keep the dropped reasoning text in case the block is never closed
+                self._think_parts.append(self._buffer[self._think_start : keep_from])
+                self._think_start = 0
+            self._buffer = self._buffer[keep_from:]
+            self._pos -= keep_from
+            if self._depth:
+                self._object_start = 0
+
+    def _filter(self, items: list[dict]) -> list[dict]:
+        if self._allowed is None:
+            return items
+        kept = []
+        for item in items:
+            name = self._allowed.get(item["category"].strip().casefold())
+            if name is None:
+                logger.debug("Dropping category not requested: %s", item["category"])
+                self.dropped += 1
+                continue
+            kept.append({**item, "category": name})
+        return kept
+
+    def _decode(self, text: str) -> list[dict]:
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError:
+            logger.debug("Skipping malformed JSON object in LLM output: %s", text[:100])
+            return []
+        return _extract_categories(obj)
+
+
+def _extract_categories(obj) -> list[dict]:
+    """
+    Returns the category objects in a decoded JSON value.
+    Also looks one level into wrapper objects such as {"reviews": [...]}.
+    """
+    if not isinstance(obj, dict):
+        return []
+
+    category = obj.get("category")
+    message = obj.get("message")
+    if category and message and isinstance(category, str):
+        if not isinstance(message, str):
+            message = json.dumps(message, ensure_ascii=False)
+        return [{"category": category, "message": message}]
+
+    items = []
+    for value in obj.values():
+        if isinstance(value, list):
+            for entry in value:
+                if isinstance(entry, dict) and "category" in entry:
+                    items.extend(_extract_categories(entry))
+    return items
@@ -0,0 +1,84 @@
+import pytest
+
+from src.conftest import FakeOllamaSession
+from src.llm_engines.backend_pool import (
+    BackendPool,
+    BackendSaturatedError,
+    NoBackendAvailableError,
+    parse_backend_limits,
+    parse_hosts,
+)
+
+GPU1, GPU2 = "http://gpu1:11434", "http://gpu2:11434"
+
+
+def make_pool(servers, hosts=(GPU1, GPU2), **kwargs) -> BackendPool:
+    settings = {"adaptive_limit": False, "limits": {}}
+    pool = BackendPool(list(hosts), FakeOllamaSession(servers), **{**settings, **kwargs})
+    pool.check_all()
+    return pool
+
+
+def test_parse_hosts_and_limits():
+    assert parse_hosts(" http://a:1/, ,http://b:2") == ["http://a:1", "http://b:2"]
+    assert parse_backend_limits("http://a:1/=4, http://b:2=x,") == {"http://a:1": 4}
+
+
+def test_least_outstanding_backend_is_chosen():
+    pool = make_pool({GPU1: (["m"], []), GPU2: (["m"], [])})
+    with pool.acquire("m") as first, pool.acquire("m") as second:
+        assert {first.url, second.url} == {GPU1, GPU2}
+        assert first.outstanding == second.outstanding == 1
+    assert [backend.outstanding for backend in pool.backends] == [0, 0]
+
+
+def test_only_backends_with_the_model_are_eligible():
+    pool = make_pool({GPU1: (["other"], []), GPU2: (["m"], [])})
+    for _ in range(3):
+        with pool.acquire("m") as backend:
+            assert backend.url == GPU2
+
+
+def test_loaded_model_wins_among_equally_busy_backends():
+    pool = make_pool({GPU1: (["m"], []), GPU2: (["m"], ["m"])})
+    with pool.acquire("m") as backend:
+        assert backend.url == GPU2
+
+
+def test_down_backend_is_skipped_and_exclusion_raises():
+    pool = make_pool({GPU2: (["m"], [])})
+    assert not pool.backends[0].up
+    with pool.acquire("m") as backend:
+        assert backend.url == GPU2
+    with pytest.raises(NoBackendAvailableError), pool.acquire("m", exclude={GPU2}, recheck=False):
+        pass
+
+
+def test_per_host_cap_counts_each_backends_own_requests():
+    pool = make_pool({GPU1: (["m"], []), GPU2: (["m"], [])}, limits={GPU1: 1})
+    with pool.acquire("m") as first:
+        assert first.url == GPU1
+        # GPU1 is full; GPU2 has no cap and takes the rest
+        with pool.acquire("m") as second, pool.acquire("m") as third:
+            assert second.url == third.url == GPU2
+    assert pool.status()[0]["maxOutstanding"] == 1
+
+
+def test_every_capped_backend_full_is_saturation():
+    pool = make_pool({GPU1: (["m"], [])}, hosts=(GPU1,), limits={GPU1: 1})
+    with pool.acquire("m"):
+        with pytest.raises(BackendSaturatedError):
+            pool.check_capacity("m")
+        with pytest.raises(BackendSaturatedError), pool.acquire("m"):
+            pass
+    # The slot is free again
+    pool.check_capacity("m")
+
+
+def test_adaptive_limit_uses_the_lower_of_both_limits():
+    pool = make_pool({GPU1: (["m"], []), GPU2: (["m"], [])}, adaptive_limit=True, limits={GPU2: 1})
+    pool.backends[0].limiter.limit = 4
+    pool.backends[1].limiter.limit = 8
+    # Relative load: GPU2 is full at one request although its adaptive limit is higher
+    with pool.acquire("m") as first, pool.acquire("m") as second, pool.acquire("m") as third:
+        assert [first.url, second.url, third.url].count(GPU2) == 1
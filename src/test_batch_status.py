@@ -0,0 +1,59 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from src import services
+from src.conftest import FakeSession, compiled_params
+
+
+@pytest.mark.parametrize(
+    ("counts", "status"),
+    [
+        ({"queued": 3}, "queued"),
+        ({"queued": 1, "completed": 2}, "in_progress"),
+        ({"in_progress": 1, "error": 1}, "in_progress"),
+        ({"completed": 3}, "completed"),
+        ({"completed": 2, "canceled": 1}, "completed"),
+        ({"completed": 2, "error": 1}, "error"),
+        ({"error": 3}, "error"),
+        ({"canceled": 3}, "canceled"),
+    ],
+)
+def test_aggregate_batch_status(counts, status):
+    assert services._aggregate_batch_status(counts) == status
+
+
+def child(status: str, index: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        job_id=uuid.uuid4(),
+        status=status,
+        review_id=None,
+        review=None,
+        is_batch=False,
+        batch_index=index,
+        payload={"fileName": f"f{index}.py"},
+    )
+
+
+def test_canceled_batch_keeps_its_status():
+    parent = SimpleNamespace(job_id=uuid.uuid4(), status="canceled")
+    session = FakeSession(rows=[child("completed", 0), child("canceled", 1)])
+    response = services.get_batch_status(session, parent)
+    assert response["status"] == "canceled"
+    assert response["counts"] == {"completed": 1, "canceled": 1}
+    assert [job["fileName"] for job in response["jobs"]] == ["f0.py", "f1.py"]
+
+
+def test_batch_with_a_failed_file_reports_error():
+    parent = SimpleNamespace(job_id=uuid.uuid4(), status="in_progress")
+    session = FakeSession(rows=[child("completed", 0), child("error", 1)])
+    assert services.get_batch_status(session, parent)["status"] == "error"
+
+
+def test_finishing_a_job_sets_completed_at():
+    session = FakeSession()
+    services._finish_owned_job(session, str(uuid.uuid4()), "worker", status="error")
+    params = compiled_params(session.statements[0])
+    assert params["status"] == "error"
+    assert params["completed_at"] is not None
@@ -0,0 +1,104 @@
+import re
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from src import services
+from src.conftest import FakeSession, compiled_params
+from src.schemas import BatchReviewRequest, ReviewRequest
+from src.source_blobs import content_hash
+
+REVIEW_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
+
+def written(session: FakeSession) -> list[str]:
+    """Statements the session ran, as "<kind> <table>"."""
+    return [
+        f"{type(statement).__name__} {statement.table.name if statement.is_dml else statement.get_final_froms()[0].name}"
+        for statement in session.statements
+    ]
+
+
+def inserted_rows(statement) -> list[dict]:
+    """Rows of a (multi-row) INSERT, from its bound parameters."""
+    rows: dict[int, dict] = {}
+    for name, value in compiled_params(statement).items():
+        # A single row is not suffixed with its index
+        column, index = match.groups() if (match := re.fullmatch(r"(.+)_m(\d+)", name)) else (name, 0)
+        rows.setdefault(int(index), {})[column] = value
+    return [rows[index] for index in sorted(rows)]
+
+
+def test_review_and_its_categories_take_one_insert_each():
+    session = FakeSession(results=lambda statement, _params: [(REVIEW_ID,)] if statement.is_insert else [])
+    cat_data = [{"category": "Security", "message": "s"}, {"category": "Style", "message": "t"}]
+
+    review_id = services._save_review(
+        session, review_req=ReviewRequest(language="python", sourceCode="x = 1"), cat_data=cat_data, model_name="m"
+    )
+
+    assert review_id == REVIEW_ID
+    assert written(session) == ["Select source_blobs", "Insert source_blobs", "Insert reviews", "Insert review_categories"]
+    assert inserted_rows(session.statements[-1]) == [
+        {"review_id": REVIEW_ID, "category_name": "Security", "message": "s"},
+        {"review_id": REVIEW_ID, "category_name": "Style", "message": "t"},
+    ]
+    # Part of the caller's transaction
+    assert session.commits == 0
+
+
+def test_batch_jobs_are_written_in_one_commit(monkeypatch):
+    monkeypatch.setattr(services.job_executor, "notify", lambda: None)
+    parent_id, first_id, second_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    def results(statement, _params):
+        if not statement.is_insert or statement.table.name != "review_jobs":
+            return []
+        if "parent_job_id_m0" not in compiled_params(statement):
+            return [(parent_id,)]
+        # RETURNING rows come back in no particular order
+        return [(1, second_id), (0, first_id)]
+
+    session = FakeSession(results=results)
+    batch_req = BatchReviewRequest(
+        reviews=[ReviewRequest(language="python", sourceCode="x = 1"), ReviewRequest(language="go", sourceCode="x = 1")],
+        options={"priority": "batch"},
+    )
+    response = services.queue_batch_review_job(session, batch_req)
+
+    assert response == {"jobId": str(parent_id), "jobIds": [str(first_id), str(second_id)]}
+    assert written(session) == ["Insert review_jobs", "Select source_blobs", "Insert source_blobs", "Insert review_jobs"]
+    # Both files share one blob
+    assert len(inserted_rows(session.statements[2])) == 1
+    children = inserted_rows(session.statements[-1])
+    assert [(child["parent_job_id"], child["batch_index"]) for child in children] == [(parent_id, 0), (parent_id, 1)]
+    assert [child["payload"]["sourceBlob"] for child in children] == [content_hash("x = 1")] * 2
+    assert session.commits == 1
+
+
+def test_feedback_is_saved_with_one_insert():
+    session = FakeSession()
+    response = services.save_feedback(session, str(REVIEW_ID), [("Security", "Good"), ("Style", "Bad")])
+
+    assert response == {"reviewId": str(REVIEW_ID), "status": "success", "feedbackSaved": 2}
+    assert written(session) == ["Insert review_feedback", "Insert feedback_stats"]
+    assert [row["user_feedback"] for row in inserted_rows(session.statements[0])] == ["Good", "Bad"]
+    assert session.commits == 1
+
+
+def test_feedback_for_an_unknown_review_is_not_found():
+    violation = IntegrityError("INSERT", {}, type("ForeignKeyViolation", (Exception,), {"pgcode": "23503"})())
+
+    def results(_statement, _params):
+        raise violation
+
+    session = FakeSession(results=results)
+    with pytest.raises(HTTPException) as excinfo:
+        services.save_feedback(session, str(REVIEW_ID), [("Security", "Good")])
+
+    assert excinfo.value.status_code == 404
+    # No existence query ran before the insert
+    assert len(session.statements) == 1
+    assert session.rollbacks == 1
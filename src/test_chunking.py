@@ -0,0 +1,160 @@
+import itertools
+import re
+import threading
+
+import pytest
+
+from src import services
+from src.chunking import SourceChunk, estimate_tokens, merge_chunk_categories, split_source
+from src.llm_engines.base import CancellationToken, GenerationCanceledError
+
+
+def python_source(functions: int, body_lines: int = 6) -> str:
+    parts = ["import os\n\n"]
+    for n in range(functions):
+        body = "".join(f"    value_{i} = compute({n}, {i})\n" for i in range(body_lines))
+        parts.append(f"@decorator\ndef function_{n}(arg):\n{body}    return value_0\n\n")
+    parts.append("class Service:\n")
+    for n in range(functions):
+        body = "".join(f"        self.value_{i} = {i}\n" for i in range(body_lines))
+        parts.append(f"    def method_{n}(self):\n{body}\n")
+    return "".join(parts)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens(None) == 0
+    assert estimate_tokens("a = b + 1") == 5
+    # Long identifiers count as several tokens
+    assert estimate_tokens("x" * 13) == 3
+
+
+@pytest.mark.parametrize("max_tokens", [1, 20, 60, 150, 10_000])
+def test_split_loses_no_text(max_tokens):
+    source = python_source(8)
+    chunks = split_source(source, max_tokens)
+    assert "".join(chunk.text for chunk in chunks) == source
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    assert chunks[0].start_line == 1
+    assert chunks[-1].end_line == source.count("\n")
+    for previous, chunk in itertools.pairwise(chunks):
+        assert chunk.start_line == previous.end_line + 1
+
+
+def test_source_that_fits_stays_one_chunk():
+    source = python_source(2)
+    assert len(split_source(source, 10_000)) == 1
+    assert split_source("", 100) == []
+
+
+def test_chunks_respect_budget_and_definition_boundaries():
+    source = python_source(8)
+    chunks = split_source(source, 150)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert estimate_tokens(chunk.text) <= 150
+        # Decorators stay with their function, and no chunk starts inside a function body
+        assert not chunk.text.rstrip().endswith("@decorator")
+        assert not chunk.text.startswith("def function_")
+        assert not chunk.text.startswith(("    value_", "        self.value_"))
+
+
+def test_oversized_unit_is_split_on_lines():
+    long_call = "call(" + ", ".join(f"argument_{i}" for i in range(40)) + ")\n"
+    source = "def f():\n" + long_call + "x = 1\n"
+    chunks = split_source(source, 20)
+    assert "".join(chunk.text for chunk in chunks) == source
+    # A line larger than the budget is never cut
+    assert long_call in [chunk.text for chunk in chunks]
+
+
+def test_merge_chunk_categories():
+    first = SourceChunk(index=0, start_line=1, end_line=10, text="")
+    second = SourceChunk(index=1, start_line=11, end_line=20, text="")
+    merged = merge_chunk_categories(
+        [
+            (first, [{"category": "Security", "message": "a"}, {"category": "General Feedback", "message": "g1"}]),
+            (second, [{"category": "General Feedback", "message": "g2"}, {"category": "Security", "message": "a"}]),
+        ]
+    )
+    assert merged == [
+        {"category": "General Feedback", "message": "(lines 1-10) g1\n(lines 11-20) g2"},
+        {"category": "Security", "message": "(lines 1-10) a\n(lines 11-20) a"},
+    ]
+
+
+def test_merge_single_chunk_keeps_messages_unprefixed():
+    chunk = SourceChunk(index=0, start_line=1, end_line=5, text="")
+    items = [{"category": "Security", "message": " a "}, {"category": "Security", "message": "a"}]
+    assert merge_chunk_categories([(chunk, items)]) == [{"category": "Security", "message": "a"}]
+
+
+class ChunkEngine:
+    """Answers each chunk prompt with categories naming its part; `failing` parts raise."""
+
+    model_name = "m"
+    context_window = None
+
+    def __init__(self, failing: int | None = None):
+        self.failing = failing
+        self.tokens = []
+        self.lock = threading.Lock()
+
+    def stream_review(self, prompt_str, cancel_token=None):
+        part = int(re.search(r"part (\d+) of", prompt_str).group(1))
+        with self.lock:
+            self.tokens.append(cancel_token)
+        if part == self.failing:
+            raise RuntimeError
+        if self.failing is not None:
+            # Generates until the failing part aborts it
+            while not cancel_token.canceled:
+                threading.Event().wait(0.005)
+            cancel_token.raise_if_canceled()
+        yield f'{{"category": "Security", "message": "part {part}"}}'
+        yield ' {"category": "General Feedback", "message": "shared"}'
+
+
+def source_chunks(count: int) -> list[SourceChunk]:
+    return [
+        SourceChunk(index=n, start_line=10 * n + 1, end_line=10 * (n + 1), text=f"x_{n} = {n}\n") for n in range(count)
+    ]
+
+
+def test_map_reduce_merges_chunk_reviews_in_source_order():
+    partial = []
+    merged, parsed = services._map_reduce_review(
+        ChunkEngine(), "python", source_chunks(3), None, services.ReviewHooks(on_category=partial.append)
+    )
+
+    assert parsed is True
+    assert merged == [
+        {
+            "category": "General Feedback",
+            "message": "(lines 1-10) shared\n(lines 11-20) shared\n(lines 21-30) shared",
+        },
+        {"category": "Security", "message": "(lines 1-10) part 1\n(lines 11-20) part 2\n(lines 21-30) part 3"},
+    ]
+    # Every chunk reports its categories as they stream
+    assert len(partial) == 6
+
+
+def test_failing_chunk_cancels_the_other_generations():
+    engine = ChunkEngine(failing=2)
+    with pytest.raises(RuntimeError):
+        services._map_reduce_review(engine, "python", source_chunks(3), None, services.ReviewHooks())
+
+    [token] = set(engine.tokens)
+    assert token.reason == "chunk review failed"
+
+
+def test_canceled_review_cancels_its_chunks():
+    cancel_token = CancellationToken()
+    cancel_token.cancel("timed out")
+    engine = ChunkEngine(failing=0)
+
+    with pytest.raises(GenerationCanceledError, match="timed out"):
+        services._map_reduce_review(
+            engine, "python", source_chunks(2), None, services.ReviewHooks(cancel_token=cancel_token)
+        )
+    assert {token.reason for token in engine.tokens} == {"timed out"}
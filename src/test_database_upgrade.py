@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src import database
+from src.conftest import compiled_params
+
+
+class Migrations:
+    """Stands in for the database connection and Alembic; records what ran in order."""
+
+    def __init__(self, tables=(), fail: bool = False):
+        self.tables = list(tables)
+        self.fail = fail
+        self.calls = []
+        self.connection = None
+        self.disposed = False
+
+    # engine.connect()
+    def connect(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        return False
+
+    def execute(self, statement):
+        [function] = statement.selected_columns
+        assert list(compiled_params(statement).values()) == [database._MIGRATION_LOCK_ID]
+        self.calls.append(function.name)
+
+    def commit(self):
+        pass
+
+    def dispose(self):
+        self.disposed = True
+
+    # alembic.command
+    def stamp(self, config, revision):
+        self.connection = config.attributes["connection"]
+        self.calls.append(f"stamp {revision}")
+
+    def upgrade(self, config, revision):
+        self.connection = config.attributes["connection"]
+        if self.fail:
+            raise RuntimeError
+        self.calls.append(f"upgrade {revision}")
+
+
+@pytest.fixture
+def migrations(monkeypatch):
+    def use(tables=(), fail: bool = False) -> Migrations:
+        fake = Migrations(tables, fail)
+        monkeypatch.setattr(database, "engine", fake)
+        monkeypatch.setattr(database, "command", fake)
+        monkeypatch.setattr(
+            database, "inspect", lambda _connection: SimpleNamespace(get_table_names=lambda: fake.tables)
+        )
+        return fake
+
+    return use
+
+
+def test_schema_without_migration_history_is_stamped_at_the_baseline(migrations):
+    fake = migrations(tables=["reviews", "review_jobs"])
+    database.upgrade_database()
+
+    assert fake.calls == ["pg_advisory_lock", "stamp 0001", "upgrade head", "pg_advisory_unlock"]
+    # Alembic runs on the locked connection
+    assert fake.connection is fake
+
+
+@pytest.mark.parametrize("tables", [[], ["alembic_version", "reviews", "review_jobs"]])
+def test_empty_or_migrated_database_is_only_upgraded(migrations, tables):
+    fake = migrations(tables=tables)
+    database.upgrade_database(revision="0003")
+
+    assert fake.calls == ["pg_advisory_lock", "upgrade 0003", "pg_advisory_unlock"]
+
+
+def test_lock_is_released_when_a_migration_fails(migrations):
+    fake = migrations(fail=True)
+    with pytest.raises(RuntimeError):
+        database.upgrade_database()
+
+    assert fake.calls == ["pg_advisory_lock", "pg_advisory_unlock"]
+
+
+def test_other_database_is_migrated_with_an_engine_of_its_own(migrations, monkeypatch):
+    default = migrations()
+    other = Migrations()
+    monkeypatch.setattr(
+        database, "create_engine", lambda url, **_kwargs: other if url == "postgresql://other" else None
+    )
+    monkeypatch.setattr(database, "command", other)
+
+    database.upgrade_database("postgresql://other")
+
+    assert other.calls == ["pg_advisory_lock", "upgrade head", "pg_advisory_unlock"]
+    assert other.disposed
+    assert default.calls == []
+    assert not default.disposed
@@ -0,0 +1,91 @@
+from src.diff_utils import format_changed_regions, parse_unified_diff
+
+DIFF = """diff --git a/app.py b/app.py
+index 1111111..2222222 100644
+--- a/app.py
++++ b/app.py
+@@ -10,8 +10,8 @@ def load(path):
+ a
+ b
+ c
+-d
++D
+ e
+ f
+ g
+-h
++H
+\\ No newline at end of file
+"""
+
+
+def test_parse_tracks_line_numbers():
+    [hunk] = parse_unified_diff(DIFF)
+    assert hunk.file_name == "app.py"
+    assert (hunk.old_start, hunk.new_start, hunk.section) == (10, 10, "def load(path):")
+    removed = [(line.text, line.old_lineno, line.new_lineno) for line in hunk.lines if line.tag == "-"]
+    added = [(line.text, line.old_lineno, line.new_lineno) for line in hunk.lines if line.tag == "+"]
+    assert removed == [("d", 13, None), ("h", 17, None)]
+    assert added == [("D", None, 13), ("H", None, 17)]
+
+
+def test_not_a_diff():
+    assert parse_unified_diff(None) == []
+    assert parse_unified_diff("just some text\n+ not in a hunk") == []
+    assert format_changed_regions("no hunks here") is None
+
+
+def test_regions_are_trimmed_to_context_lines():
+    assert format_changed_regions(DIFF, context_lines=1) == (
+        "--- app.py\n"
+        "@@ line 12 (def load(path):) @@\n"
+        "12 12   c\n"
+        "13    - d\n"
+        "   13 + D\n"
+        "14 14   e\n"
+        "@@ line 16 (def load(path):) @@\n"
+        "16 16   g\n"
+        "17    - h\n"
+        "   17 + H"
+    )
+
+
+def test_close_changes_share_one_region():
+    rendered = format_changed_regions(DIFF, context_lines=2)
+    assert rendered.count("@@ line") == 1
+    assert "11 11   b" in rendered
+    assert "10 10   a" not in rendered
+
+
+def test_multiple_files_get_file_headers():
+    second = "--- a/lib.py\n+++ b/lib.py\n@@ -1 +1 @@\n-x = 1\n+x = 2\n"
+    rendered = format_changed_regions(DIFF + second, context_lines=0)
+    assert rendered.index("--- app.py") < rendered.index("--- lib.py")
+    assert rendered.endswith("@@ line 1 @@\n 1    - x = 1\n    1 + x = 2")
+
+
+def test_lines_that_look_like_file_headers_stay_in_the_hunk():
+    diff = (
+        "--- a/loop.c\n"
+        "+++ b/loop.c\n"
+        "@@ -1,3 +1,3 @@\n"
+        " for (;;) {\n"
+        "--- i;\n"
+        "+++ i;\n"
+        " }\n"
+        "--- a/next.c\n"
+        "+++ b/next.c\n"
+        "@@ -5 +5,2 @@\n"
+        " x;\n"
+        "+++ y;\n"
+    )
+    first, second = parse_unified_diff(diff)
+    assert first.file_name == "loop.c"
+    assert [(line.tag, line.text) for line in first.lines] == [
+        (" ", "for (;;) {"),
+        ("-", "-- i;"),
+        ("+", "++ i;"),
+        (" ", "}"),
+    ]
+    assert second.file_name == "next.c"
+    assert [(line.tag, line.text, line.new_lineno) for line in second.lines] == [(" ", "x;", 5), ("+", "++ y;", 6)]
@@ -0,0 +1,157 @@
+import importlib.util
+import json
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src import feedback_extractor
+from src.conftest import FakeResult, FakeSession
+from src.feedback_extractor import (
+    ColumnarWriter,
+    export_incremental,
+    export_to_columnar,
+    export_to_json,
+    export_to_ndjson,
+    get_feedback_data,
+)
+from src.source_blobs import compress, content_hash
+
+requires_pyarrow = pytest.mark.skipif(importlib.util.find_spec("pyarrow") is None, reason="pyarrow is not installed")
+
+
+def rows(count, fail_at=None):
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    for n in range(count):
+        if n == fail_at:
+            raise ConnectionResetError
+        yield {
+            "feedback_id": n + 1,
+            "feedback_created_at": start + timedelta(hours=n),
+            "category_name": "Security",
+            "user_feedback": "up",
+        }
+
+
+@requires_pyarrow
+def test_failed_columnar_export_leaves_no_file(tmp_path):
+    target = tmp_path / "feedback.parquet"
+    assert export_to_columnar(rows(50, fail_at=30), target, "parquet", batch_size=10) == 0
+    assert not target.exists()
+
+
+@requires_pyarrow
+def test_failed_incremental_export_leaves_no_files(tmp_path):
+    with pytest.raises(ConnectionResetError):
+        export_incremental(rows(50, fail_at=30), tmp_path, "parquet", batch_size=10)
+    assert list(tmp_path.rglob("*.*")) == []
+
+
+@requires_pyarrow
+def test_incremental_export_writes_partitions_and_watermark(tmp_path):
+    assert export_incremental(rows(30), tmp_path, "arrow", batch_size=10) == 30
+    assert sorted(path.name for path in tmp_path.rglob("*.arrow")) == ["part-1.arrow", "part-25.arrow"]
+    assert (tmp_path / "_watermark.json").exists()
+
+
+def test_incremental_query_ignores_days_window():
+    session = FakeSession()
+    after = (datetime(2020, 1, 1, tzinfo=UTC), 7)
+    until = datetime(2026, 1, 1, tzinfo=UTC)
+    list(get_feedback_data(session, 1, after=after, until=until))
+    assert "cutoff_date" not in str(session.statements[0])
+    assert session.params[0] == {"after_created_at": after[0], "after_feedback_id": 7, "until": until}
+
+
+class CursorSession(FakeSession):
+    """Serves `rows` through a lazy cursor, recording how many were fetched and the execution options."""
+
+    def __init__(self, columns, rows):
+        super().__init__()
+        self.columns = columns
+        self.source = rows
+        self.fetched = 0
+        self.execution_options = None
+
+    def execute(self, statement, params=None, execution_options=None):
+        self.statements.append(statement)
+        self.params.append(params)
+        self.execution_options = execution_options
+        session = self
+
+        class Cursor(FakeResult):
+            def __iter__(self):
+                for row in session.source:
+                    session.fetched += 1
+                    yield row
+
+        return Cursor(columns=self.columns)
+
+
+def test_rows_are_streamed_from_a_server_side_cursor():
+    session = CursorSession(["feedback_id", "user_feedback"], [(n, "up") for n in range(100)])
+    data = get_feedback_data(session, 7, batch_size=25)
+
+    assert next(data) == {"feedback_id": 0, "user_feedback": "up"}
+    assert session.execution_options == {"yield_per": 25}
+    # Nothing is read ahead of the consumer
+    assert session.fetched == 1
+    assert sum(1 for _ in data) == 99
+
+
+def test_shared_sources_are_decompressed_once(monkeypatch):
+    source = "x = 1\n" * 100
+    codec, data = compress(source.encode())
+    columns = ["feedback_id", "source_blob", "source_codec", "source_data", "diff_blob", "diff_codec", "diff_data"]
+    rows = [(n, content_hash(source), codec, data, None, None, None) for n in range(3)]
+    decompressed = []
+
+    def counting_decompress(codec, data, decompress=feedback_extractor.decompress):
+        decompressed.append(codec)
+        return decompress(codec, data)
+
+    monkeypatch.setattr(feedback_extractor, "decompress", counting_decompress)
+
+    records = list(get_feedback_data(CursorSession(columns, rows), 7, include_code=True))
+
+    assert records == [{"feedback_id": n, "source_code": source, "diff": None} for n in range(3)]
+    assert len(decompressed) == 1
+
+
+@requires_pyarrow
+def test_columnar_writer_writes_one_record_batch_per_batch_size(tmp_path):
+    import pyarrow as pa
+
+    target = tmp_path / "feedback.arrow"
+    assert export_to_columnar(rows(25), target, "arrow", batch_size=10) == 25
+
+    with pa.memory_map(str(target)) as source:
+        reader = pa.ipc.open_file(source)
+        assert [reader.get_batch(i).num_rows for i in range(reader.num_record_batches)] == [10, 10, 5]
+        table = reader.read_all()
+    assert table.column("feedback_id").to_pylist() == list(range(1, 26))
+    # Dictionary deltas: every batch decodes to the same values
+    assert set(table.column("category_name").to_pylist()) == {"Security"}
+
+
+@requires_pyarrow
+def test_columnar_writer_buffers_no_more_than_a_batch(tmp_path):
+    writer = ColumnarWriter(tmp_path / "feedback.parquet", "parquet", ["feedback_id"], batch_size=4)
+    for n in range(9):
+        writer.write({"feedback_id": n})
+        assert len(writer._rows) == (n + 1) % 4
+    writer.close()
+    assert writer.count == 9
+
+
+def test_json_export_matches_json_dump_layout(tmp_path):
+    target = tmp_path / "feedback.json"
+    assert export_to_json(rows(3), target) == 3
+    assert target.read_text() == json.dumps(list(rows(3)), default=str, indent=2)
+
+
+def test_ndjson_export_writes_one_object_per_line(tmp_path):
+    target = tmp_path / "feedback.ndjson"
+    assert export_to_ndjson(rows(3), target) == 3
+    assert [json.loads(line)["feedback_id"] for line in target.read_text().splitlines()] == [1, 2, 3]
+    assert export_to_ndjson(iter(()), tmp_path / "empty.ndjson") == 0
+    assert not (tmp_path / "empty.ndjson").exists()
@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src import services
+from src.conftest import FakeResult, FakeSession, compiled_params
+
+REVIEW_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def test_count_feedback_upserts_normalized_counts_per_category():
+    session = FakeSession()
+    feedback = [("Security", " Good "), ("Security", "BAD\n"), ("Style", "meh"), ("Security", "good")]
+    services._count_feedback(session, REVIEW_ID, feedback)
+
+    [statement] = session.statements
+    params = compiled_params(statement)
+    # One VALUES row per category: (name, good, bad, total)
+    rows = [tuple(params[f"param_{n}"] for n in range(start, start + 4)) for start in (1, 5)]
+    assert rows == [("Security", 2, 1, 3), ("Style", 0, 0, 1)]
+    assert params["review_id_1"] == REVIEW_ID
+
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (category_name, language, model_name) DO UPDATE" in sql
+    assert "good_count = (feedback_stats.good_count + excluded.good_count)" in sql
+    assert "total_count = (feedback_stats.total_count + excluded.total_count)" in sql
+    assert session.commits == 0
+
+
+def stats_session(columns, rows) -> FakeSession:
+    return FakeSession(results=lambda _statement, _params: FakeResult(rows, columns))
+
+
+def test_stats_are_rolled_up_to_the_requested_groups():
+    session = stats_session(["category", "good", "bad", "total"], [("Security", 3, 1, 4), ("Style", 0, 2, 2)])
+    response = services.get_feedback_stats(session, language="python", group_by=["category", "category"])
+
+    assert response["groupBy"] == ["category"]
+    assert response["stats"] == [
+        {"category": "Security", "good": 3, "bad": 1, "total": 4, "badRatio": 0.25},
+        {"category": "Style", "good": 0, "bad": 2, "total": 2, "badRatio": 1.0},
+    ]
+    assert response["totals"] == {"good": 3, "bad": 3, "total": 6, "badRatio": 0.5}
+
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "GROUP BY feedback_stats.category_name" in sql
+    assert "feedback_stats.language = %(language_1)s" in sql
+    assert "model_name" not in sql
+
+
+def test_stats_without_groups_or_counters():
+    session = stats_session(["good", "bad", "total"], [(None, None, None)])
+    response = services.get_feedback_stats(session, group_by=[])
+    assert response["stats"] == [{"good": 0, "bad": 0, "total": 0, "badRatio": None}]
+    assert response["totals"] == {"good": 0, "bad": 0, "total": 0, "badRatio": None}
+
+
+def test_unknown_group_key_is_rejected():
+    session = FakeSession()
+    with pytest.raises(ValueError, match="Unknown groupBy key"):
+        services.get_feedback_stats(session, group_by=["category", "file"])
+    assert session.statements == []
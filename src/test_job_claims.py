@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src import database, services
+from src.conftest import FakeQuery, FakeSession, compiled_params
+
+WORKER = "host:1"
+STARTED = datetime(2026, 10, 17, 12, 0)
+
+
+def make_job(job_id: str, status: str = "queued", attempts: int = 0, lease_owner: str | None = None):
+    return SimpleNamespace(
+        job_id=job_id,
+        status=status,
+        attempts=attempts,
+        lease_owner=lease_owner,
+        priority=1,
+        client_id="ci",
+        created_at=STARTED,
+        payload={"language": "python"},
+        parent_job_id=None,
+        completed_at=None,
+    )
+
+
+class LockingQuery(FakeQuery):
+    """Answers the row-locking SELECT with the job it names; locked jobs are missing."""
+
+    def filter(self, *criteria):
+        self.criteria = criteria
+        return self
+
+    def with_for_update(self, **kwargs):
+        self.session.locks.append(kwargs)
+        return self
+
+    def first(self):
+        job_id = compiled_params(self.criteria[0])["job_id_1"]
+        self.session.filters.append(self.criteria[1])
+        return self.session.unlocked.get(job_id)
+
+
+class ClaimSession(FakeSession):
+    def __init__(self, candidates, unlocked):
+        super().__init__(results=self.answer)
+        self.candidates = candidates
+        self.unlocked = {job.job_id: job for job in unlocked}
+        self.locks = []
+        self.filters = []
+
+    def answer(self, statement, _params):
+        if "client_rank" in str(statement):
+            return [SimpleNamespace(**vars(job), client_rank=rank + 1) for rank, job in enumerate(self.candidates)]
+        return []
+
+    def query(self, *_args):
+        return LockingQuery(self)
+
+
+@pytest.fixture
+def claim_session(monkeypatch):
+    def use(candidates, unlocked) -> ClaimSession:
+        session = ClaimSession(candidates, unlocked)
+        monkeypatch.setattr(database, "SessionLocal", lambda: session)
+        return session
+
+    return use
+
+
+def test_job_locked_by_another_worker_is_skipped(claim_session):
+    first, second = make_job("job-1"), make_job("job-2")
+    session = claim_session([first, second], unlocked=[second])
+
+    assert services.claim_next_job(WORKER) == ("job-2", second.payload)
+    assert session.locks == [{"skip_locked": True}] * 2
+    assert (second.status, second.lease_owner, second.attempts) == ("in_progress", WORKER, 1)
+    assert first.status == "queued"
+    assert session.commits == 1
+
+
+def test_job_with_an_expired_lease_is_reclaimed(claim_session):
+    abandoned = make_job("job-1", status="in_progress", attempts=1, lease_owner="crashed:7")
+    session = claim_session([abandoned], unlocked=[abandoned])
+
+    assert services.claim_next_job(WORKER) == ("job-1", abandoned.payload)
+    assert (abandoned.lease_owner, abandoned.attempts) == (WORKER, 2)
+    # Only in_progress jobs whose lease has run out are runnable
+    runnable = str(session.filters[0].compile(dialect=postgresql.dialect()))
+    assert "review_jobs.status = %(status_2)s AND review_jobs.lease_expires_at < now()" in runnable
+
+
+def test_job_out_of_attempts_fails_instead_of_running(claim_session):
+    exhausted = make_job("job-1", status="in_progress", attempts=services.JOB_MAX_ATTEMPTS, lease_owner="crashed:7")
+    claim_session([exhausted], unlocked=[exhausted])
+
+    assert services.claim_next_job(WORKER) is None
+    assert exhausted.status == "error"
+    assert exhausted.attempts == services.JOB_MAX_ATTEMPTS
+
+
+def test_nothing_runnable(claim_session):
+    session = claim_session([], unlocked=[])
+    assert services.claim_next_job(WORKER) is None
+    assert session.locks == []
+
+
+def test_renewal_reports_jobs_no_longer_owned(monkeypatch):
+    session = FakeSession(results=lambda _statement, _params: [("job-1",)])
+    monkeypatch.setattr(database, "SessionLocal", lambda: session)
+
+    assert services.renew_job_leases(WORKER, ["job-1", "job-2"]) == {"job-2"}
+    params = compiled_params(session.statements[0])
+    assert params["lease_owner_1"] == WORKER
+    assert params["status_1"] == "in_progress"
+    # Renewed for another full lease
+    assert params["now_1"] == timedelta(seconds=services.JOB_LEASE_SECONDS)
+    assert session.commits == 1
@@ -0,0 +1,103 @@
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from src import services
+from src.conftest import FakeSession
+from src.llm_engines import ollama_engine
+from src.scheduler import PRIORITY_CLASSES
+from src.schemas import ReviewRequest
+
+
+def make_job(status: str = "queued", submitters: int = 1) -> SimpleNamespace:
+    return SimpleNamespace(
+        job_id=uuid.uuid4(),
+        status=status,
+        priority=1,
+        submitters=submitters,
+        is_batch=False,
+        parent_job_id=None,
+        completed_at=None,
+        lease_expires_at=None,
+    )
+
+
+@pytest.fixture(autouse=True)
+def fixed_request_key(monkeypatch):
+    monkeypatch.setattr(ollama_engine, "get_ollama_engine", lambda: None)
+    monkeypatch.setattr(services, "_review_cache_key", lambda _engine, _review_req: "request-key")
+    monkeypatch.setattr(services.job_executor, "notify", lambda: None)
+
+
+def test_duplicate_submission_joins_the_pending_job():
+    job = make_job()
+    session = FakeSession(rows=[job])
+    response = services.queue_review_job(session, ReviewRequest(language="python", sourceCode="x = 1"), "interactive")
+
+    assert response == {"jobId": str(job.job_id), "status": "queued", "deduplicated": True}
+    assert job.submitters == 2
+    assert job.priority == PRIORITY_CLASSES["interactive"]
+    assert session.added == []
+
+
+def test_shared_job_is_canceled_by_its_last_submitter_only():
+    job = make_job("in_progress", submitters=2)
+    session = FakeSession(rows=[job])
+
+    first = services.cancel_job(session, str(job.job_id))
+    assert first["status"] == "in_progress"
+    assert job.status == "in_progress"
+    assert job.submitters == 1
+    # Nothing to tell the job's watchers yet
+    assert session.statements == []
+
+    second = services.cancel_job(session, str(job.job_id))
+    assert second["status"] == "canceled"
+    assert job.status == "canceled"
+    assert session.commits == 2
+
+
+class BlockingEngine:
+    """Streams one category, then waits for `release` before finishing."""
+
+    model_name = "m"
+    context_window = None
+
+    def __init__(self):
+        self.started, self.release = threading.Event(), threading.Event()
+        self.calls = 0
+
+    def stream_review(self, _prompt_str, **_kwargs):
+        self.calls += 1
+        yield '{"category": "Security", "message": "s"}'
+        self.started.set()
+        self.release.wait(5)
+        yield '{"category": "Style", "message": "t"}'
+
+
+def test_review_sharing_a_generation_gets_its_partial_results(monkeypatch):
+    monkeypatch.setattr(services, "review_cache", SimpleNamespace(get=lambda _key: None, put=lambda *_a, **_kw: None))
+    engine = BlockingEngine()
+    review_req = ReviewRequest(language="python", sourceCode="x = 1")
+    leader_partial, follower_partial = [], []
+
+    def review(partial):
+        services._review_categories(engine, review_req, services.ReviewHooks(on_category=partial.append))
+
+    leader = threading.Thread(target=review, args=(leader_partial,))
+    leader.start()
+    engine.started.wait(5)
+    follower = threading.Thread(target=review, args=(follower_partial,))
+    follower.start()
+    time.sleep(0.2)
+    assert follower_partial == leader_partial == [{"category": "Security", "message": "s"}]
+
+    engine.release.set()
+    leader.join(5)
+    follower.join(5)
+    assert engine.calls == 1
+    assert follower_partial == leader_partial
+    assert len(follower_partial) == 2
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src import api, services
+from src.conftest import FakeSession, compiled_params
+from src.job_events import JOB_EVENTS_CHANNEL, JobEventBus, notify_job_changed
+from src.lru_cache import LRUCache
+
+JOB_ID = "job-1"
+
+
+class JobStatuses(dict):
+    """Job statuses served by load_job_status; `loads` counts the reads."""
+
+    loads = 0
+
+    def load(self, job_id: str) -> dict | None:
+        self.loads += 1
+        status = self.get(job_id)
+        return None if status is None else {"jobId": job_id, "status": status}
+
+
+@pytest.fixture
+def bus(monkeypatch) -> JobEventBus:
+    """Event bus without the LISTEN connection; tests dispatch notifications themselves."""
+    events = JobEventBus()
+    monkeypatch.setattr(events, "_ensure_listener", lambda: None)
+    monkeypatch.setattr(services, "job_events", events)
+    return events
+
+
+@pytest.fixture
+def jobs(monkeypatch) -> JobStatuses:
+    statuses = JobStatuses({JOB_ID: "queued"})
+    monkeypatch.setattr(services, "load_job_status", statuses.load)
+    monkeypatch.setattr(services, "job_response_cache", LRUCache(8))
+    return statuses
+
+
+def test_long_poll_returns_when_the_job_changes(bus, jobs):
+    async def scenario():
+        poll = asyncio.ensure_future(services.wait_for_job_status(JOB_ID, 30))
+        await asyncio.sleep(0.05)
+        jobs[JOB_ID] = "completed"
+        bus.dispatch(JOB_ID)
+        return await asyncio.wait_for(poll, 5)
+
+    started = time.monotonic()
+    assert asyncio.run(scenario()) == {"jobId": JOB_ID, "status": "completed"}
+    assert time.monotonic() - started < 5
+    assert jobs.loads == 2
+
+
+def test_long_poll_ignores_other_jobs_and_times_out(bus, jobs):
+    async def scenario():
+        poll = asyncio.ensure_future(services.wait_for_job_status(JOB_ID, 0.1))
+        await asyncio.sleep(0.02)
+        bus.dispatch("job-2")
+        return await poll
+
+    assert asyncio.run(scenario()) == {"jobId": JOB_ID, "status": "queued"}
+    # No database query while waiting
+    assert jobs.loads == 1
+
+
+@pytest.mark.usefixtures("bus")
+@pytest.mark.parametrize("status", ["completed", None])
+def test_long_poll_does_not_wait_for_finished_or_unknown_jobs(jobs, status):
+    jobs[JOB_ID] = status
+    started = time.monotonic()
+    result = asyncio.run(services.wait_for_job_status(JOB_ID, 30))
+    assert result == (None if status is None else {"jobId": JOB_ID, "status": status})
+    assert time.monotonic() - started < 1
+
+
+def test_websocket_pushes_every_change_until_the_job_finishes(bus, jobs):
+    app = FastAPI()
+    app.include_router(api.router)
+
+    with TestClient(app).websocket_connect(f"/v2/jobs/{JOB_ID}/ws") as websocket:
+        assert websocket.receive_json() == {"jobId": JOB_ID, "status": "queued"}
+        for status in ("in_progress", "completed"):
+            jobs[JOB_ID] = status
+            bus.dispatch(JOB_ID)
+            assert websocket.receive_json() == {"jobId": JOB_ID, "status": status}
+    # Unsubscribed once the job finished
+    assert bus._subscriptions == {}
+
+
+def test_lost_listen_connection_wakes_every_subscriber(bus, jobs):
+    jobs["job-2"] = "queued"
+
+    async def scenario():
+        polls = [asyncio.ensure_future(services.wait_for_job_status(job_id, 30)) for job_id in (JOB_ID, "job-2")]
+        await asyncio.sleep(0.05)
+        bus.dispatch()
+        return await asyncio.wait_for(asyncio.gather(*polls), 5)
+
+    assert [job["status"] for job in asyncio.run(scenario())] == ["queued", "queued"]
+    assert jobs.loads == 4
+
+
+def test_notify_job_changed_sends_one_notification_per_job():
+    session = FakeSession()
+    notify_job_changed(session, "job-1", None, "job-1", "job-2")
+
+    assert [list(compiled_params(statement).values()) for statement in session.statements] == [
+        [JOB_EVENTS_CHANNEL, "job-1"],
+        [JOB_EVENTS_CHANNEL, "job-2"],
+    ]
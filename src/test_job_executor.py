@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from src.job_executor import JobContext, JobExecutor, JobTimeoutError
+from src.llm_engines.base import GenerationCanceledError
+
+
+class Jobs:
+    """Claimable jobs and what the handler saw for each of them."""
+
+    def __init__(self, *job_ids: str):
+        self.pending = list(job_ids)
+        self.outcomes: dict[str, str] = {}
+        self.started = threading.Event()
+        self.finished = threading.Event()
+        self.lock = threading.Lock()
+
+    def claim(self, _worker_id: str) -> tuple[str, dict] | None:
+        with self.lock:
+            return (self.pending.pop(0), {}) if self.pending else None
+
+    def run_until_stopped(self, job_id: str, _payload: dict, context: JobContext) -> None:
+        """Generates until the job is aborted, checking it like a streaming review does."""
+        self.started.set()
+        try:
+            while True:
+                context.check()
+                time.sleep(0.005)
+        except (GenerationCanceledError, JobTimeoutError) as e:
+            self.outcomes[job_id] = f"{type(e).__name__}: {context.token.reason}"
+        finally:
+            self.finished.set()
+
+
+@pytest.fixture
+def start_executor():
+    executors = []
+
+    def start(jobs: Jobs, handler=None, **kwargs) -> JobExecutor:
+        kwargs.setdefault("job_timeout", None)
+        executor = JobExecutor(handler or jobs.run_until_stopped, jobs.claim, poll_interval=0.01, **kwargs)
+        executor.start()
+        executors.append(executor)
+        return executor
+
+    yield start
+    for executor in executors:
+        executor.shutdown(timeout=5)
+
+
+def test_expired_job_is_aborted(start_executor):
+    jobs = Jobs("job-1")
+    start_executor(jobs, job_timeout=0.05)
+
+    assert jobs.finished.wait(5)
+    assert jobs.outcomes["job-1"] == "JobTimeoutError: None"
+
+
+def test_job_blocked_past_its_deadline_is_canceled_by_the_supervisor(start_executor):
+    jobs = Jobs("job-1")
+    blocked = threading.Event()
+
+    def blocked_in_generation(job_id, _payload, context):
+        # Stuck before the first token: only the token can end the wait
+        context.token.add_callback(blocked.set)
+        blocked.wait(5)
+        jobs.outcomes[job_id] = context.token.reason
+        jobs.finished.set()
+
+    start_executor(jobs, blocked_in_generation, job_timeout=0.05, heartbeat_interval=0.01)
+
+    assert jobs.finished.wait(5)
+    assert jobs.outcomes["job-1"] == "timed out"
+
+
+def test_cancel_aborts_only_the_running_job(start_executor):
+    jobs = Jobs("job-1")
+    executor = start_executor(jobs)
+    assert jobs.started.wait(5)
+
+    assert executor.cancel("unknown") is False
+    assert executor.cancel("job-1") is True
+    assert jobs.finished.wait(5)
+    assert jobs.outcomes["job-1"] == "GenerationCanceledError: canceled"
+
+
+def test_heartbeat_renews_running_jobs_and_aborts_lost_ones(start_executor):
+    jobs = Jobs("job-1")
+    beats = []
+
+    def heartbeat(worker_id, job_ids):
+        beats.append((worker_id, job_ids))
+        # The second renewal fails: the job was canceled or re-leased elsewhere
+        return set(job_ids) if len(beats) > 1 else set()
+
+    executor = start_executor(jobs, heartbeat=heartbeat, heartbeat_interval=0.01)
+
+    assert jobs.finished.wait(5)
+    assert beats[:2] == [(executor.worker_id, ["job-1"])] * 2
+    assert jobs.outcomes["job-1"] == "GenerationCanceledError: canceled or re-leased"
+
+
+def test_idle_workers_do_not_heartbeat(start_executor):
+    beats = []
+    start_executor(Jobs(), heartbeat=lambda *args: beats.append(args) or set(), heartbeat_interval=0.01)
+    time.sleep(0.1)
+    assert beats == []
@@ -0,0 +1,55 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from src import services
+from src.conftest import FakeSession
+
+
+def make_job(status: str) -> SimpleNamespace:
+    review = SimpleNamespace(
+        review_id=uuid.uuid4(),
+        categories=[
+            SimpleNamespace(category_name="Security", message="s"),
+            SimpleNamespace(category_name="General Feedback", message="g"),
+        ],
+    )
+    return SimpleNamespace(
+        job_id=uuid.uuid4(), status=status, review_id=review.review_id, review=review, is_batch=False
+    )
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    services.job_response_cache.clear()
+    yield
+    services.job_response_cache.clear()
+
+
+def test_format_review_response_puts_general_feedback_first():
+    review = make_job("completed").review
+    assert services.format_review_response(review) == {
+        "reviewId": str(review.review_id),
+        "reviews": [{"category": "General Feedback", "message": "g"}, {"category": "Security", "message": "s"}],
+    }
+
+
+def test_finished_job_is_served_from_cache():
+    job = make_job("completed")
+    session = FakeSession(rows=[job])
+    first = services.get_job_status(session, str(job.job_id))
+    second = services.get_job_status(session, str(job.job_id))
+    assert first == second
+    assert first["reviews"][0]["category"] == "General Feedback"
+    assert session.queries == 1
+
+
+def test_pending_job_is_not_cached():
+    job = make_job("pending")
+    session = FakeSession(rows=[job])
+    assert services.get_job_status(session, str(job.job_id))["status"] == "pending"
+    job.status = "error"
+    assert services.get_job_status(session, str(job.job_id))["status"] == "error"
+    services.get_job_status(session, str(job.job_id))
+    assert session.queries == 2
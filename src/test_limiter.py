@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from src.llm_engines.limiter import AdaptiveLimiter, CircuitBreaker
+
+
+def limiter(**kwargs) -> AdaptiveLimiter:
+    settings = {"initial": 4, "min_limit": 1, "max_limit": 8, "tolerance": 2.0, "slack": 0.0, "backoff": 0.5}
+    return AdaptiveLimiter(**{**settings, **kwargs})
+
+
+def test_additive_increase_while_limit_is_used():
+    lim = limiter()
+    lim.on_latency(time.monotonic(), 1.0, inflight=2)
+    assert lim.limit == pytest.approx(4.25)
+    assert lim.has_capacity(3)
+    assert not lim.has_capacity(4)
+
+
+def test_no_increase_while_limit_is_underused():
+    lim = limiter()
+    lim.on_latency(time.monotonic(), 1.0, inflight=1)
+    assert lim.limit == 4
+
+
+def test_increase_is_capped_at_max():
+    lim = limiter(initial=8)
+    lim.on_latency(time.monotonic(), 1.0, inflight=8)
+    assert lim.limit == 8
+
+
+def test_multiplicative_decrease_on_slow_response():
+    lim = limiter()
+    lim.on_latency(time.monotonic(), 1.0, inflight=1)  # Baseline 1s
+    lim.on_latency(time.monotonic(), 2.5, inflight=4)  # Above 2 x baseline
+    assert lim.limit == 2
+
+
+def test_decrease_once_per_round_trip():
+    lim = limiter()
+    sent_before = time.monotonic()
+    lim.on_drop(time.monotonic())
+    assert lim.limit == 2
+    # A request sent before the decrease reports congestion the limit already reacted to
+    lim.on_drop(sent_before)
+    assert lim.limit == 2
+    lim.on_drop(time.monotonic())
+    assert lim.limit == 1
+    lim.on_drop(time.monotonic())
+    assert lim.limit == 1  # Never below min_limit
+
+
+def test_retry_after_uses_average_duration():
+    lim = limiter()
+    assert lim.retry_after() == 1.0
+    lim.on_complete(20.0)
+    lim.on_complete(10.0)
+    assert lim.avg_duration == pytest.approx(18.0)
+    assert lim.retry_after() == pytest.approx(4.5)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    breaker.on_failure(0)
+    breaker.on_failure(1)
+    breaker.on_success()
+    breaker.on_failure(2)
+    breaker.on_failure(3)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.on_failure(4)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.can_attempt(13)
+    assert breaker.retry_after(13) == 1
+
+
+def test_breaker_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.on_failure(0)
+    assert breaker.can_attempt(10)
+    breaker.on_attempt(10)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.can_attempt(10)
+
+    # A canceled probe lets the next request probe
+    breaker.on_cancel()
+    assert breaker.can_attempt(10)
+    breaker.on_attempt(10)
+    breaker.on_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10)
+    for now in range(5):
+        breaker.on_failure(now)
+    breaker.on_attempt(20)
+    breaker.on_failure(20)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.can_attempt(29)
+    assert breaker.can_attempt(30)
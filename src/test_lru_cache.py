@@ -0,0 +1,57 @@
+from src import lru_cache
+from src.lru_cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_put_replaces_value():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("a", 2)
+    assert cache.get("a") == 2
+    assert len(cache) == 1
+
+
+def test_zero_size_disables_cache():
+    cache = LRUCache(0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lru_cache.time, "time", lambda: now[0])
+    cache = LRUCache(4, ttl=10)
+    cache.put("a", 1)
+    now[0] += 10
+    assert cache.get("a") == 1
+    now[0] += 1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_stored_at_backdates_entry(monkeypatch):
+    monkeypatch.setattr(lru_cache.time, "time", lambda: 1000.0)
+    cache = LRUCache(4, ttl=10)
+    cache.put("old", 1, stored_at=985.0)
+    cache.put("recent", 2, stored_at=995.0)
+    assert cache.get("old") is None
+    assert cache.get("recent") == 2
+
+
+def test_clear():
+    cache = LRUCache(4)
+    cache.put("a", 1)
+    cache.clear()
+    assert cache.get("a") is None
@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from src import services
+from src.chunking import REVIEW_OUTPUT_TOKENS, estimate_tokens
+from src.conftest import FakeOllamaSession, FakeResponse
+from src.llm_engines import ollama_engine
+from src.llm_engines.base import CancellationToken, GenerationCanceledError
+from src.llm_engines.ollama_engine import OllamaEngine
+
+GPU1 = "http://gpu1:11434"
+
+
+@pytest.fixture
+def engine(monkeypatch) -> OllamaEngine:
+    """Engine talking to one fake backend; its requests are recorded in engine.session.generated"""
+    session = FakeOllamaSession({GPU1: (["m"], [])})
+    monkeypatch.setenv("OLLAMA_HOSTS", GPU1)
+    monkeypatch.setenv("OLLAMA_MODEL", "m")
+    monkeypatch.setattr(ollama_engine.requests, "Session", lambda: session)
+    monkeypatch.setattr(ollama_engine, "OLLAMA_NUM_CTX", 0)
+    engine = OllamaEngine(health_interval=0)
+    yield engine
+    engine.close()
+
+
+def python_source(functions: int) -> str:
+    body = "".join(f"    value_{i} = compute(arg, {i})\n" for i in range(20))
+    return "".join(f"def function_{n}(arg):\n{body}    return value_0\n\n" for n in range(functions))
+
+
+def test_every_request_asks_for_the_window_chunks_are_planned_for(engine):
+    source = python_source(60)
+    prompt = services._format_prompt("python", source, None)
+    chunks = services._plan_chunks(engine, "python", source, prompt)
+    assert chunks is not None
+
+    for chunk in chunks:
+        chunk_prompt = services._chunk_prompt("python", chunk, chunks, None)
+        assert engine.generate_review(chunk_prompt) is not None
+        # The chunk prompt plus the reserved answer fit the window Ollama is asked for
+        assert (
+            estimate_tokens(chunk_prompt) + REVIEW_OUTPUT_TOKENS <= engine.session.generated[-1]["options"]["num_ctx"]
+        )
+    assert {payload["options"]["num_ctx"] for payload in engine.session.generated} == {
+        services._context_budget(engine) + REVIEW_OUTPUT_TOKENS
+    }
+
+
+def test_num_ctx_is_sent_without_explicit_setting(engine):
+    list(engine.stream_review("prompt"))
+    assert engine.session.generated[0]["options"] == {"num_ctx": ollama_engine.REVIEW_CONTEXT_TOKENS}
+
+
+def test_refresh_health_tracks_backends_and_model(engine):
+    assert (engine.ollama_available, engine.model_available) == (True, True)
+
+    engine.session.servers[GPU1] = (["other"], [])
+    engine.refresh_health()
+    assert (engine.ollama_available, engine.model_available) == (True, False)
+
+    del engine.session.servers[GPU1]
+    engine.refresh_health()
+    assert (engine.ollama_available, engine.model_available) == (False, False)
+
+    engine.session.servers[GPU1] = (["m"], ["m"])
+    engine.refresh_health()
+    assert (engine.ollama_available, engine.model_available) == (True, True)
+
+
+def test_background_refresh_runs_until_closed(monkeypatch):
+    session = FakeOllamaSession({})
+    monkeypatch.setenv("OLLAMA_HOSTS", GPU1)
+    monkeypatch.setenv("OLLAMA_MODEL", "m")
+    monkeypatch.setattr(ollama_engine.requests, "Session", lambda: session)
+    engine = OllamaEngine(health_interval=0.01)
+    assert not engine.ollama_available
+
+    session.servers[GPU1] = (["m"], [])
+    deadline = time.monotonic() + 5
+    while not engine.model_available and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert engine.model_available
+
+    engine.close()
+    engine._health_thread.join(5)
+    assert not engine._health_thread.is_alive()
+
+
+def test_engine_is_shared_per_process(monkeypatch, engine):
+    monkeypatch.setattr(ollama_engine, "_shared", ollama_engine._SharedEngines())
+    created = []
+    monkeypatch.setattr(ollama_engine, "OllamaEngine", lambda: created.append(engine) or engine)
+    assert ollama_engine.get_ollama_engine() is engine
+    assert ollama_engine.get_ollama_engine() is engine
+    assert len(created) == 1
+
+
+class HangingResponse(FakeResponse):
+    """Streams one fragment, then blocks like a slow generation until the connection is closed."""
+
+    def __init__(self):
+        super().__init__(lines=[json.dumps({"response": "partial", "done": False}).encode()])
+        self.closed_event = threading.Event()
+
+    def iter_lines(self):
+        yield from self.lines
+        self.closed_event.wait(5)
+        raise requests.ConnectionError
+
+    def close(self):
+        super().close()
+        self.closed_event.set()
+
+
+def test_cancel_aborts_an_in_flight_generation(engine, monkeypatch):
+    response = HangingResponse()
+    monkeypatch.setattr(engine.session, "post", lambda *_args, **_kwargs: response)
+    token = CancellationToken()
+
+    stream = engine.stream_review("prompt", cancel_token=token)
+    assert next(stream) == "partial"
+    threading.Timer(0.05, token.cancel).start()
+    with pytest.raises(GenerationCanceledError):
+        next(stream)
+
+    assert response.closed
+    [backend] = engine.pool.backends
+    # The slot is free again and a cancellation is not a backend failure
+    assert backend.outstanding == 0
+    assert backend.breaker.failures == 0
+
+
+def test_token_canceled_before_the_request_never_streams(engine):
+    token = CancellationToken()
+    token.cancel()
+    with pytest.raises(GenerationCanceledError):
+        list(engine.stream_review("prompt", cancel_token=token))
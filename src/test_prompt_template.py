@@ -0,0 +1,106 @@
+import json
+import os
+
+import pytest
+
+from src.prompt_template import ConfigWatcher, PromptTemplate, UnknownCategoriesError, UnknownCategoryProfileError
+
+CONFIG = {
+    "categories": ["General Feedback", "Security", "Performance"],
+    "instructions": "Review for: {categories}.",
+    "review_depth": "Deep",
+    "format_guidelines": {"use_markdown": True, "max_response_length": 500},
+    "preferred_language": "English",
+}
+
+
+def test_render_interpolates_language_and_code():
+    template = PromptTemplate(CONFIG)
+    prompt = template.render("python", "```python\nx = 1\n```\n\n")
+    assert prompt.startswith("### Code Review Request (Deep Analysis)\n#### Language: python\n\n```python\nx = 1\n```")
+    assert "### Categories of Interest:\nGeneral Feedback, Security, Performance" in prompt
+    assert "Review for: General Feedback, Security, Performance." in prompt
+    assert "- Use markdown for inline code" in prompt
+    assert "exceed 500 characters" in prompt
+    assert "Please respond in" not in prompt
+
+
+def test_preferred_language_is_requested():
+    template = PromptTemplate({**CONFIG, "preferred_language": "German"})
+    assert template.render("go", "").endswith("Please respond in German.")
+
+
+def test_fingerprint_tracks_prompt_settings_only():
+    base = PromptTemplate(CONFIG).fingerprint
+    assert PromptTemplate(dict(CONFIG)).fingerprint == base
+    assert PromptTemplate({**CONFIG, "instructions": "Other"}).fingerprint != base
+    assert PromptTemplate({**CONFIG, "categories": ["Security"]}).fingerprint != base
+    # Settings that do not shape the prompt leave cached reviews valid
+    assert PromptTemplate({**CONFIG, "diff_context_lines": 10}).fingerprint == base
+
+
+def write_config(path, config):
+    path.write_text(json.dumps(config), encoding="utf-8")
+    # Make the change visible even within the file system's timestamp resolution
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_watcher_reloads_changed_config(tmp_path):
+    path = tmp_path / "config.json"
+    write_config(path, CONFIG)
+    watcher = ConfigWatcher(str(path), check_interval=0)
+    first = watcher.get()
+    assert watcher.get() is first
+
+    write_config(path, {**CONFIG, "categories": ["Security"]})
+    assert watcher.get().categories == ["Security"]
+
+
+def test_watcher_keeps_template_when_config_breaks(tmp_path):
+    path = tmp_path / "config.json"
+    write_config(path, CONFIG)
+    watcher = ConfigWatcher(str(path), check_interval=0)
+    first = watcher.get()
+
+    path.write_text("{not json", encoding="utf-8")
+    assert watcher.get() is first
+    path.unlink()
+    assert watcher.get() is first
+
+
+def test_watcher_requires_a_valid_initial_config(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("{not json", encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError):
+        ConfigWatcher(str(path))
+
+
+PROFILES = {**CONFIG, "category_profiles": {"quick": ["security"]}}
+
+
+def test_select_categories_matches_names_in_config_order():
+    template = PromptTemplate(PROFILES)
+    assert template.select_categories() == CONFIG["categories"]
+    # General Feedback is always part of a subset
+    assert template.select_categories("performance, SECURITY") == ["General Feedback", "Security", "Performance"]
+    assert template.select_categories(profile="quick") == ["General Feedback", "Security"]
+    assert template.select_categories(["Performance"], profile="quick") == CONFIG["categories"]
+
+
+def test_select_categories_rejects_unknown_names():
+    template = PromptTemplate(PROFILES)
+    with pytest.raises(UnknownCategoriesError, match="Unknown review categories: Style"):
+        template.select_categories(["Security", "Style"])
+    with pytest.raises(UnknownCategoryProfileError, match="available: quick"):
+        template.select_categories(profile="thorough")
+
+
+def test_render_with_a_subset_lists_only_those_categories():
+    template = PromptTemplate(CONFIG)
+    subset = template.select_categories(["Security"])
+    prompt = template.render("python", "", subset)
+    assert "### Categories of Interest:\nGeneral Feedback, Security\n" in prompt
+    assert "Review for: General Feedback, Security." in prompt
+    assert template.render("python", "", subset) == prompt
+    assert template.render("python", "", list(template.categories)) == template.render("python", "")
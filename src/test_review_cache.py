@@ -0,0 +1,107 @@
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src import database, lru_cache
+from src.conftest import FakeSession
+from src.review_cache import ReviewCache, make_cache_key
+
+CATEGORIES = [{"category": "Security", "message": "ok"}]
+TTL = 3600
+
+
+class OpenedSessions(list):
+    """Sessions opened by the cache; their SELECTs answer with `row.value`."""
+
+    def __init__(self):
+        super().__init__()
+        self.row = SimpleNamespace(value=None)
+
+
+@pytest.fixture
+def sessions(monkeypatch) -> OpenedSessions:
+    opened = OpenedSessions()
+    row = opened.row
+
+    def session_factory():
+        session = FakeSession(results=lambda statement, _params: [row.value] if statement.is_select else [])
+        opened.append(session)
+        return session
+
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    return opened
+
+
+def stored_row(sessions: OpenedSessions, age: float) -> None:
+    created_at = datetime.now(UTC) - timedelta(seconds=age)
+    sessions.row.value = SimpleNamespace(categories=CATEGORIES, created_at=created_at)
+
+
+def test_database_hit_is_promoted_to_memory(sessions):
+    cache = ReviewCache(memory_size=4, ttl_seconds=TTL, max_rows=100)
+    stored_row(sessions, age=60)
+
+    assert cache.get("key") == CATEGORIES
+    [session] = sessions
+    # Lookup, then the hit statistics
+    assert [type(statement).__name__ for statement in session.statements] == ["Select", "Update"]
+    assert session.commits == 1
+
+    assert cache.get("key") == CATEGORIES
+    assert len(sessions) == 1
+
+
+def test_expired_database_row_is_a_miss(sessions):
+    cache = ReviewCache(memory_size=4, ttl_seconds=TTL, max_rows=100)
+    stored_row(sessions, age=TTL + 1)
+
+    assert cache.get("key") is None
+    assert cache.get("key") is None
+    assert len(sessions) == 2
+
+
+def test_promoted_entry_expires_with_its_database_row(sessions, monkeypatch):
+    cache = ReviewCache(memory_size=4, ttl_seconds=TTL, max_rows=100)
+    stored_row(sessions, age=TTL - 10)
+    assert cache.get("key") == CATEGORIES
+
+    # The memory tier counts the TTL from the row's created_at, not from the promotion
+    later = datetime.now(UTC).timestamp() + 11
+    monkeypatch.setattr(lru_cache.time, "time", lambda: later)
+    sessions.row.value = None
+    assert cache.get("key") is None
+    assert len(sessions) == 2
+
+
+def test_put_upserts_and_evicts_every_n_writes(sessions, monkeypatch):
+    monkeypatch.setattr("src.review_cache.REVIEW_CACHE_EVICT_EVERY", 2)
+    cache = ReviewCache(memory_size=4, ttl_seconds=TTL, max_rows=100)
+
+    cache.put("a", CATEGORIES, model_name="m")
+    cache.put("b", CATEGORIES, model_name="m")
+
+    first, second = sessions
+    sql = str(first.statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (cache_key) DO UPDATE" in sql
+    assert len(first.statements) == 1
+    # Upsert, expired rows, overflow rows
+    assert [type(statement).__name__ for statement in second.statements] == ["Insert", "Delete", "Delete"]
+    # Answered from memory afterwards
+    assert cache.get("a") == CATEGORIES
+    assert len(sessions) == 2
+
+
+def test_disabled_cache_never_touches_the_database(sessions):
+    cache = ReviewCache(memory_size=4, ttl_seconds=TTL, max_rows=100, enabled=False)
+    cache.put("key", CATEGORIES)
+    assert cache.get("key") is None
+    assert sessions == []
+
+
+def test_cache_key_covers_prompt_settings_and_model():
+    key = make_cache_key("python", "x = 1", None, {"prompt_mode": "full"}, "m")
+    assert key == make_cache_key("python", "x = 1", "", {"prompt_mode": "full"}, "m")
+    assert key != make_cache_key("python", "x = 1", None, {"prompt_mode": "diff"}, "m")
+    assert key != make_cache_key("python", "x = 1", None, {"prompt_mode": "full"}, "other")
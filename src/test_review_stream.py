@@ -0,0 +1,95 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src import api, services
+from src.llm_engines.backend_pool import BackendSaturatedError
+
+REQUEST = {"language": "python", "sourceCode": "x = 1"}
+OUTPUT = ['{"category": "Security", ', '"message": "ok"}', ' {"category": "Style", "message": "fine"}']
+
+
+class FakeAsyncEngine:
+    model_name = "m"
+    context_window = None
+
+    def __init__(self, output=(), error: Exception | None = None, saturated: bool = False):
+        self.output = list(output)
+        self.error = error
+        self.saturated = saturated
+
+    def check_capacity(self) -> None:
+        if self.saturated:
+            raise BackendSaturatedError(self.model_name, retry_after=2.5)
+
+    async def stream_review(self, _prompt_str):
+        for text in self.output:
+            yield text
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.fixture
+def stored(monkeypatch) -> list:
+    """Reviews saved by the stream; the review cache always misses."""
+    saved = []
+
+    def store_review(review_req, cat_data, model_name=None):
+        saved.append((review_req, cat_data, model_name))
+        return {"reviewId": "r-1", "reviews": cat_data}
+
+    monkeypatch.setattr(services, "review_cache", SimpleNamespace(get=lambda _key: None, put=lambda *_a: None))
+    monkeypatch.setattr(services, "_store_review", store_review)
+    return saved
+
+
+def stream(monkeypatch, engine: FakeAsyncEngine):
+    monkeypatch.setattr(api, "get_async_ollama_engine", lambda: engine)
+    app = FastAPI()
+    app.include_router(api.router)
+    return TestClient(app).post("/v2/review/stream", json=REQUEST)
+
+
+def parse_sse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event_line, data_line = block.split("\n")
+        events.append((event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))))
+    return events
+
+
+def test_tokens_and_categories_stream_before_the_result(monkeypatch, stored):
+    response = stream(monkeypatch, FakeAsyncEngine(OUTPUT))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [data["text"] for event, data in events if event == "token"] == OUTPUT
+    assert [data for event, data in events if event == "category"] == [
+        {"category": "Security", "message": "ok"},
+        {"category": "Style", "message": "fine"},
+    ]
+    # The Security category is emitted as soon as its closing brace arrives
+    assert [event for event, _ in events][:3] == ["token", "token", "category"]
+    assert events[-1] == ("result", {"reviewId": "r-1", "reviews": stored[0][1]})
+    assert stored[0][2] == "m"
+
+
+def test_saturated_backends_reject_before_streaming(monkeypatch, stored):
+    response = stream(monkeypatch, FakeAsyncEngine(OUTPUT, saturated=True))
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
+    assert stored == []
+
+
+def test_generation_failure_ends_with_an_error_event(monkeypatch, stored):
+    response = stream(monkeypatch, FakeAsyncEngine(OUTPUT[:1], error=RuntimeError("connection reset")))
+
+    events = parse_sse(response.text)
+    assert events[0] == ("token", {"text": OUTPUT[0]})
+    assert events[-1] == ("error", {"detail": "Failed to perform code review."})
+    assert stored == []
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from src.scheduler import (
+    PRIORITY_CLASSES,
+    Candidate,
+    order_candidates,
+    parse_client_weights,
+    priority_name,
+    resolve_priority,
+)
+
+T0 = datetime(2026, 1, 1)
+
+
+def candidate(job_id: str, client_id: str, client_rank: int, priority: str = "normal", age: int = 0) -> Candidate:
+    return Candidate(job_id, PRIORITY_CLASSES[priority], client_id, T0 + timedelta(seconds=age), client_rank)
+
+
+def test_resolve_priority():
+    assert resolve_priority("interactive") == 0
+    assert resolve_priority(" Batch ") == 2
+    assert resolve_priority(1) == 1
+    assert resolve_priority(None) == PRIORITY_CLASSES["normal"]
+    assert resolve_priority("urgent") == PRIORITY_CLASSES["normal"]
+    assert resolve_priority(7) == PRIORITY_CLASSES["normal"]
+    assert priority_name(2) == "batch"
+
+
+def test_parse_client_weights():
+    assert parse_client_weights("ci=0.5, vscode=2,,bad=x,zero=0") == {"ci": 0.5, "vscode": 2.0, "zero": 0.001}
+    assert parse_client_weights("") == {}
+
+
+def test_more_urgent_class_always_first():
+    jobs = [candidate("batch", "a", 1, "batch"), candidate("normal", "b", 4, "normal", age=10)]
+    jobs.append(candidate("interactive", "c", 1, "interactive", age=20))
+    ordered = order_candidates(jobs, {"c": 5}, weights={})
+    assert [job.job_id for job in ordered] == ["interactive", "normal", "batch"]
+
+
+def test_fair_share_interleaves_clients():
+    # Client "bulk" queued three jobs before "single" queued one
+    jobs = [candidate(f"bulk-{rank}", "bulk", rank, age=rank) for rank in (1, 2, 3)]
+    jobs.append(candidate("single-1", "single", 1, age=10))
+    ordered = order_candidates(jobs, {}, weights={})
+    assert [job.job_id for job in ordered] == ["bulk-1", "single-1", "bulk-2", "bulk-3"]
+
+
+def test_running_jobs_and_weights_shift_virtual_time():
+    jobs = [candidate("a-1", "a", 1), candidate("b-1", "b", 1, age=1)]
+    assert order_candidates(jobs, {"a": 2}, weights={})[0].job_id == "b-1"
+    # Weight 4 makes a's next job (2 running + 1) / 4 cheaper than b's (0 + 1) / 1
+    assert order_candidates(jobs, {"a": 2}, weights={"a": 4})[0].job_id == "a-1"
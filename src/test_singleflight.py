@@ -0,0 +1,210 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.singleflight import AsyncSingleFlight, SingleFlight
+
+# Time given to follower threads to join the in-flight call
+JOIN_DELAY = 0.2
+
+
+class AbortedError(Exception):
+    pass
+
+
+def start_leader(group: SingleFlight, fn) -> tuple[threading.Thread, list]:
+    outcome = []
+
+    def run():
+        try:
+            outcome.append(group.do("key", fn))
+        except (ValueError, AbortedError) as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def test_followers_share_the_leader_result():
+    group = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work(_emit):
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    leader, outcome = start_leader(group, work)
+    started.wait(5)
+    followers = [start_leader(group, work) for _ in range(3)]
+    time.sleep(JOIN_DELAY)
+    release.set()
+    leader.join(5)
+    for thread, _ in followers:
+        thread.join(5)
+
+    assert calls == [1]
+    assert outcome == [("result", False)]
+    assert [result for _, result in followers] == [[("result", True)]] * 3
+    # The key is free again once the call finished
+    assert group.do("key", lambda _emit: "again") == ("again", False)
+
+
+def test_leader_error_is_raised_by_followers():
+    group = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def work(_emit):
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    leader, leader_outcome = start_leader(group, work)
+    started.wait(5)
+    follower, follower_outcome = start_leader(group, lambda _emit: "unused")
+    time.sleep(JOIN_DELAY)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert isinstance(leader_outcome[0], ValueError)
+    assert isinstance(follower_outcome[0], ValueError)
+
+
+def test_follower_reruns_after_retryable_leader_error():
+    group = SingleFlight(retry_on=(AbortedError,))
+    started, release = threading.Event(), threading.Event()
+
+    def canceled_work(_emit):
+        started.set()
+        release.wait(5)
+        raise AbortedError
+
+    leader, leader_outcome = start_leader(group, canceled_work)
+    started.wait(5)
+    follower, follower_outcome = start_leader(group, lambda _emit: "own result")
+    time.sleep(JOIN_DELAY)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert isinstance(leader_outcome[0], AbortedError)
+    assert follower_outcome == [("own result", False)]
+
+
+def test_interrupt_check_stops_a_follower_only():
+    group = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def work(_emit):
+        started.set()
+        release.wait(5)
+        return "result"
+
+    leader, outcome = start_leader(group, work)
+    started.wait(5)
+
+    def interrupt():
+        raise AbortedError
+
+    with pytest.raises(AbortedError):
+        group.do("key", lambda _emit: "unused", interrupt_check=interrupt, poll_interval=0.01)
+    release.set()
+    leader.join(5)
+    assert outcome == [("result", False)]
+
+
+def test_followers_receive_the_leader_events():
+    group = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def work(emit):
+        emit("first")
+        started.set()
+        release.wait(5)
+        emit("second")
+        return "result"
+
+    leader_events, follower_events = [], []
+    leader = threading.Thread(target=group.do, args=("key", work), kwargs={"listener": leader_events.append})
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=group.do, args=("key", work), kwargs={"listener": follower_events.append})
+    follower.start()
+    time.sleep(JOIN_DELAY)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert leader_events == ["first", "second"]
+    # Events emitted before joining are replayed
+    assert follower_events == ["first", "second"]
+
+
+def test_async_followers_replay_events_and_share_result():
+    async def scenario():
+        group = AsyncSingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def work(emit):
+            calls.append(1)
+            emit("token-1")
+            await release.wait()
+            emit("token-2")
+            return "result"
+
+        leader_events, follower_events = [], []
+        leader = asyncio.ensure_future(group.do("key", work, leader_events.append))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do("key", work, follower_events.append))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(leader, follower)
+        return calls, results, leader_events, follower_events
+
+    calls, results, leader_events, follower_events = asyncio.run(scenario())
+    assert calls == [1]
+    assert results == ["result", "result"]
+    assert leader_events == follower_events == ["token-1", "token-2"]
+
+
+def test_async_work_survives_until_the_last_caller_leaves():
+    async def scenario():
+        group = AsyncSingleFlight()
+        release = asyncio.Event()
+        canceled = []
+
+        async def work(_emit):
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                canceled.append(1)
+                raise
+            return "result"
+
+        first = asyncio.ensure_future(group.do("key", work))
+        second = asyncio.ensure_future(group.do("key", work))
+        await asyncio.sleep(0)
+
+        # One caller going away does not abort the shared work
+        first.cancel()
+        await asyncio.sleep(0)
+        assert not canceled
+        release.set()
+        assert await second == "result"
+
+        # Every caller gone: the work is canceled
+        release.clear()
+        only = asyncio.ensure_future(group.do("other", work))
+        await asyncio.sleep(0)
+        only.cancel()
+        await asyncio.sleep(0.01)
+        return canceled
+
+    assert asyncio.run(scenario()) == [1]
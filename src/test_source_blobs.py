@@ -0,0 +1,93 @@
+import hashlib
+import os
+import zlib
+
+import pytest
+from sqlalchemy.sql.dml import Insert
+
+from src import source_blobs
+from src.conftest import FakeSession
+from src.source_blobs import UnknownCodecError, compress, content_hash, decompress, load_blob, store_blobs
+
+TEXT = "def handler(event):\n    return process(event)\n" * 50
+
+
+def test_content_hash_is_sha256_of_utf8():
+    assert content_hash("héllo") == hashlib.sha256("héllo".encode()).hexdigest()
+
+
+@pytest.mark.parametrize("codec", ["zlib", "none"])
+def test_round_trip(codec):
+    raw = TEXT.encode("utf-8")
+    used, data = compress(raw, codec, 6)
+    assert used == codec
+    assert decompress(used, data) == raw
+    if codec == "zlib":
+        assert len(data) < len(raw)
+
+
+def test_zstd_round_trip():
+    pytest.importorskip("zstandard")
+    raw = TEXT.encode("utf-8")
+    used, data = compress(raw, "zstd", 3)
+    assert used == "zstd"
+    assert decompress(used, data) == raw
+
+
+def test_small_or_incompressible_input_is_stored_raw():
+    assert compress(b"x = 1", "zlib", 6) == ("none", b"x = 1")
+    noise = os.urandom(4096)
+    assert compress(noise, "zlib", 6) == ("none", noise)
+
+
+def test_decompress_checks_codec():
+    assert decompress("zlib", zlib.compress(b"abc")) == b"abc"
+    with pytest.raises(UnknownCodecError, match="Unknown source blob codec"):
+        decompress("lz4", b"")
+
+
+def blob_results(existing=(), rows=()):
+    """Answers the lookup SELECT with `existing` (or `rows` for load_blob)."""
+
+    def results(statement, _params):
+        if isinstance(statement, Insert):
+            return ()
+        return rows or [(blob_hash,) for blob_hash in existing]
+
+    return results
+
+
+def inserted_hashes(session: FakeSession) -> list[str]:
+    return [
+        value
+        for statement in session.statements
+        if isinstance(statement, Insert)
+        for key, value in statement.compile().params.items()
+        if key.startswith("blob_hash")
+    ]
+
+
+def test_store_blobs_only_writes_missing_contents(monkeypatch):
+    compressed = []
+    original = source_blobs.compress
+    monkeypatch.setattr(source_blobs, "compress", lambda raw: compressed.append(raw) or original(raw))
+
+    session = FakeSession(results=blob_results(existing=[content_hash("old")]))
+    hashes = store_blobs(session, "old", None, TEXT, TEXT)
+
+    assert hashes == [content_hash("old"), None, content_hash(TEXT), content_hash(TEXT)]
+    assert inserted_hashes(session) == [content_hash(TEXT)]
+    assert compressed == [TEXT.encode("utf-8")]
+
+
+def test_store_blobs_without_contents_skips_queries():
+    session = FakeSession()
+    assert store_blobs(session, None) == [None]
+    assert session.statements == []
+
+
+def test_load_blob_decompresses():
+    codec, data = compress(TEXT.encode("utf-8"), "zlib", 6)
+    session = FakeSession(results=blob_results(rows=[(content_hash(TEXT), codec, data)]))
+    assert load_blob(session, content_hash(TEXT)) == TEXT
+    assert load_blob(session, None) is None
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from src.stream_parser import CategoryStreamParser
+
+OUTPUT = json.dumps(
+    [
+        {"category": "General Feedback", "message": 'Uses "quotes" and a brace } in text.'},
+        {"category": "Security", "message": "Escape \\\\ backslashes and \\n newlines."},
+    ]
+)
+EXPECTED = json.loads(OUTPUT)
+
+
+def parse(chunks: list[str], **kwargs) -> list[dict]:
+    parser = CategoryStreamParser(**kwargs)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def split(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_objects_split_across_chunks(size):
+    assert parse(split(OUTPUT, size)) == EXPECTED
+
+
+def test_feed_returns_objects_as_soon_as_they_close():
+    parser = CategoryStreamParser()
+    first_end = OUTPUT.index("}") + 1
+    first_end = OUTPUT.index("}", first_end) + 1  # The first "}" is inside a string
+    assert parser.feed(OUTPUT[: first_end - 1]) == []
+    assert parser.feed(OUTPUT[first_end - 1 : first_end]) == [EXPECTED[0]]
+    assert parser.feed(OUTPUT[first_end:]) == [EXPECTED[1]]
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_think_blocks_are_skipped(size):
+    text = '<think>Maybe {"category": "Fake", "message": "no"}</think>\nHere you go:\n' + OUTPUT
+    assert parse(split(text, size)) == EXPECTED
+
+
+@pytest.mark.parametrize("size", [1, 4, 1000])
+def test_unclosed_think_block_is_rescanned(size):
+    text = '<think>never closed [{"category":"A","message":"m"}]'
+    assert parse(split(text, size)) == [{"category": "A", "message": "m"}]
+
+
+def test_unterminated_object_is_rescanned():
+    text = "Note: use {braces carefully.\n" + OUTPUT
+    assert parse([text]) == EXPECTED
+
+
+def test_malformed_objects_are_skipped():
+    text = '[{"category": "A", "message": }, {"category": "B", "message": "ok"}]'
+    assert parse([text]) == [{"category": "B", "message": "ok"}]
+
+
+def test_wrapper_objects_and_non_string_messages():
+    text = json.dumps({"reviews": [{"category": "A", "message": ["x", "y"]}]})
+    assert parse([text]) == [{"category": "A", "message": '["x", "y"]'}]
+
+
+def test_category_filter_drops_and_normalizes_names():
+    text = json.dumps([{"category": "security", "message": "a"}, {"category": "Performance", "message": "b"}])
+    parser = CategoryStreamParser(["General Feedback", "Security"])
+    parser.feed(text)
+    assert parser.close() == [{"category": "Security", "message": "a"}]
+    assert parser.dropped == 1